@@ -1,8 +1,12 @@
 import os
 from functools import lru_cache
+from typing import Self
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
+from api.utils.types import PulseArrayStorage
+
 
 def get_env_var(var_name: str) -> str:
     try:
@@ -21,6 +25,60 @@ class Settings(BaseSettings):
     ALLOWED_ORIGINS: str = get_env_var(
         "ALLOWED_ORIGINS",  # comma-separated list of allowed origins
     )
+    # Uploads with at least this many pulses are written using PostgreSQL COPY
+    BULK_INGEST_THRESHOLD: int = 100
+    # Number of pulses validated and written at a time when streaming uploads
+    STREAM_INGEST_BATCH_SIZE: int = 500
+    # Maximum number of line errors reported for a streamed upload
+    STREAM_INGEST_MAX_ERRORS: int = 1000
+    # Existing pulses must be converted with convert_pulse_arrays.py to change this
+    PULSE_ARRAY_STORAGE: PulseArrayStorage = PulseArrayStorage.ARRAY
+    # Delays within this fraction of a step from a uniform grid are stored as a grid
+    DELAYS_GRID_TOLERANCE: float = 1e-6
+    # Rows fetched per round trip when streaming reads
+    STREAM_READ_BATCH_SIZE: int = 1000
+    # Matches counted per attribute filter when ordering filters by selectivity
+    FILTER_ESTIMATE_LIMIT: int = 10_000
+    # Memory used by cached attribute filter results per worker, 0 disables the cache
+    FILTER_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Serve reads from async views on an asyncpg engine, instead of the threadpool
+    ASYNC_DATABASE: bool = False
+    # Processes serving requests when started with asgi.py --lifespan PROD
+    WORKERS: int = 1
+    # Connections all workers may open together, which connection pools are sized from
+    DATABASE_MAX_CONNECTIONS: int = 40
+    # Connections kept open per engine, instead of sizing from DATABASE_MAX_CONNECTIONS
+    DATABASE_POOL_SIZE: int | None = None
+    # Connections opened beyond the pool size per engine under load
+    DATABASE_MAX_OVERFLOW: int | None = None
+    # Seconds a request waits for a connection before failing
+    DATABASE_POOL_TIMEOUT: float = 30
+    # Seconds after which connections are replaced, -1 keeps them forever
+    DATABASE_POOL_RECYCLE: int = 1800
+    # Test connections with a round trip when checked out, replacing dead ones
+    DATABASE_POOL_PRE_PING: bool = True
+    # Seconds in-flight requests get to finish when a worker stops or restarts
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    # Set by asgi.py once it has prepared the database, so workers skip it
+    DATABASE_PREPARED: bool = False
+
+    @model_validator(mode="after")
+    def check_connection_budget(self: Self) -> Self:
+        """Reject pools that could open more than DATABASE_MAX_CONNECTIONS."""
+        pool_size, max_overflow = get_pool_limits(self)
+        engines = 2 if self.ASYNC_DATABASE else 1
+        # Every worker also holds a connection for its notification listener
+        worker_connections = engines * (pool_size + max_overflow) + 1
+        if self.WORKERS * worker_connections > self.DATABASE_MAX_CONNECTIONS:
+            msg = (
+                f"{self.WORKERS} workers may open {worker_connections} database "
+                f"connections each, more than DATABASE_MAX_CONNECTIONS "
+                f"({self.DATABASE_MAX_CONNECTIONS}) allows. Lower WORKERS, "
+                "DATABASE_POOL_SIZE or DATABASE_MAX_OVERFLOW, or raise "
+                "DATABASE_MAX_CONNECTIONS."
+            )
+            raise ValueError(msg)
+        return self
 
 
 class AuthSettings(BaseSettings):
@@ -30,6 +88,33 @@ class AuthSettings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 100
     REFRESH_TOKEN_COOKIE_NAME: str = "terastore_refresh_token"
     REFRESH_ENDPOINT: str = "/auth/refresh"
+    # Seconds a user verified for an access token is cached, 0 disables the cache
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60
+    # Access tokens cached per worker
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10_000
+    # Passwords hashed or verified at a time per worker by async logins
+    PASSWORD_HASH_WORKERS: int = 2
+    # Bearer token scrapers send to read /metrics, which is disabled when empty
+    TERASTORE_METRICS_TOKEN: str = ""
+
+
+def get_pool_limits(settings: Settings) -> tuple[int, int]:
+    """Get the pool size and max overflow of each engine in a worker.
+
+    DATABASE_MAX_CONNECTIONS is split evenly between the workers. Every worker
+    also holds a connection for its notification listener, and with
+    ASYNC_DATABASE its sync and async engines share its connections.
+    DATABASE_POOL_SIZE and DATABASE_MAX_OVERFLOW override the split.
+    """
+    worker_connections = settings.DATABASE_MAX_CONNECTIONS // settings.WORKERS - 1
+    engine_connections = worker_connections // (2 if settings.ASYNC_DATABASE else 1)
+    pool_size = max(1, engine_connections // 2)
+    max_overflow = max(0, engine_connections - pool_size)
+    if settings.DATABASE_POOL_SIZE is not None:
+        pool_size = settings.DATABASE_POOL_SIZE
+    if settings.DATABASE_MAX_OVERFLOW is not None:
+        max_overflow = settings.DATABASE_MAX_OVERFLOW
+    return pool_size, max_overflow
 
 
 @lru_cache
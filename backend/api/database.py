@@ -1,19 +1,67 @@
-from collections.abc import Iterator
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any, TypeVar, cast
 
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.config import Settings, get_pool_limits, get_settings
+from api.migrations import (
+    check_pulse_array_storage,
+    run_migrations,
+)
+from api.utils.pool_metrics import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    instrument_engine,
+)
+
+T = TypeVar("T")
+
+
+def get_pool_options(settings: Settings) -> dict[str, Any]:
+    """Get the connection pool arguments of create_engine for each engine."""
+    pool_size, max_overflow = get_pool_limits(settings)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+    }
 
-from api.config import get_settings
 
 settings = get_settings()
 app_engine = create_engine(
     settings.DATABASE_URL,
     echo=False,
+    poolclass=InstrumentedQueuePool,
+    **get_pool_options(settings),
 )
+instrument_engine("sync", app_engine)
+
+
+def create_async_app_engine(database_url: str) -> AsyncEngine:
+    """Create an asyncpg engine for the database of a psycopg2 database URL."""
+    url = make_url(database_url).set(drivername="postgresql+asyncpg")
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedAsyncQueuePool,
+        **get_pool_options(settings),
+    )
+
+
+# Only connects once used, which is when ASYNC_DATABASE is enabled
+async_app_engine = create_async_app_engine(settings.DATABASE_URL)
+instrument_engine("async", async_app_engine.sync_engine)
 
 
 def create_db_and_tables(engine: Engine = app_engine) -> None:
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    check_pulse_array_storage(engine, settings.PULSE_ARRAY_STORAGE)
 
 
 def drop_tables(engine: Engine = app_engine) -> None:
@@ -23,3 +71,19 @@ def drop_tables(engine: Engine = app_engine) -> None:
 def get_session() -> Iterator[Session]:
     with Session(app_engine) as session:
         yield session
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    async with AsyncSession(async_app_engine) as session:
+        yield session
+
+
+async def run_with_sync_session(
+    db: AsyncSession, function: Callable[[Session], T]
+) -> T:
+    """Run sync CRUD code on the connection of an async session.
+
+    The sync session runs in a greenlet, so its queries do not block the event loop.
+    """
+    # The sync session of a SQLModel AsyncSession is a SQLModel Session
+    return await db.run_sync(lambda session: function(cast(Session, session)))
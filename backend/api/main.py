@@ -8,7 +8,12 @@ from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
 
 from api.config import get_settings
-from api.database import app_engine, create_db_and_tables, drop_tables
+from api.database import (
+    app_engine,
+    async_app_engine,
+    create_db_and_tables,
+    drop_tables,
+)
 from api.public import make_api
 from api.public.auth.crud import create_user
 from api.public.auth.models import AuthLevel, UserCreate
@@ -18,6 +23,7 @@ from api.utils.exception_handlers import (
     attr_key_does_not_exist_exception_handler,
     credentials_incorrect_exception_handler,
     device_not_found_exception_handler,
+    invalid_cursor_exception_handler,
     pulse_column_nonexistent_exception_handler,
     pulse_not_found_exception_handler,
     username_already_exists_exception_handler,
@@ -30,15 +36,19 @@ from api.utils.exceptions import (
     CredentialsIncorrectError,
     DeviceNotFoundError,
     EmailOrPasswordIncorrectError,
+    InvalidCursorError,
     PulseColumnNonexistentError,
     PulseNotFoundError,
     UserAlreadyExistsError,
 )
 from api.utils.logging import EndpointFilter
+from api.utils.metrics import MetricsMiddleware, remove_worker_gauges
 from api.utils.mock_data_generator import (
     create_devices_and_pulses,
     create_frontend_dev_data,
 )
+from api.utils.notifications import listen_for_notifications
+from api.utils.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
 from api.utils.types import Lifespan
 
 
@@ -47,16 +57,17 @@ async def lifespan_dev(app: FastAPI) -> AsyncGenerator[None, None]:
     create_db_and_tables()
     create_devices_and_pulses()
     create_frontend_dev_data()
-    yield
+    with listen_for_notifications(app_engine):
+        yield
+    await async_app_engine.dispose()
     drop_tables()
 
 
-@asynccontextmanager
-async def lifespan_prod(app: FastAPI) -> AsyncGenerator[None, None]:
+def prepare_database() -> None:
+    """Set up the schema, and create the admin user on first run."""
     settings = get_settings()
     create_db_and_tables()
 
-    # On first run, create admin user
     try:
         with Session(app_engine) as session:
             create_user(
@@ -69,7 +80,17 @@ async def lifespan_prod(app: FastAPI) -> AsyncGenerator[None, None]:
             )
     except UserAlreadyExistsError:
         pass
-    yield
+
+
+@asynccontextmanager
+async def lifespan_prod(app: FastAPI) -> AsyncGenerator[None, None]:
+    # asgi.py prepares the database once, before starting the workers
+    if not get_settings().DATABASE_PREPARED:
+        prepare_database()
+    with listen_for_notifications(app_engine):
+        yield
+    await async_app_engine.dispose()
+    remove_worker_gauges()
 
 
 @asynccontextmanager
@@ -82,7 +103,9 @@ async def lifespan_integration_test(app: FastAPI) -> AsyncGenerator[None, None]:
         create_frontend_dev_data()
     except IntegrityError:
         pass
-    yield
+    with listen_for_notifications(app_engine):
+        yield
+    await async_app_engine.dispose()
     drop_tables()
 
 
@@ -103,7 +126,9 @@ def create_app(lifespan: Lifespan) -> FastAPI:
         allow_headers=["*"],
         allow_origins=settings.ALLOWED_ORIGINS.split(","),
         allow_credentials=True,
+        expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
     )
+    app.add_middleware(MetricsMiddleware)
 
     # Add exception handlers
     app.add_exception_handler(
@@ -142,10 +167,15 @@ def create_app(lifespan: Lifespan) -> FastAPI:
         CredentialsIncorrectError,
         credentials_incorrect_exception_handler,
     )
+    app.add_exception_handler(
+        InvalidCursorError,
+        invalid_cursor_exception_handler,
+    )
 
     # Add logging filters
     uvicorn_logger = logging.getLogger("uvicorn.access")
     uvicorn_logger.addFilter(EndpointFilter(path="/health"))
+    uvicorn_logger.addFilter(EndpointFilter(path="/metrics"))
 
     app.include_router(make_api())
 
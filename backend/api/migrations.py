@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any
+from uuid import UUID
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    LargeBinary,
+    String,
+    Table,
+    bindparam,
+    func,
+    text,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+
+from api.utils.sqltypes import pack_floats, unpack_floats
+from api.utils.types import PulseArrayStorage
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from sqlalchemy.engine import Connection, Engine
+    from sqlalchemy.types import TypeEngine
+
+logger = logging.getLogger(__name__)
+
+PULSES_TABLE = "pulses"
+PULSE_ARRAY_COLUMNS = ("delays", "signal", "signal_error")
+MIGRATION_BATCH_SIZE = 500
+# Arbitrary key, so concurrently starting workers migrate one at a time
+MIGRATION_LOCK_KEY = 7_305_416_011
+KEY_REGISTRY_TABLE = "pulse_key_registry"
+
+# Versions of the schema migrations applied to the database, see run_migrations
+schema_migrations = Table(
+    "schema_migrations",
+    SQLModel.metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+# Column definition, information_schema data type, SQLAlchemy type and converter
+# from the other storage format for each storage format.
+PULSE_ARRAY_STORAGE_FORMATS: dict[
+    PulseArrayStorage,
+    tuple[str, str, TypeEngine[Any], Callable[[Any], Any]],
+] = {
+    PulseArrayStorage.ARRAY: (
+        "double precision[]",
+        "ARRAY",
+        postgresql.ARRAY(Float),
+        lambda packed: unpack_floats(packed).tolist(),
+    ),
+    PulseArrayStorage.PACKED: (
+        "bytea",
+        "bytea",
+        LargeBinary(),
+        pack_floats,
+    ),
+}
+
+
+def get_column_types(connection: Connection, table: str) -> dict[str, str]:
+    rows = connection.execute(
+        text(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = :table",
+        ),
+        {"table": table},
+    )
+    return dict(rows.tuples().all())
+
+
+def check_pulse_array_storage(engine: Engine, storage: PulseArrayStorage) -> None:
+    """Check that the array columns of the pulses are stored in the given format.
+
+    Raises a RuntimeError if not, as converting them takes a while on large
+    tables, so it is never done implicitly, see convert_pulse_array_storage.
+    """
+    data_type = PULSE_ARRAY_STORAGE_FORMATS[storage][1]
+    with engine.connect() as connection:
+        column_types = get_column_types(connection, PULSES_TABLE)
+    wrong_columns = [
+        column
+        for column in PULSE_ARRAY_COLUMNS
+        if column_types.get(column, data_type) != data_type
+    ]
+    if wrong_columns:
+        msg = (
+            f"The pulse columns {', '.join(wrong_columns)} are not stored as "
+            f"PULSE_ARRAY_STORAGE={storage.value}. Convert them with "
+            f"python convert_pulse_arrays.py {storage.value}"
+        )
+        raise RuntimeError(msg)
+
+
+def _fill_pulse_array_column(
+    connection: Connection,
+    column: str,
+    storage: PulseArrayStorage,
+    batch_size: int,
+    *,
+    commit_batches: bool,
+) -> None:
+    """Convert the values of column missing from its new column, in batches.
+
+    Batches are read in pulse ID order, so every batch seeks to where the last
+    one stopped through the primary key.
+    """
+    _, _, sa_type, convert = PULSE_ARRAY_STORAGE_FORMATS[storage]
+    new_column = f"{column}_{storage.value}"
+    # Identifiers are module constants, so formatting them in is safe
+    select_batch = text(
+        f"SELECT pulse_id, {column} FROM {PULSES_TABLE} "  # noqa: S608
+        f"WHERE {column} IS NOT NULL AND {new_column} IS NULL "
+        "AND pulse_id > :after ORDER BY pulse_id LIMIT :limit",
+    )
+    update = text(
+        f"UPDATE {PULSES_TABLE} SET {new_column} = :value "  # noqa: S608
+        "WHERE pulse_id = :pulse_id",
+    ).bindparams(bindparam("value", type_=sa_type))
+    after = UUID(int=0)
+    while rows := connection.execute(
+        select_batch,
+        {"after": after, "limit": batch_size},
+    ).all():
+        connection.execute(
+            update,
+            [
+                {"pulse_id": pulse_id, "value": convert(value)}
+                for pulse_id, value in rows
+            ],
+        )
+        if commit_batches:
+            connection.commit()
+        after = rows[-1][0]
+
+
+def convert_pulse_array_storage(
+    engine: Engine,
+    storage: PulseArrayStorage,
+    *,
+    fill_only: bool = False,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+) -> None:
+    """Convert the array columns of existing pulses to the given storage format.
+
+    Each column is converted into a new column, in batches that are committed one
+    at a time. Only the rows of the current batch are locked, so the app can keep
+    serving in the old format, and an interrupted conversion resumes where it
+    stopped. Finally, the pulses written in the meantime are converted, and the
+    new columns replace the old ones, while the table is locked. This scans the
+    table once, so on large tables, fill the columns with fill_only while the
+    app is serving, and only replace them once it is stopped. The app must then
+    be started with the new PULSE_ARRAY_STORAGE.
+    """
+    column_definition, data_type, _, _ = PULSE_ARRAY_STORAGE_FORMATS[storage]
+    with engine.connect() as connection:
+        connection.execute(
+            text("SELECT pg_advisory_lock(:key)"),
+            {"key": MIGRATION_LOCK_KEY},
+        )
+        try:
+            column_types = get_column_types(connection, PULSES_TABLE)
+            columns = [
+                column
+                for column in PULSE_ARRAY_COLUMNS
+                if column_types.get(column, data_type) != data_type
+            ]
+            for column in columns:
+                # Without a default, adding a column does not rewrite the table
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {PULSES_TABLE} ADD COLUMN IF NOT EXISTS "
+                        f"{column}_{storage.value} {column_definition}",
+                    ),
+                )
+                connection.commit()
+                _fill_pulse_array_column(
+                    connection,
+                    column,
+                    storage,
+                    batch_size,
+                    commit_batches=True,
+                )
+            if fill_only or not columns:
+                return
+
+            connection.execute(
+                text(f"LOCK TABLE {PULSES_TABLE} IN ACCESS EXCLUSIVE MODE"),
+            )
+            for column in columns:
+                _fill_pulse_array_column(
+                    connection,
+                    column,
+                    storage,
+                    batch_size,
+                    commit_batches=False,
+                )
+                connection.execute(
+                    text(f"ALTER TABLE {PULSES_TABLE} DROP COLUMN {column}"),
+                )
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {PULSES_TABLE} "
+                        f"RENAME COLUMN {column}_{storage.value} TO {column}",
+                    ),
+                )
+            record_migration(connection, f"pulse_array_storage_{storage.value}")
+            connection.commit()
+        finally:
+            connection.rollback()
+            connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"),
+                {"key": MIGRATION_LOCK_KEY},
+            )
+            connection.commit()
+
+
+def create_index_concurrently(connection: Connection, table: str, name: str) -> None:
+    """Create an index declared on a model without blocking writes to its table.
+
+    A previous build that failed, e.g. because the worker was killed, leaves an
+    invalid index behind, which is dropped and built again.
+    """
+    index = next(
+        index for index in SQLModel.metadata.tables[table].indexes if index.name == name
+    )
+    is_valid = connection.execute(
+        text(
+            "SELECT pg_index.indisvalid FROM pg_index "
+            "JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+            "WHERE pg_class.relname = :name",
+        ),
+        {"name": name},
+    ).scalar()
+    if is_valid is False:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY {name}"))
+
+    # Rendered like create_all would, so expressions in indexes are included
+    create = CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect)
+    connection.execute(
+        text(str(create).replace(" INDEX ", " INDEX CONCURRENTLY ", 1)),
+    )
+
+
+def add_attrs_key_value_indexes(connection: Connection) -> None:
+    """Index the float attributes for filtering on keys and values.
+
+    This used to index string values whole too, which fails for long values. That
+    index is replaced by add_str_attrs_value_prefix_index.
+    """
+    create_index_concurrently(
+        connection,
+        "pulse_float_attrs",
+        "ix_pulse_float_attrs_key_value_pulse_id",
+    )
+
+
+def add_unique_key_registry_index(connection: Connection) -> None:
+    """Make registered keys unique, removing keys registered more than once.
+
+    Raises a RuntimeError if a key was registered with several data types, as
+    attributes were stored with each of them, so one cannot just be picked.
+    """
+    conflicting_keys = (
+        connection.execute(
+            text(
+                f"SELECT key FROM {KEY_REGISTRY_TABLE} "  # noqa: S608
+                "GROUP BY key HAVING count(DISTINCT data_type) > 1 ORDER BY key",
+            ),
+        )
+        .scalars()
+        .all()
+    )
+    if conflicting_keys:
+        msg = (
+            "Keys were registered with several data types, remove all but one "
+            f"from {KEY_REGISTRY_TABLE}: {', '.join(conflicting_keys)}"
+        )
+        raise RuntimeError(msg)
+
+    connection.execute(
+        text(
+            f"DELETE FROM {KEY_REGISTRY_TABLE} AS duplicate "  # noqa: S608
+            f"USING {KEY_REGISTRY_TABLE} AS kept "
+            "WHERE duplicate.key = kept.key AND duplicate.data_type = kept.data_type "
+            "AND duplicate.index > kept.index",
+        ),
+    )
+    create_index_concurrently(
+        connection,
+        KEY_REGISTRY_TABLE,
+        f"ix_{KEY_REGISTRY_TABLE}_key",
+    )
+
+
+def add_device_creation_time(connection: Connection) -> None:
+    """Add the creation time devices are paginated by."""
+    # now() is stable, so existing rows get it without rewriting the table
+    connection.execute(
+        text(
+            "ALTER TABLE devices ADD COLUMN IF NOT EXISTS creation_time "
+            "timestamp without time zone NOT NULL DEFAULT now()",
+        ),
+    )
+
+
+def add_delays_grid_columns(connection: Connection) -> None:
+    """Add the columns uniformly spaced delays are stored in, see DelaysGrid."""
+    for column, column_definition in (
+        ("delays_start", "double precision"),
+        ("delays_step", "double precision"),
+        ("delays_count", "integer"),
+    ):
+        connection.execute(
+            text(
+                f"ALTER TABLE {PULSES_TABLE} "
+                f"ADD COLUMN IF NOT EXISTS {column} {column_definition}",
+            ),
+        )
+
+
+def add_pagination_indexes(connection: Connection) -> None:
+    """Index pulses and devices in the order they are paginated in."""
+    create_index_concurrently(
+        connection,
+        "pulses",
+        "ix_pulses_creation_time_pulse_id",
+    )
+    create_index_concurrently(
+        connection,
+        "devices",
+        "ix_devices_creation_time_device_id",
+    )
+
+
+def add_str_attrs_value_prefix_index(connection: Connection) -> None:
+    """Index string attributes by the start of their values, see PulseAttrsStr."""
+    create_index_concurrently(
+        connection,
+        "pulse_str_attrs",
+        "ix_pulse_str_attrs_key_value_prefix_pulse_id",
+    )
+    connection.execute(
+        text("DROP INDEX CONCURRENTLY IF EXISTS ix_pulse_str_attrs_key_value_pulse_id"),
+    )
+
+
+# Applied in order, and only once per database. Never change or remove an applied
+# migration, add a new one instead. Every change to the schema of existing tables
+# goes here, except converting the pulse array storage, which is opt-in.
+MIGRATIONS: tuple[tuple[str, Callable[[Connection], None]], ...] = (
+    ("0001_attrs_key_value_indexes", add_attrs_key_value_indexes),
+    ("0002_unique_key_registry", add_unique_key_registry_index),
+    ("0003_device_creation_time", add_device_creation_time),
+    ("0004_pagination_indexes", add_pagination_indexes),
+    ("0005_delays_grid_columns", add_delays_grid_columns),
+    ("0006_str_attrs_value_prefix_index", add_str_attrs_value_prefix_index),
+)
+
+
+def record_migration(connection: Connection, version: str) -> None:
+    """Record a schema change in schema_migrations, or when it was last applied.
+
+    Unlike MIGRATIONS, conversions such as convert_pulse_array_storage can be
+    applied more than once.
+    """
+    insert = postgresql.insert(schema_migrations).values(version=version)
+    connection.execute(
+        insert.on_conflict_do_update(
+            index_elements=[schema_migrations.c.version],
+            set_={"applied_at": func.now()},
+        ),
+    )
+
+
+def run_migrations(engine: Engine) -> None:
+    """Apply the schema migrations not yet applied to the database.
+
+    Migrations run in autocommit mode, so indexes can be built concurrently on
+    tables of existing deployments while they are in use. Each migration must
+    therefore be safe to run again if it was interrupted. On new databases, the
+    tables are created with everything the migrations add, so they do nothing.
+    """
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT",
+    ) as connection:
+        connection.execute(
+            text("SELECT pg_advisory_lock(:key)"),
+            {"key": MIGRATION_LOCK_KEY},
+        )
+        try:
+            applied = set(
+                connection.execute(schema_migrations.select()).scalars().all(),
+            )
+            for version, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+                logger.info("Applying migration %s", version)
+                migrate(connection)
+                record_migration(connection, version)
+        finally:
+            connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"),
+                {"key": MIGRATION_LOCK_KEY},
+            )
@@ -1,10 +1,15 @@
 from fastapi import APIRouter, Depends
 
+from api.config import get_settings
+from api.public.attrs import async_views as async_eav
 from api.public.attrs import views as eav
 from api.public.auth import views as auth
-from api.public.auth.auth_handler import get_current_user
+from api.public.auth.auth_handler import get_current_user, verify_metrics_token
+from api.public.device import async_views as async_devices
 from api.public.device import views as devices
 from api.public.health import views as health
+from api.public.metrics import views as metrics
+from api.public.pulse import async_views as async_pulses
 from api.public.pulse import views as pulses
 from api.public.user import views as user
 
@@ -12,8 +17,20 @@ PROTECTED = [Depends(get_current_user)]
 
 
 def make_api() -> APIRouter:
-    """Create the public API router."""
+    """Create the public API router.
+
+    With ASYNC_DATABASE, the async reads are included first, so they take
+    precedence over the sync routes with the same paths.
+    """
     api = APIRouter()
+    if get_settings().ASYNC_DATABASE:
+        api.include_router(
+            async_pulses.router, prefix="/pulses", dependencies=PROTECTED
+        )
+        api.include_router(
+            async_devices.router, prefix="/devices", dependencies=PROTECTED
+        )
+        api.include_router(async_eav.router, prefix="/attrs", dependencies=PROTECTED)
     api.include_router(
         pulses.router,
         prefix="/pulses",
@@ -39,5 +56,11 @@ def make_api() -> APIRouter:
         dependencies=PROTECTED,
     )
     api.include_router(health.router, prefix="/health", tags=["Health"])
+    api.include_router(
+        metrics.router,
+        prefix="/metrics",
+        tags=["Metrics"],
+        dependencies=[Depends(verify_metrics_token)],
+    )
     api.include_router(auth.router, prefix="/auth", tags=["Auth"])
     return api
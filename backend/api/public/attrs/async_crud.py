@@ -0,0 +1,163 @@
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from fastapi import Depends
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.config import get_settings
+from api.database import get_async_session, run_with_sync_session
+from api.public.attrs import crud
+from api.public.attrs.cache import CachedFilterRead, get_filter_cache
+from api.public.attrs.models import (
+    AttrDataType,
+    TAttrDataTypeList,
+    TAttrFilterDataType,
+    get_pulse_attrs_class,
+)
+from api.utils.singleflight import AsyncSingleFlight
+
+# Coalesce identical concurrent reads, see api.public.attrs.crud
+_values_flight: AsyncSingleFlight[TAttrDataTypeList] = AsyncSingleFlight()
+_filter_flight: AsyncSingleFlight[tuple[list[tuple[Any, ...]], str | None]] = (
+    AsyncSingleFlight()
+)
+
+
+async def read_all_keys(
+    db: AsyncSession = Depends(get_async_session),
+) -> Sequence[tuple[str, str]]:
+    """Get all unique keys."""
+    return await run_with_sync_session(
+        db, lambda session: crud.read_all_keys(db=session)
+    )
+
+
+async def read_all_values_on_key(
+    key: str,
+    db: AsyncSession = Depends(get_async_session),
+) -> TAttrDataTypeList:
+    """Get all unique values associated with a key.
+
+    See api.public.attrs.crud.read_all_values_on_key.
+    """
+    data_types = await run_with_sync_session(
+        db,
+        lambda session: crud.read_key_data_types([key], db=session),
+    )
+    attrs_class = get_pulse_attrs_class(AttrDataType(data_types[key]))
+
+    async def read_values() -> TAttrDataTypeList:
+        return (
+            await db.exec(
+                select(attrs_class.value).where(attrs_class.key == key).distinct(),
+            )
+        ).all()
+
+    return await _values_flight.do((get_filter_cache().generation, key), read_values)
+
+
+async def filter_on_key_value_pairs(  # noqa: PLR0913
+    kv_pairs: Sequence[TAttrFilterDataType],
+    wanted_columns: list[str],
+    db: AsyncSession = Depends(get_async_session),
+    *,
+    limit: int | None = None,
+    cursor: str | None = None,
+    order_by: str | None = None,
+    descending: bool = False,
+) -> tuple[list[tuple[Any, ...]], str | None]:
+    """Get pulses that match the key-value pairs, and the cursor for the next page.
+
+    See api.public.attrs.crud.filter_on_key_value_pairs.
+    """
+    if limit is not None or cursor is not None:
+        order_by = order_by or crud.DEFAULT_FILTER_ORDER
+    cached_read = CachedFilterRead(
+        kv_pairs,
+        wanted_columns,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        descending=descending,
+    )
+    if cached_read.cached is not None:
+        return cached_read.cached
+
+    async def read_and_cache() -> tuple[list[tuple[Any, ...]], str | None]:
+        return cached_read.store(
+            await run_with_sync_session(
+                db,
+                lambda session: crud.read_filter_matches(
+                    kv_pairs,
+                    wanted_columns,
+                    session,
+                    limit=limit,
+                    cursor=cursor,
+                    order_by=order_by,
+                    descending=descending,
+                ),
+            ),
+        )
+
+    return await _filter_flight.do(cached_read.flight_key, read_and_cache)
+
+
+async def stream_filter_on_key_value_pairs(  # noqa: PLR0913
+    kv_pairs: Sequence[TAttrFilterDataType],
+    wanted_columns: list[str],
+    db: AsyncSession = Depends(get_async_session),
+    *,
+    limit: int | None = None,
+    cursor: str | None = None,
+    order_by: str | None = None,
+    descending: bool = False,
+) -> AsyncIterator[tuple[Any, ...]]:
+    """Get pulses that match the key-value pairs as they are read.
+
+    See api.public.attrs.crud.stream_filter_on_key_value_pairs.
+    """
+    if limit is not None or cursor is not None:
+        order_by = order_by or crud.DEFAULT_FILTER_ORDER
+    query = await run_with_sync_session(
+        db,
+        lambda session: crud.create_filter_pulses_query(
+            kv_pairs,
+            wanted_columns,
+            db=session,
+            limit=limit,
+            cursor=cursor,
+            order_by=order_by,
+            descending=descending,
+        ),
+    )
+    bind = db.bind
+
+    async def stream() -> AsyncIterator[tuple[Any, ...]]:
+        if query is None:
+            return
+        async with AsyncSession(bind) as stream_db:
+            rows = await stream_db.stream(
+                query,
+                execution_options={"yield_per": get_settings().STREAM_READ_BATCH_SIZE},
+            )
+            async for row in rows:
+                yield tuple(row[: len(wanted_columns)])
+
+    return stream()
+
+
+async def count_filter_matches(
+    kv_pairs: Sequence[TAttrFilterDataType],
+    db: AsyncSession = Depends(get_async_session),
+    *,
+    estimate: bool = False,
+) -> int:
+    """Count the pulses that match the key-value pairs.
+
+    See api.public.attrs.crud.count_filter_matches.
+    """
+    return await run_with_sync_session(
+        db,
+        lambda session: crud.count_filter_matches(kv_pairs, session, estimate=estimate),
+    )
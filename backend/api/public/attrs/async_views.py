@@ -0,0 +1,97 @@
+from collections.abc import Sequence
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.database import get_async_session
+from api.public.attrs.async_crud import (
+    count_filter_matches,
+    filter_on_key_value_pairs,
+    read_all_keys,
+    read_all_values_on_key,
+    stream_filter_on_key_value_pairs,
+)
+from api.public.attrs.models import TAttrDataTypeList, TAttrFilterDataType
+from api.utils.pagination import (
+    CURSOR_QUERY,
+    NEXT_CURSOR_HEADER,
+    TOTAL_COUNT_HEADER,
+)
+from api.utils.streaming import (
+    NDJSON_MEDIA_TYPE,
+    accepts_media_type,
+    stream_rows_ndjson,
+)
+from api.utils.types import TotalCount, TPulseColValue
+
+# Shadows the reads of api.public.attrs.views, which document the same API
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/keys")
+async def get_all_keys_async(
+    db: AsyncSession = Depends(get_async_session),
+) -> list[dict[str, str]]:
+    return [
+        {"name": key_and_type[0], "data_type": key_and_type[1]}
+        for key_and_type in await read_all_keys(db=db)
+    ]
+
+
+@router.get("/{key}/values")
+async def get_all_values_on_key_async(
+    key: str,
+    db: AsyncSession = Depends(get_async_session),
+) -> TAttrDataTypeList:
+    return await read_all_values_on_key(key=key, db=db)
+
+
+@router.post("/filter", response_model=Sequence[tuple[TPulseColValue, ...]])
+async def filter_attrs_async(  # noqa: PLR0913
+    request: Request,
+    kv_pairs: Sequence[TAttrFilterDataType],
+    columns: list[str],
+    response: Response,
+    limit: int | None = Query(default=None, ge=1),
+    cursor: str | None = CURSOR_QUERY,
+    order_by: str | None = None,
+    descending: bool = False,  # noqa: FBT001, FBT002
+    count: TotalCount | None = None,
+    db: AsyncSession = Depends(get_async_session),
+) -> Sequence[tuple[TPulseColValue, ...]] | Response:
+    headers: dict[str, str] = {}
+    if count is not None:
+        total = await count_filter_matches(
+            kv_pairs,
+            db,
+            estimate=count == TotalCount.ESTIMATED,
+        )
+        headers[TOTAL_COUNT_HEADER] = str(total)
+
+    if accepts_media_type(request, NDJSON_MEDIA_TYPE):
+        return stream_rows_ndjson(
+            await stream_filter_on_key_value_pairs(
+                kv_pairs,
+                columns,
+                db,
+                limit=limit,
+                cursor=cursor,
+                order_by=order_by,
+                descending=descending,
+            ),
+            headers=headers,
+        )
+
+    rows, next_cursor = await filter_on_key_value_pairs(
+        kv_pairs,
+        columns,
+        db,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        descending=descending,
+    )
+    if next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    response.headers.update(headers)
+    return rows
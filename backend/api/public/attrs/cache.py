@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Self, TypeAlias
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlmodel import SQLModel
+
+from api.config import get_settings
+from api.public.pulse.models import Pulse
+from api.utils.notifications import notify, subscribe
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Sequence
+
+    from sqlmodel import Session
+
+    from api.public.attrs.models import TAttrFilterDataType
+
+# Channel notified when pulses or attributes are written, see notify_pulses_written
+PULSE_WRITES_CHANNEL = "pulse_writes"
+
+TFilterResult: TypeAlias = "tuple[list[tuple[Any, ...]], str | None]"
+
+
+class FilterCacheStats(BaseModel):
+    generation: int
+    entries: int
+    size_bytes: int
+    max_size_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+def estimate_result_size(result: TFilterResult) -> int:
+    """Roughly estimate the memory used by a filter result, in bytes."""
+    rows, cursor = result
+    size = sys.getsizeof(rows) + sys.getsizeof(cursor)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+def make_filter_cache_key(  # noqa: PLR0913
+    kv_pairs: Sequence[TAttrFilterDataType],
+    wanted_columns: Sequence[str],
+    *,
+    limit: int | None,
+    cursor: str | None,
+    order_by: str | None,
+    descending: bool,
+) -> Hashable:
+    """Normalize a filter, so filters that only differ in order share a key."""
+    return (
+        tuple(sorted(kv_pair.model_dump_json() for kv_pair in kv_pairs)),
+        tuple(wanted_columns),
+        limit,
+        cursor,
+        order_by,
+        descending,
+    )
+
+
+class FilterResultCache:
+    """Process-local LRU cache of attribute filter results.
+
+    Every write of pulses or attributes bumps the write generation, which clears
+    the cache. A result is only cached if no write committed while it was being
+    queried, as it could otherwise be stale. The size of the cache is capped by
+    a rough estimate of the memory used by the cached results.
+    """
+
+    def __init__(self: Self, max_size_bytes: int) -> None:
+        self.max_size_bytes = max_size_bytes
+        self._results: OrderedDict[Hashable, tuple[TFilterResult, int]] = OrderedDict()
+        self._size_bytes = 0
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self: Self) -> int:
+        return self._generation
+
+    def get(self: Self, key: Hashable) -> TFilterResult | None:
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is None:
+                self._misses += 1
+                return None
+            self._results.move_to_end(key)
+            self._hits += 1
+            return cached[0]
+
+    def put(self: Self, key: Hashable, result: TFilterResult, generation: int) -> None:
+        """Cache the result of a query started at the given write generation."""
+        size = estimate_result_size(result)
+        if size > self.max_size_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            previous = self._results.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= previous[1]
+            self._results[key] = (result, size)
+            self._size_bytes += size
+            while self._size_bytes > self.max_size_bytes:
+                _, (_, evicted_size) = self._results.popitem(last=False)
+                self._size_bytes -= evicted_size
+                self._evictions += 1
+
+    def invalidate(self: Self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._results.clear()
+            self._size_bytes = 0
+
+    def stats(self: Self) -> FilterCacheStats:
+        with self._lock:
+            return FilterCacheStats(
+                generation=self._generation,
+                entries=len(self._results),
+                size_bytes=self._size_bytes,
+                max_size_bytes=self.max_size_bytes,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+
+class CachedFilterRead:
+    """A filter result read through the cache, shared by the sync and async crud.
+
+    The result is looked up when created. Otherwise, the caller queries it once
+    per flight_key, see api.utils.singleflight, and passes it to store.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self: Self,
+        kv_pairs: Sequence[TAttrFilterDataType],
+        wanted_columns: Sequence[str],
+        *,
+        limit: int | None,
+        cursor: str | None,
+        order_by: str | None,
+        descending: bool,
+    ) -> None:
+        self._cache = get_filter_cache()
+        self._key = make_filter_cache_key(
+            kv_pairs,
+            wanted_columns,
+            limit=limit,
+            cursor=cursor,
+            order_by=order_by,
+            descending=descending,
+        )
+        self.cached = self._cache.get(self._key)
+        self._generation = self._cache.generation
+
+    @property
+    def flight_key(self: Self) -> Hashable:
+        # Keying on the generation keeps callers from sharing a query that
+        # started before a write they made
+        return (self._generation, self._key)
+
+    def store(self: Self, result: TFilterResult) -> TFilterResult:
+        self._cache.put(self._key, result, self._generation)
+        return result
+
+
+@lru_cache
+def get_filter_cache() -> FilterResultCache:
+    return FilterResultCache(get_settings().FILTER_CACHE_MAX_BYTES)
+
+
+def _invalidate_filter_cache(*_args: Any, **_kwargs: Any) -> None:  # noqa: ANN401
+    get_filter_cache().invalidate()
+
+
+# Tables are dropped and recreated in development and tests
+_pulse_table = SQLModel.metadata.tables[str(Pulse.__tablename__)]
+event.listen(_pulse_table, "after_create", _invalidate_filter_cache)
+event.listen(_pulse_table, "after_drop", _invalidate_filter_cache)
+
+
+def notify_pulses_written(db: Session) -> None:
+    """Invalidate the filter result cache of all workers once db commits."""
+    notify(db, PULSE_WRITES_CHANNEL)
+
+
+subscribe(PULSE_WRITES_CHANNEL, _invalidate_filter_cache)
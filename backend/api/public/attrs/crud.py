@@ -1,82 +1,222 @@
-from collections.abc import Sequence
-from uuid import UUID
+from collections.abc import Iterator, Sequence
+from datetime import datetime
+from typing import Any
+from uuid import UUID, uuid4
 
 from fastapi import Depends
-from sqlalchemy.engine.row import Row
-from sqlalchemy.exc import NoResultFound
-from sqlmodel import Session, col, intersect, select
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    ColumnElement,
+    Float,
+    Integer,
+    Select,
+    String,
+    any_,
+    case,
+    distinct,
+    func,
+    literal,
+    null,
+    tuple_,
+)
+from sqlalchemy import select as sa_select
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, SQLModel, cast, col, select, union_all
 from sqlmodel.sql.expression import SelectOfScalar
 
+from api.config import get_settings
 from api.database import get_session
+from api.public.attrs.cache import (
+    CachedFilterRead,
+    get_filter_cache,
+    notify_pulses_written,
+)
 from api.public.attrs.models import (
+    STR_VALUE_INDEXED_LENGTH,
     AttrDataType,
+    AttrFacets,
+    AttrFloatFacet,
+    AttrStrFacet,
+    AttrValueCount,
     PulseAttrs,
     PulseAttrsCreateBase,
     PulseAttrsDatetimeFilter,
     PulseAttrsFilterBase,
     PulseAttrsFloat,
     PulseAttrsFloatFilter,
+    PulseAttrsFloatRead,
     PulseAttrsStr,
     PulseAttrsStrFilter,
+    PulseAttrsStrRead,
     PulseKeyRegistry,
     TAttrDataTypeList,
     TAttrFilterDataType,
     TAttrReadDataType,
     get_pulse_attrs_class,
-    get_pulse_attrs_read_class,
 )
+from api.public.attrs.registry import get_key_registry, notify_keys_registered
 from api.public.pulse.helpers import assert_pulses_exist
 from api.public.pulse.models import Pulse
+from api.utils.copy import copy_rows
 from api.utils.exceptions import (
     AttrDataTypeExistsError,
     AttrKeyDoesNotExistError,
+    PulseColumnNonexistentError,
     PulseNotFoundError,
 )
-from api.utils.helpers import get_model_columns_from_names
-from api.utils.types import TPulseCols
+from api.utils.helpers import get_model_columns_from_names, uuid_array
+from api.utils.pagination import decode_cursor, encode_cursor
+from api.utils.singleflight import SingleFlight
 
+ATTRS_COPY_COLUMNS = ("index", "pulse_id", "key", "value")
 
-def add_attrs(
+# Pulse columns filter results can be ordered by, and the sort keys of their cursors
+FILTER_CURSORS: dict[str, TypeAdapter[Any]] = {
+    "pulse_id": TypeAdapter(tuple[UUID]),
+    "creation_time": TypeAdapter(tuple[datetime, UUID]),
+    "integration_time_ms": TypeAdapter(tuple[int, UUID]),
+    "device_id": TypeAdapter(tuple[UUID, UUID]),
+}
+DEFAULT_FILTER_ORDER = "creation_time"
+
+# Coalesce identical concurrent reads, see filter_on_key_value_pairs
+_values_flight: SingleFlight[TAttrDataTypeList] = SingleFlight()
+_filter_flight: SingleFlight[tuple[list[tuple[Any, ...]], str | None]] = SingleFlight()
+
+
+def register_keys(
     pulses_attrs: Sequence[PulseAttrs],
     db: Session = Depends(get_session),
 ) -> None:
-    """Bulk inserts all the attributes for a list of pulses."""
-    # Find all unique keys and data types
-    unique_keys_set = set()
+    """Check the data types of all attribute keys and stage new keys.
+
+    Raises an AttrDataTypeExistsError if a key is already registered with another
+    data type, or is given with different data types. New keys are added to the
+    session, but not committed.
+    """
+    # Find the data type of every unique key
+    incoming_data_types: dict[str, AttrDataType] = {}
     for pulse_attrs in pulses_attrs:
         for attrs in pulse_attrs.pulse_attributes:
-            unique_keys_set.add((attrs.key, attrs.data_type))
-
-    unique_keys: list[str] = [e[0] for e in list(unique_keys_set)]
-    unique_keys_datatypes: list[AttrDataType] = [e[1] for e in list(unique_keys_set)]
+            incoming = AttrDataType(attrs.data_type)
+            data_type = incoming_data_types.setdefault(attrs.key, incoming)
+            if data_type != incoming:
+                raise AttrDataTypeExistsError(
+                    key=attrs.key,
+                    existing_data_type=data_type.value,
+                    incoming_data_type=incoming.value,
+                )
 
     # Raise an error if the data type of an existing key is wrong
-    known_keys = db.exec(
-        select(PulseKeyRegistry).where(col(PulseKeyRegistry.key).in_(unique_keys)),
+    known_keys = get_key_registry().get_data_types(
+        incoming_data_types,
+        db,
+    )
+    for known_key, known_data_type in known_keys.items():
+        if known_data_type != incoming_data_types[known_key]:
+            raise AttrDataTypeExistsError(
+                key=known_key,
+                existing_data_type=known_data_type,
+                incoming_data_type=incoming_data_types[known_key].value,
+            )
+
+    insert_keys(
+        {
+            key: data_type
+            for key, data_type in incoming_data_types.items()
+            if key not in known_keys
+        },
+        db=db,
+    )
+
+
+def insert_keys(
+    data_types: dict[str, AttrDataType],
+    db: Session = Depends(get_session),
+) -> None:
+    """Register keys, unless they are registered concurrently by another request.
+
+    Inserting a key waits for any transaction inserting the same key. If that
+    transaction commits, the key is skipped, and the data type it was registered
+    with is checked instead. Raises an AttrDataTypeExistsError if it differs.
+    Nothing is committed.
+    """
+    if not data_types:
+        return
+    inserted_keys = set(
+        db.execute(
+            postgresql.insert(PulseKeyRegistry)
+            .values(
+                [
+                    {"index": uuid4(), "key": key, "data_type": data_type.value}
+                    for key, data_type in data_types.items()
+                ],
+            )
+            .on_conflict_do_nothing(index_elements=[col(PulseKeyRegistry.key)])
+            .returning(col(PulseKeyRegistry.key)),
+        ).scalars(),
+    )
+    if inserted_keys:
+        notify_keys_registered(db)
+    if len(inserted_keys) == len(data_types):
+        return
+
+    registered_keys = db.exec(
+        select(PulseKeyRegistry.key, PulseKeyRegistry.data_type).where(
+            col(PulseKeyRegistry.key).in_(data_types.keys() - inserted_keys),
+        ),
     ).all()
-    for known_key in known_keys:
-        new_key_type = unique_keys_datatypes[unique_keys.index(known_key.key)]
-        if known_key.data_type != new_key_type:
+    for key, registered_data_type in registered_keys:
+        if registered_data_type != data_types[key]:
             raise AttrDataTypeExistsError(
-                key=known_key.key,
-                existing_data_type=known_key.data_type,
-                incoming_data_type=new_key_type,
+                key=key,
+                existing_data_type=registered_data_type,
+                incoming_data_type=data_types[key].value,
             )
 
-    # If some keys doesn't exist, add them to PulseKeyRegistry
-    new_keys: set[str] = set(unique_keys) - {key.key for key in known_keys}
-    for new_key in new_keys:
-        datatype = unique_keys_datatypes[unique_keys.index(new_key)]
-        db.add(PulseKeyRegistry(key=new_key, data_type=datatype))
 
-    # Add the new EAV attributes
+def add_attrs(
+    pulses_attrs: Sequence[PulseAttrs],
+    db: Session = Depends(get_session),
+) -> None:
+    """Stage all the attributes for a list of pulses.
+
+    The keys must already be registered with register_keys. Nothing is committed,
+    so the caller controls the transaction.
+    """
     for pulse_attrs in pulses_attrs:
         for attrs in pulse_attrs.pulse_attributes:
             attr_cls = get_pulse_attrs_class(attrs.data_type)
             db.add(attr_cls(pulse_id=pulse_attrs.pulse_id, **attrs.model_dump()))
+    notify_pulses_written(db)
 
-    # Finally, commit all changes
-    db.commit()
+
+def copy_attrs(
+    pulses_attrs: Sequence[PulseAttrs],
+    db: Session = Depends(get_session),
+) -> None:
+    """Write all the attributes for a list of pulses using PostgreSQL COPY.
+
+    The keys must already be registered with register_keys. Nothing is committed,
+    so the caller controls the transaction.
+    """
+    # Write staged keys before the attributes referencing them
+    db.flush()
+
+    for data_type in AttrDataType:
+        attrs_class = get_pulse_attrs_class(data_type)
+        copy_rows(
+            db=db,
+            table=str(attrs_class.__tablename__),
+            columns=ATTRS_COPY_COLUMNS,
+            rows=(
+                (uuid4(), pulse_attrs.pulse_id, attrs.key, attrs.value)
+                for pulse_attrs in pulses_attrs
+                for attrs in pulse_attrs.pulse_attributes
+                if attrs.data_type == data_type
+            ),
+        )
+    notify_pulses_written(db)
 
 
 def add_attr(
@@ -89,26 +229,26 @@ def add_attr(
     if not pulse:
         raise PulseNotFoundError(pulse_id=pulse_id)
 
-    existing_key = db.exec(
-        select(PulseKeyRegistry).where(PulseKeyRegistry.key == kv_pair.key),
-    ).first()
+    existing_data_type = (
+        get_key_registry().get_data_types([kv_pair.key], db).get(kv_pair.key)
+    )
     # Check if key already exists and if so, check if data type matches
-    if existing_key and existing_key.data_type != kv_pair.data_type:
+    if existing_data_type and existing_data_type != kv_pair.data_type:
         raise AttrDataTypeExistsError(
             key=kv_pair.key,
-            existing_data_type=existing_key.data_type,
+            existing_data_type=existing_data_type,
             incoming_data_type=kv_pair.data_type.value,
         )
 
     # If key doesn't exist, add it to PulseKeyRegistry
-    if not existing_key:
-        new_key = PulseKeyRegistry(key=kv_pair.key, data_type=kv_pair.data_type)
-        db.add(new_key)
+    if not existing_data_type:
+        insert_keys({kv_pair.key: AttrDataType(kv_pair.data_type)}, db=db)
 
     # Now, add the new EAV attribute
     pulse_attrs_class = get_pulse_attrs_class(AttrDataType(kv_pair.data_type))
 
     db.add(pulse_attrs_class(**kv_pair.model_dump(warnings="none"), pulse_id=pulse_id))
+    notify_pulses_written(db)
     db.commit()
 
 
@@ -126,22 +266,34 @@ def read_pulse_attrs(
         pulse_id: [] for pulse_id in pulse_ids
     }
 
-    # Read attrs for all data types
-    for data_type in AttrDataType:
-        attrs_class = get_pulse_attrs_class(data_type)
-        attrs_read_class = get_pulse_attrs_read_class(data_type)
-        loaded_attrs = db.exec(
-            select(attrs_class).where(col(attrs_class.pulse_id).in_(pulse_ids)),
-        ).all()
+    # Read attrs for all data types in a single round trip.
+    # String and float values are kept in separate columns, as UNION ALL requires
+    # all branches to have the same column types.
+    wanted_ids = uuid_array(pulse_ids)
+    rows = db.execute(
+        union_all(
+            select(
+                PulseAttrsStr.pulse_id,
+                PulseAttrsStr.key,
+                col(PulseAttrsStr.value).label("str_value"),
+                cast(null(), Float).label("float_value"),
+            ).where(col(PulseAttrsStr.pulse_id) == any_(wanted_ids)),
+            select(
+                PulseAttrsFloat.pulse_id,
+                PulseAttrsFloat.key,
+                cast(null(), String).label("str_value"),
+                col(PulseAttrsFloat.value).label("float_value"),
+            ).where(col(PulseAttrsFloat.pulse_id) == any_(wanted_ids)),
+        ),
+    ).all()
 
-        # Add loaded attrs to results
-        for pulse_id in pulse_ids:
-            for attr in loaded_attrs:
-                # Mypy thinks attr is PulseAttrsBase, which is wrong
-                if attr.pulse_id == pulse_id:  # type: ignore[attr-defined]
-                    results[pulse_id].append(
-                        attrs_read_class.model_validate(attr),
-                    )
+    # The values come straight from typed columns, so skip validation
+    for pulse_id, key, str_value, float_value in rows:
+        results[pulse_id].append(
+            PulseAttrsStrRead.model_construct(key=key, value=str_value)
+            if float_value is None
+            else PulseAttrsFloatRead.model_construct(key=key, value=float_value),
+        )
 
     return results
 
@@ -150,91 +302,489 @@ def read_all_keys(
     db: Session = Depends(get_session),
 ) -> Sequence[tuple[str, str]]:
     """Get all unique keys."""
-    statement = select(PulseKeyRegistry.key, PulseKeyRegistry.data_type).distinct()
-    return db.exec(statement).all()
+    return sorted(get_key_registry().get_all(db).items())
+
+
+def read_key_data_types(
+    keys: Sequence[str],
+    db: Session = Depends(get_session),
+) -> dict[str, str]:
+    """Get the data types of keys from the key registry cache.
+
+    Raises an AttrKeyDoesNotExistError listing all keys that do not exist.
+    """
+    unique_keys = list(dict.fromkeys(keys))
+    if not unique_keys:
+        return {}
+    key_data_types = get_key_registry().get_data_types(
+        unique_keys,
+        db,
+    )
+    missing_keys = [key for key in unique_keys if key not in key_data_types]
+    if missing_keys:
+        raise AttrKeyDoesNotExistError(key=missing_keys)
+    return key_data_types
 
 
 def read_all_values_on_key(
     key: str,
     db: Session = Depends(get_session),
 ) -> TAttrDataTypeList:
-    """Get all unique values associated with a key."""
-    # Get key if it exists from PulseKeyRegistry
-    existing_key = db.exec(
-        select(PulseKeyRegistry).where(PulseKeyRegistry.key == key),
-    ).first()
-    if not existing_key:
-        raise AttrKeyDoesNotExistError(key=key)
-
-    attrs_class = get_pulse_attrs_class(AttrDataType(existing_key.data_type))
-    return db.exec(
-        select(attrs_class.value).where(attrs_class.key == key).distinct(),
-    ).all()
+    """Get all unique values associated with a key.
+
+    Concurrent calls for the same key share one query, see filter_on_key_value_pairs.
+    """
+    data_type = read_key_data_types([key], db=db)[key]
+    attrs_class = get_pulse_attrs_class(AttrDataType(data_type))
+
+    def read_values() -> TAttrDataTypeList:
+        return db.exec(
+            select(attrs_class.value).where(attrs_class.key == key).distinct(),
+        ).all()
+
+    return _values_flight.do((get_filter_cache().generation, key), read_values)
 
 
-def filter_on_key_value_pairs(
+def filter_on_key_value_pairs(  # noqa: PLR0913
     kv_pairs: Sequence[TAttrFilterDataType],
     wanted_columns: list[str],
     db: Session = Depends(get_session),
-) -> Sequence[tuple[TPulseCols, ...]]:
-    """Get all pulses that match the key-value pairs."""
-    # Initialize a list to hold pulse_ids for each condition
-    select_statements: list[SelectOfScalar[UUID]] = []
+    *,
+    limit: int | None = None,
+    cursor: str | None = None,
+    order_by: str | None = None,
+    descending: bool = False,
+) -> tuple[list[tuple[Any, ...]], str | None]:
+    """Get pulses that match the key-value pairs, and the cursor for the next page.
+
+    Without limit, cursor and order_by, all matching pulses are returned in no
+    particular order. Otherwise, pulses are ordered by order_by and then pulse_id,
+    and the cursor is returned if the page is full. Results are cached until
+    pulses or attributes are written.
+    """
+    if limit is not None or cursor is not None:
+        order_by = order_by or DEFAULT_FILTER_ORDER
+    cached_read = CachedFilterRead(
+        kv_pairs,
+        wanted_columns,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        descending=descending,
+    )
+    if cached_read.cached is not None:
+        return cached_read.cached
+
+    def read_and_cache() -> tuple[list[tuple[Any, ...]], str | None]:
+        return cached_read.store(
+            read_filter_matches(
+                kv_pairs,
+                wanted_columns,
+                db,
+                limit=limit,
+                cursor=cursor,
+                order_by=order_by,
+                descending=descending,
+            ),
+        )
+
+    # Identical filters share one query until it is done
+    return _filter_flight.do(cached_read.flight_key, read_and_cache)
 
-    # If no filters applied, select all pulses
-    if len(kv_pairs) == 0:
-        # Using exec(..), if pulse_fields is a tuple with a single attribute,
-        # a list of integers is returned.
-        # If it contains more than one attribute, a list of Row objects is returned,
-        # and the type annotation is not correct. Hence, use SQLAlchemy method.
-        pulses = db.execute(
-            select(*get_model_columns_from_names(wanted_columns, Pulse)),
-        ).all()
-        if not pulses:
-            return []
-        if isinstance(pulses[0], Row):
-            return [tuple(e) for e in pulses]
-        raise TypeError
 
+def read_filter_matches(  # noqa: PLR0913
+    kv_pairs: Sequence[TAttrFilterDataType],
+    wanted_columns: list[str],
+    db: Session,
+    *,
+    limit: int | None,
+    cursor: str | None,
+    order_by: str | None,
+    descending: bool,
+) -> tuple[list[tuple[Any, ...]], str | None]:
+    """Read a page of filter_on_key_value_pairs, bypassing the cache."""
+    query = create_filter_pulses_query(
+        kv_pairs,
+        wanted_columns,
+        db=db,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        descending=descending,
+    )
+    if query is None:
+        return [], None
+
+    rows = db.execute(query).all()
+    next_cursor = None
+    if order_by is not None and limit is not None and len(rows) == limit:
+        # The sort key is selected after the wanted columns
+        next_cursor = encode_cursor(
+            FILTER_CURSORS[order_by],
+            tuple(rows[-1][len(wanted_columns) :]),
+        )
+    return [tuple(row[: len(wanted_columns)]) for row in rows], next_cursor
+
+
+def stream_filter_on_key_value_pairs(  # noqa: PLR0913
+    kv_pairs: Sequence[TAttrFilterDataType],
+    wanted_columns: list[str],
+    db: Session = Depends(get_session),
+    *,
+    limit: int | None = None,
+    cursor: str | None = None,
+    order_by: str | None = None,
+    descending: bool = False,
+) -> Iterator[tuple[Any, ...]]:
+    """Get pulses that match the key-value pairs as they are read.
+
+    Like filter_on_key_value_pairs, but only a batch of rows is held in memory at a
+    time, and no cursor is made. Everything that can fail is checked before
+    returning. The rows are then read with a server-side cursor in a session of
+    their own, so the iterator can be consumed after db is closed, e.g. by a
+    StreamingResponse.
+    """
+    if limit is not None or cursor is not None:
+        order_by = order_by or DEFAULT_FILTER_ORDER
+    query = create_filter_pulses_query(
+        kv_pairs,
+        wanted_columns,
+        db=db,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        descending=descending,
+    )
+    if query is None:
+        return iter(())
+    bind = db.get_bind()
+
+    def stream() -> Iterator[tuple[Any, ...]]:
+        with Session(bind) as stream_db:
+            rows = stream_db.execute(
+                query,
+                execution_options={"yield_per": get_settings().STREAM_READ_BATCH_SIZE},
+            )
+            for row in rows:
+                yield tuple(row[: len(wanted_columns)])
+
+    return stream()
+
+
+def create_filter_pulses_query(  # noqa: PLR0913
+    kv_pairs: Sequence[TAttrFilterDataType],
+    wanted_columns: list[str],
+    db: Session = Depends(get_session),
+    *,
+    limit: int | None = None,
+    cursor: str | None = None,
+    order_by: str | None = None,
+    descending: bool = False,
+) -> Select[Any] | None:
+    """Create a query for the wanted columns of pulses matching the key-value pairs.
+
+    If order_by is given, the query is paginated with paginate_filter_query.
+    Returns None if a key-value pair matches no pulses.
+    """
+    columns = get_model_columns_from_names(wanted_columns, Pulse)
+    if order_by is not None and order_by not in FILTER_CURSORS:
+        raise PulseColumnNonexistentError(wanted=order_by, columns=list(FILTER_CURSORS))
+
+    selected: list[Any] = list(columns)
+    query = sa_select(*selected).select_from(Pulse)
+    if kv_pairs:
+        combined_select = create_combined_filter_query(kv_pairs, db=db)
+        if combined_select is None:
+            return None
+        # If only the pulse_id is requested, we don't need to join
+        if wanted_columns == ["pulse_id"] and order_by is None:
+            return combined_select
+        sub_query = combined_select.subquery("sub_query")
+        query = query.join(sub_query, col(Pulse.pulse_id) == sub_query.c.pulse_id)
+
+    if order_by is None:
+        return query
+    return paginate_filter_query(
+        query,
+        order_by,
+        limit=limit,
+        cursor=cursor,
+        descending=descending,
+    )
+
+
+def paginate_filter_query(
+    query: Select[Any],
+    order_by: str,
+    *,
+    limit: int | None,
+    cursor: str | None,
+    descending: bool,
+) -> Select[Any]:
+    """Order a query for pulses by order_by and then pulse_id, for keyset pagination.
+
+    The sort key is added to the selected columns, so cursors can be made from the
+    last row.
+    """
+    pulse_columns = SQLModel.metadata.tables[str(Pulse.__tablename__)].c
+    key_columns = [pulse_columns[order_by]]
+    if order_by != "pulse_id":
+        key_columns.append(pulse_columns.pulse_id)
+
+    if cursor is not None:
+        key = tuple_(
+            *(
+                literal(value, key_column.type)
+                for value, key_column in zip(
+                    decode_cursor(FILTER_CURSORS[order_by], cursor),
+                    key_columns,
+                    strict=True,
+                )
+            ),
+        )
+        query = query.where(
+            tuple_(*key_columns) < key if descending else tuple_(*key_columns) > key,
+        )
+    return (
+        query.add_columns(*key_columns)
+        .order_by(
+            *(column.desc() if descending else column for column in key_columns),
+        )
+        .limit(limit)
+    )
+
+
+def count_filter_matches(
+    kv_pairs: Sequence[TAttrFilterDataType],
+    db: Session = Depends(get_session),
+    *,
+    estimate: bool = False,
+) -> int:
+    """Count the pulses that match the key-value pairs.
+
+    An estimate is read from the query plan, so it is much cheaper than an exact
+    count for broad filters, but can be far off.
+    """
+    query: Select[tuple[UUID]] | None = sa_select(col(Pulse.pulse_id))
+    if kv_pairs:
+        query = create_combined_filter_query(kv_pairs, db=db)
+    if query is None:
+        return 0
+
+    if not estimate:
+        return int(
+            db.execute(
+                sa_select(func.count()).select_from(query.subquery()),
+            ).scalar_one(),
+        )
+    # Filter values are rendered by SQLAlchemy's literal processors, and the
+    # statement is executed without parameters, so they are never interpolated.
+    statement = query.compile(
+        dialect=db.get_bind().dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+    plan = (
+        db.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}")
+        .scalar_one()
+    )
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def create_combined_filter_query(
+    kv_pairs: Sequence[TAttrFilterDataType],
+    db: Session = Depends(get_session),
+) -> Select[tuple[UUID]] | None:
+    """Create a query for the IDs of pulses matching all key-value pairs.
+
+    Returns None if a key-value pair matches no pulses.
+    """
+    # Look up the data types of all keys at once
+    key_data_types = read_key_data_types(
+        [kv.key for kv in kv_pairs if not isinstance(kv, PulseAttrsDatetimeFilter)],
+        db=db,
+    )
+
+    select_statements: list[SelectOfScalar[UUID]] = []
     for kv in kv_pairs:
         # Because creation_time is in the pulses table, we need to handle it separately
         # As we do not allow datetime attrs, we can simply check the instance type
         if isinstance(kv, PulseAttrsDatetimeFilter):
             select_statements.append(create_attr_creation_time_filter_query(kv))
             continue
-        try:
-            kv_data_type = db.exec(
-                select(PulseKeyRegistry.data_type).where(
-                    PulseKeyRegistry.key == kv.key,
-                ),
-            ).one()
-        except NoResultFound as e:
-            raise AttrKeyDoesNotExistError(key=kv.key) from e
-        select_statements.append(create_filter_query(kv, kv_data_type))
-
-    combined_select = intersect(*select_statements)
-
-    # We need to use SQLAlchemy's execute method here because we need to
-    # run a compound select statement.
-    # Additionally, if only the pulse_id is requested, we don't need to join
-    if wanted_columns == ["pulse_id"]:
-        r = db.execute(combined_select).unique().all()
-    else:
-        sub_query = combined_select.subquery("sub_query")
-        # Use SQLAlchemy's execute method, because SQLModel has wrong types and doesn't
-        # know .unique() and .all()
-        r = (
-            db.execute(
-                select(*get_model_columns_from_names(wanted_columns, Pulse)).join(
-                    sub_query,
-                    col(Pulse.pulse_id) == sub_query.c.pulse_id,
-                ),
+        select_statements.append(create_filter_query(kv, key_data_types[kv.key]))
+
+    return combine_filter_queries(select_statements, db=db)
+
+
+def read_facets(
+    kv_pairs: Sequence[TAttrFilterDataType],
+    bins: int = 10,
+    db: Session = Depends(get_session),
+) -> AttrFacets:
+    """Summarize the attributes of all pulses that match the key-value pairs.
+
+    String keys get the number of matching pulses with each value, and float keys a
+    histogram with the given number of bins. Both are computed with grouped
+    aggregates in a single query.
+    """
+    str_filters: list[ColumnElement[bool]] = []
+    float_filters: list[ColumnElement[bool]] = []
+    if kv_pairs:
+        combined_select = create_combined_filter_query(kv_pairs, db=db)
+        if combined_select is None:
+            return AttrFacets(str_facets=[], float_facets=[])
+        matched = combined_select.cte("matched")
+        str_filters.append(
+            col(PulseAttrsStr.pulse_id).in_(sa_select(matched.c.pulse_id)),
+        )
+        float_filters.append(
+            col(PulseAttrsFloat.pulse_id).in_(sa_select(matched.c.pulse_id)),
+        )
+
+    bounds = (
+        sa_select(
+            col(PulseAttrsFloat.key),
+            func.min(PulseAttrsFloat.value).label("min_value"),
+            func.max(PulseAttrsFloat.value).label("max_value"),
+        )
+        .where(*float_filters)
+        .group_by(PulseAttrsFloat.key)
+        .cte("bounds")
+    )
+    # width_bucket puts the max value in an extra bin, and needs distinct bounds
+    bucket = case(
+        (bounds.c.min_value == bounds.c.max_value, 1),
+        else_=func.least(
+            func.width_bucket(
+                PulseAttrsFloat.value,
+                bounds.c.min_value,
+                bounds.c.max_value,
+                bins,
+            ),
+            bins,
+        ),
+    ).label("bucket")
+
+    # As in read_pulse_attrs, the branches have the same column types
+    rows = db.execute(
+        union_all(
+            sa_select(
+                col(PulseAttrsStr.key),
+                col(PulseAttrsStr.value).label("str_value"),
+                cast(null(), Integer).label("bucket"),
+                cast(null(), Float).label("min_value"),
+                cast(null(), Float).label("max_value"),
+                func.count(distinct(col(PulseAttrsStr.pulse_id))).label("count"),
             )
-            .unique()
-            .all()
+            .where(*str_filters)
+            .group_by(PulseAttrsStr.key, PulseAttrsStr.value),
+            sa_select(
+                col(PulseAttrsFloat.key),
+                cast(null(), String).label("str_value"),
+                bucket,
+                bounds.c.min_value,
+                bounds.c.max_value,
+                func.count().label("count"),
+            )
+            .join(bounds, bounds.c.key == PulseAttrsFloat.key)
+            .where(*float_filters)
+            .group_by(
+                PulseAttrsFloat.key,
+                bucket,
+                bounds.c.min_value,
+                bounds.c.max_value,
+            ),
+        ),
+    ).all()
+
+    str_facets: dict[str, AttrStrFacet] = {}
+    float_facets: dict[str, AttrFloatFacet] = {}
+    for key, str_value, bucket_number, min_value, max_value, count in rows:
+        if bucket_number is None:
+            str_facet = str_facets.setdefault(key, AttrStrFacet(key=key, counts=[]))
+            str_facet.counts.append(AttrValueCount(value=str_value, count=count))
+            continue
+        float_facet = float_facets.setdefault(
+            key,
+            AttrFloatFacet(
+                key=key,
+                min_value=min_value,
+                max_value=max_value,
+                histogram=[0] * bins,
+            ),
         )
+        float_facet.histogram[bucket_number - 1] = count
+
+    # Most common values first
+    for str_facet in str_facets.values():
+        str_facet.counts.sort(key=lambda counted: (-counted.count, counted.value))
+    return AttrFacets(
+        str_facets=[str_facets[key] for key in sorted(str_facets)],
+        float_facets=[float_facets[key] for key in sorted(float_facets)],
+    )
+
 
-    return [tuple(e) for e in r]
+def estimate_filter_sizes(
+    select_statements: Sequence[SelectOfScalar[UUID]],
+    db: Session = Depends(get_session),
+) -> list[int]:
+    """Count the pulses matching each filter, up to FILTER_ESTIMATE_LIMIT.
+
+    The filters are covered by indexes, so each count is an index-only scan of a
+    bounded number of entries. All filters are counted in a single round trip.
+    """
+    limit = get_settings().FILTER_ESTIMATE_LIMIT
+    counts = db.execute(
+        sa_select(
+            *(
+                sa_select(func.count())
+                .select_from(statement.limit(limit).subquery())
+                .scalar_subquery()
+                for statement in select_statements
+            ),
+        ),
+    ).one()
+    return list(counts)
+
+
+def combine_filter_queries(
+    select_statements: Sequence[SelectOfScalar[UUID]],
+    db: Session = Depends(get_session),
+) -> Select[tuple[UUID]] | None:
+    """Combine filters into a query for the pulse IDs matching all of them.
+
+    The most selective filter drives the query, and the others are only probed
+    with EXISTS for its matches. Unlike an INTERSECT, no filter but the driving one
+    is ever evaluated in full. Returns None if a filter matches no pulses.
+    """
+    if len(select_statements) > 1:
+        sizes = estimate_filter_sizes(select_statements, db=db)
+        if min(sizes) == 0:
+            return None
+        # Stable, so filters matching more than the limit keep the request order
+        select_statements = [
+            statement
+            for _, statement in sorted(
+                zip(sizes, select_statements, strict=True),
+                key=lambda pair: pair[0],
+            )
+        ]
+
+    driving, *probes = select_statements
+    driving_query = driving.subquery("driving")
+    return (
+        sa_select(driving_query.c.pulse_id)
+        .where(
+            *(
+                probe.where(
+                    probe.selected_columns[0] == driving_query.c.pulse_id,
+                ).exists()
+                for probe in probes
+            ),
+        )
+        .distinct()
+    )
 
 
 def create_filter_query(
@@ -263,9 +813,13 @@ def create_attr_creation_time_filter_query(
 
 
 def create_attr_str_filter_query(kv_pair: PulseAttrsStrFilter) -> SelectOfScalar[UUID]:
+    # The index only holds the start of values, which the whole value is checked
+    # against afterwards
+    value_prefix = func.left(col(PulseAttrsStr.value), STR_VALUE_INDEXED_LENGTH)
     return (
         select(PulseAttrsStr.pulse_id)
         .where(PulseAttrsStr.key == kv_pair.key)
+        .where(value_prefix == kv_pair.value[:STR_VALUE_INDEXED_LENGTH])
         .where(PulseAttrsStr.value == kv_pair.value)
     )
 
@@ -12,6 +12,7 @@ from uuid import UUID, uuid4
 from pydantic import BaseModel
 from pydantic.functional_validators import field_validator
 from pydantic.types import StrictFloat, StrictInt, StrictStr
+from sqlalchemy import Index, column, func
 from sqlmodel import Field, SQLModel
 
 from api.utils.exceptions import AttrDataTypeDoesNotExistError
@@ -22,6 +23,10 @@ from api.utils.exceptions import AttrDataTypeDoesNotExistError
 TAttrDataType: TypeAlias = StrictStr | StrictFloat
 TAttrDataTypeList: TypeAlias = Sequence[StrictStr] | Sequence[StrictFloat]
 
+# Characters of string values that are indexed. Btree entries must fit in a
+# third of a page, so longer values are only compared after the index lookup.
+STR_VALUE_INDEXED_LENGTH = 256
+
 
 class AttrDict(TypedDict):
     key: str
@@ -58,6 +63,15 @@ class PulseAttrsStr(PulseAttrsBase, table=True):
     """The purpose of this class is to interact with the database."""
 
     __tablename__ = "pulse_str_attrs"
+    # Covers filters on a key and value, see create_attr_str_filter_query
+    __table_args__ = (
+        Index(
+            "ix_pulse_str_attrs_key_value_prefix_pulse_id",
+            "key",
+            func.left(column("value"), STR_VALUE_INDEXED_LENGTH),
+            "pulse_id",
+        ),
+    )
 
     value: StrictStr
     pulse_id: UUID = Field(foreign_key="pulses.pulse_id", index=True)
@@ -93,6 +107,10 @@ class PulseAttrsFloat(PulseAttrsBase, table=True):
     """The purpose of this class is to interact with the database."""
 
     __tablename__ = "pulse_float_attrs"
+    # Covers filters on a key and value, see create_attr_*_filter_query
+    __table_args__ = (
+        Index("ix_pulse_float_attrs_key_value_pulse_id", "key", "value", "pulse_id"),
+    )
 
     value: StrictFloat
     pulse_id: UUID = Field(foreign_key="pulses.pulse_id", index=True)
@@ -138,6 +156,35 @@ class PulseAttrsDatetimeFilter(PulseAttrsFilterBase):
     max_value: datetime
 
 
+class AttrValueCount(SQLModel):
+    value: StrictStr
+    count: int
+
+
+class AttrStrFacet(SQLModel):
+    """Number of matching pulses with each value of a string key."""
+
+    key: str
+    counts: list[AttrValueCount]
+
+
+class AttrFloatFacet(SQLModel):
+    """Histogram of the values of a float key for matching pulses.
+
+    The histogram counts values in equal-width bins from min_value to max_value.
+    """
+
+    key: str
+    min_value: float
+    max_value: float
+    histogram: list[int]
+
+
+class AttrFacets(SQLModel):
+    str_facets: list[AttrStrFacet]
+    float_facets: list[AttrFloatFacet]
+
+
 # Has to be defined after definition of both classes
 TPulseAttrsCreate: TypeAlias = PulseAttrsStrCreate | PulseAttrsFloatCreate
 TAttrReadDataType: TypeAlias = PulseAttrsStrRead | PulseAttrsFloatRead
@@ -178,7 +225,7 @@ class PulseKeyRegistry(SQLModel, table=True):
 
     __tablename__ = "pulse_key_registry"
 
-    key: str
+    key: str = Field(unique=True, index=True)
     data_type: str
 
     index: UUID = Field(default_factory=uuid4, primary_key=True)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Self
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel
+from sqlmodel import select as sql_select
+
+from api.public.attrs.models import PulseKeyRegistry
+from api.utils.notifications import PENDING_NOTIFICATIONS_INFO, notify, subscribe
+
+if TYPE_CHECKING:
+    from collections.abc import Collection
+
+# Channel notified when keys are registered, see notify_keys_registered
+KEY_REGISTRY_CHANNEL = "pulse_key_registry"
+
+
+class KeyRegistryCache:
+    """Process-local cache of the data type of every registered key.
+
+    Keys are never unregistered and their data types never change, so cached keys
+    stay valid. Registering keys invalidates the cache of every worker through
+    LISTEN/NOTIFY (see notify_keys_registered), so keys missing from a loaded cache
+    are taken to be unregistered until the next invalidation. In case a
+    notification is lost, misses reload the registry at most every
+    MISS_RELOAD_INTERVAL seconds.
+    """
+
+    MISS_RELOAD_INTERVAL = 1.0
+
+    def __init__(self: Self) -> None:
+        self._data_types: dict[str, str] | None = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_data_types(
+        self: Self,
+        keys: Collection[str],
+        db: Session,
+    ) -> dict[str, str]:
+        """Get the data types of the given keys that are registered."""
+        data_types = self._data_types
+        if data_types is None or (
+            any(key not in data_types for key in keys)
+            and (_registers_keys(db) or self._claim_miss_reload())
+        ):
+            data_types = self.reload(db)
+        return {key: data_types[key] for key in keys if key in data_types}
+
+    def get_all(self: Self, db: Session) -> dict[str, str]:
+        """Get the data types of all registered keys."""
+        data_types = self._data_types
+        return dict(data_types if data_types is not None else self.reload(db))
+
+    def reload(self: Self, db: Session) -> dict[str, str]:
+        """Load the registry on the connection of db.
+
+        Keys registered by the uncommitted transaction of db are returned, but the
+        registry is not cached, as they are discarded if it rolls back. Misses in
+        such a transaction always reload, as the cache is invalidated on commit.
+        """
+        generation = self._generation
+        data_types = dict(
+            db.exec(
+                sql_select(PulseKeyRegistry.key, PulseKeyRegistry.data_type),
+            ).all(),
+        )
+        with self._lock:
+            # Do not cache a registry read before an invalidation
+            if self._generation == generation and not _registers_keys(db):
+                self._data_types = data_types
+                self._loaded_at = time.monotonic()
+        return data_types
+
+    def invalidate(self: Self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data_types = None
+
+    def _claim_miss_reload(self: Self) -> bool:
+        # Concurrent misses share one reload, the others use the cache as is
+        with self._lock:
+            now = time.monotonic()
+            if now - self._loaded_at < self.MISS_RELOAD_INTERVAL:
+                return False
+            self._loaded_at = now
+            return True
+
+
+def _registers_keys(db: Session) -> bool:
+    """Whether the transaction of db registered keys, see notify_keys_registered."""
+    return KEY_REGISTRY_CHANNEL in db.info.get(PENDING_NOTIFICATIONS_INFO, ())
+
+
+@lru_cache
+def get_key_registry() -> KeyRegistryCache:
+    return KeyRegistryCache()
+
+
+def _invalidate_key_registry(*_args: Any, **_kwargs: Any) -> None:  # noqa: ANN401
+    get_key_registry().invalidate()
+
+
+# Tables are dropped and recreated in development and tests
+_key_registry_table = SQLModel.metadata.tables[str(PulseKeyRegistry.__tablename__)]
+event.listen(_key_registry_table, "after_create", _invalidate_key_registry)
+event.listen(_key_registry_table, "after_drop", _invalidate_key_registry)
+
+
+def notify_keys_registered(db: Session) -> None:
+    """Invalidate the key registry cache of all workers once db commits."""
+    notify(db, KEY_REGISTRY_CHANNEL)
+
+
+subscribe(KEY_REGISTRY_CHANNEL, _invalidate_key_registry)
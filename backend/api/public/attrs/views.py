@@ -1,16 +1,37 @@
 from collections.abc import Sequence
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
 from sqlmodel import Session
 
 from api.database import get_session
+from api.public.attrs.cache import FilterCacheStats, get_filter_cache
 from api.public.attrs.crud import (
+    FILTER_CURSORS,
+    count_filter_matches,
     filter_on_key_value_pairs,
     read_all_keys,
     read_all_values_on_key,
+    read_facets,
+    stream_filter_on_key_value_pairs,
 )
-from api.public.attrs.models import TAttrDataTypeList, TAttrFilterDataType
-from api.utils.types import TPulseCols
+from api.public.attrs.models import (
+    AttrFacets,
+    TAttrDataTypeList,
+    TAttrFilterDataType,
+)
+from api.utils.pagination import (
+    CURSOR_QUERY,
+    NEXT_CURSOR_HEADER,
+    NEXT_CURSOR_RESPONSE,
+    TOTAL_COUNT_HEADER,
+    TOTAL_COUNT_RESPONSE,
+)
+from api.utils.streaming import (
+    NDJSON_MEDIA_TYPE,
+    accepts_media_type,
+    stream_rows_ndjson,
+)
+from api.utils.types import TotalCount, TPulseCols, TPulseColValue
 
 router = APIRouter()
 
@@ -31,10 +52,98 @@ def get_all_values_on_key(
     return read_all_values_on_key(key=key, db=db)
 
 
-@router.post("/filter")
-def filter_attrs(
+@router.post(
+    "/filter",
+    response_model=Sequence[tuple[TPulseColValue, ...]],
+    responses={
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}},
+            "description": (
+                "Matching pulses as JSON. If "
+                f"'{NDJSON_MEDIA_TYPE}' is given in the Accept header, they are "
+                "streamed as they are read, one JSON array per line, without "
+                f"{NEXT_CURSOR_HEADER}."
+            ),
+            "headers": NEXT_CURSOR_RESPONSE[200]["headers"]
+            | TOTAL_COUNT_RESPONSE[200]["headers"],
+        },
+    },
+)
+def filter_attrs(  # noqa: PLR0913
+    request: Request,
     kv_pairs: Sequence[TAttrFilterDataType],
     columns: list[str],
+    response: Response,
+    limit: int | None = Query(
+        default=None,
+        ge=1,
+        description="Return at most this many pulses. By default, all are returned.",
+    ),
+    cursor: str | None = CURSOR_QUERY,
+    order_by: str | None = Query(
+        default=None,
+        description=(
+            f"Order pulses by one of {', '.join(FILTER_CURSORS)}, and then pulse_id. "
+            "Defaults to creation_time when paginating, otherwise pulses are "
+            "returned in no particular order."
+        ),
+    ),
+    descending: bool = Query(default=False),  # noqa: FBT001
+    count: TotalCount | None = Query(
+        default=None,
+        description=f"Return the number of matching pulses in {TOTAL_COUNT_HEADER}.",
+    ),
+    db: Session = Depends(get_session),
+) -> Sequence[tuple[TPulseCols, ...]] | Response:
+    headers: dict[str, str] = {}
+    if count is not None:
+        total = count_filter_matches(
+            kv_pairs,
+            db,
+            estimate=count == TotalCount.ESTIMATED,
+        )
+        headers[TOTAL_COUNT_HEADER] = str(total)
+
+    if accepts_media_type(request, NDJSON_MEDIA_TYPE):
+        return stream_rows_ndjson(
+            stream_filter_on_key_value_pairs(
+                kv_pairs,
+                columns,
+                db,
+                limit=limit,
+                cursor=cursor,
+                order_by=order_by,
+                descending=descending,
+            ),
+            headers=headers,
+        )
+
+    rows, next_cursor = filter_on_key_value_pairs(
+        kv_pairs,
+        columns,
+        db,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        descending=descending,
+    )
+    if next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    response.headers.update(headers)
+    return rows
+
+
+@router.get("/filter/cache")
+def get_filter_cache_stats() -> FilterCacheStats:
+    """Get the hit, miss and eviction counts of this worker's filter result cache."""
+    return get_filter_cache().stats()
+
+
+@router.post("/facets")
+def get_facets(
+    kv_pairs: Sequence[TAttrFilterDataType] = Body(embed=True),
+    bins: int = Query(default=10, ge=1, le=100),
     db: Session = Depends(get_session),
-) -> Sequence[tuple[TPulseCols, ...]]:
-    return filter_on_key_value_pairs(kv_pairs, columns, db)
+) -> AttrFacets:
+    """Count the values of every key for the pulses matching the key-value pairs."""
+    return read_facets(kv_pairs, bins=bins, db=db)
@@ -1,16 +1,23 @@
+import secrets
 from datetime import datetime, timedelta
 from typing import Any
 
 import jwt
 from fastapi import Depends, Response
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBearer,
+    OAuth2PasswordBearer,
+)
 from sqlmodel import Session
 
 from api.config import get_auth_settings
 from api.database import get_session
+from api.public.auth.cache import get_principal_cache
 from api.public.auth.crud import get_user
-from api.public.auth.helpers import verify_password
-from api.public.auth.models import User
+from api.public.auth.helpers import verify_password_async
+from api.public.auth.models import User, UserRead
 from api.utils.exceptions import (
     CredentialsIncorrectError,
     EmailOrPasswordIncorrectError,
@@ -20,35 +27,45 @@ from api.utils.helpers import get_now
 auth_settings = get_auth_settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+metrics_token_scheme = HTTPBearer(auto_error=False)
 
 
-def authenticate_user_password(
+async def authenticate_user_password(
     username: str,
     password: str,
     db: Session = Depends(get_session),
 ) -> User:
-    user = get_user(username, db=db)
-    if not verify_password(password, user.hashed_password):
+    """Get the user with a password, without blocking the event loop.
+
+    The user is read in the threadpool, and the password is verified by the bounded
+    password hashing threads.
+    """
+    user = await run_in_threadpool(get_user, username, db=db)
+    if not await verify_password_async(password, user.hashed_password):
         raise EmailOrPasswordIncorrectError
     return user
 
 
-def authenticate_user_token(
-    token: str,
-    db: Session = Depends(get_session),
-) -> User:
+def decode_token(token: str) -> dict[str, Any]:
+    """Verify a token and get its payload, which always has a subject."""
     try:
-        payload = jwt.decode(
+        payload: dict[str, Any] = jwt.decode(
             jwt=token,
             key=auth_settings.TERASTORE_JWT_SECRET,
             algorithms=[auth_settings.ALGORITHM],
         )
-        email = payload.get("sub")
-        if email is None:
+        if payload.get("sub") is None:
             raise CredentialsIncorrectError
-    except jwt.DecodeError as e:
+    except jwt.InvalidTokenError as e:
         raise CredentialsIncorrectError from e
-    return get_user(email=email, db=db)
+    return payload
+
+
+def authenticate_user_token(
+    token: str,
+    db: Session = Depends(get_session),
+) -> User:
+    return get_user(email=decode_token(token)["sub"], db=db)
 
 
 def create_token(
@@ -66,8 +83,40 @@ def create_token(
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_session),
-) -> User:
-    return authenticate_user_token(token, db=db)
+) -> UserRead:
+    """Get the user of an access token.
+
+    Users are cached per token, so most requests skip the database. Otherwise, the
+    user is read in the threadpool, as it would block the event loop.
+    """
+    cache = get_principal_cache()
+    cached_principal = cache.get(token)
+    if cached_principal is not None:
+        return cached_principal
+
+    def authenticate() -> tuple[UserRead, float]:
+        payload = decode_token(token)
+        user = get_user(email=payload["sub"], db=db)
+        return UserRead(email=user.email, auth_level=user.auth_level), payload["exp"]
+
+    principal, token_expires = await run_in_threadpool(authenticate)
+    cache.put(token, principal, token_expires)
+    return principal
+
+
+def verify_metrics_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(metrics_token_scheme),
+) -> None:
+    """Check the static token of scrapers, which cannot renew access tokens."""
+    expected = auth_settings.TERASTORE_METRICS_TOKEN
+    if (
+        not expected
+        or credentials is None
+        or not secrets.compare_digest(
+            credentials.credentials.encode(), expected.encode()
+        )
+    ):
+        raise CredentialsIncorrectError
 
 
 def create_tokens_from_user(response: Response, user: User) -> str:
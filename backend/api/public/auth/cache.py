@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Self
+
+from sqlalchemy import event
+from sqlmodel import SQLModel
+
+from api.config import get_auth_settings
+from api.public.auth.models import User, UserRead
+from api.utils.notifications import notify, subscribe
+
+if TYPE_CHECKING:
+    from sqlmodel import Session
+
+# Channel notified when users are removed or updated, see notify_users_changed
+USERS_CHANNEL = "users"
+
+
+class PrincipalCache:
+    """Process-local cache of the users verified for access tokens.
+
+    An entry expires after ttl seconds, or when its token does, whichever is first.
+    Removing or updating users clears the cache of all workers, so the ttl only
+    bounds how long a missed notification can go unnoticed.
+    """
+
+    def __init__(self: Self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._principals: OrderedDict[str, tuple[UserRead, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self: Self, token: str) -> UserRead | None:
+        with self._lock:
+            cached = self._principals.get(token)
+            if cached is None:
+                return None
+            principal, expires = cached
+            if expires <= time.monotonic():
+                del self._principals[token]
+                return None
+            return principal
+
+    def put(self: Self, token: str, principal: UserRead, token_expires: float) -> None:
+        """Cache the user verified for token, which expires at a Unix timestamp."""
+        ttl = min(self.ttl, token_expires - time.time())
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._principals[token] = (principal, time.monotonic() + ttl)
+            self._principals.move_to_end(token)
+            while len(self._principals) > self.max_entries:
+                self._principals.popitem(last=False)
+
+    def invalidate(self: Self) -> None:
+        with self._lock:
+            self._principals.clear()
+
+
+@lru_cache
+def get_principal_cache() -> PrincipalCache:
+    auth_settings = get_auth_settings()
+    return PrincipalCache(
+        ttl=auth_settings.PRINCIPAL_CACHE_TTL_SECONDS,
+        max_entries=auth_settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    )
+
+
+def _invalidate_principal_cache(*_args: Any, **_kwargs: Any) -> None:  # noqa: ANN401
+    get_principal_cache().invalidate()
+
+
+# Tables are dropped and recreated in development and tests
+_users_table = SQLModel.metadata.tables[str(User.__tablename__)]
+event.listen(_users_table, "after_create", _invalidate_principal_cache)
+event.listen(_users_table, "after_drop", _invalidate_principal_cache)
+
+
+def notify_users_changed(db: Session) -> None:
+    """Invalidate the principal cache of all workers once db commits."""
+    notify(db, USERS_CHANNEL)
+
+
+subscribe(USERS_CHANNEL, _invalidate_principal_cache)
@@ -6,6 +6,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
 from api.database import get_session
+from api.public.auth.cache import notify_users_changed
 from api.public.auth.helpers import get_password_hash
 from api.public.auth.models import (
     AuthLevel,
@@ -54,6 +55,7 @@ def get_users(db: Session = Depends(get_session)) -> Sequence[UserRead]:
 
 def remove_user(user: UserDelete, db: Session = Depends(get_session)) -> None:
     db.delete(get_user(user.email, db=db))
+    notify_users_changed(db)
     db.commit()
 
 
@@ -61,4 +63,5 @@ def update_auth_level(user: UserUpdate, db: Session = Depends(get_session)) -> N
     user_from_db = get_user(user.email, db=db)
     user_from_db.auth_level = user.auth_level
     db.add(user_from_db)
+    notify_users_changed(db)
     db.commit()
@@ -1,5 +1,11 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import bcrypt
 
+from api.config import get_auth_settings
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
@@ -9,3 +15,26 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return bcrypt.hashpw(password=password.encode(), salt=bcrypt.gensalt()).decode()
+
+
+@lru_cache
+def get_password_executor() -> ThreadPoolExecutor:
+    """Get the threads hashing passwords for async code.
+
+    bcrypt releases the GIL while hashing, so threads run in parallel. Bounding them
+    keeps a login storm from taking every core, or the whole threadpool.
+    """
+    return ThreadPoolExecutor(
+        max_workers=get_auth_settings().PASSWORD_HASH_WORKERS,
+        thread_name_prefix="password-hash",
+    )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop, see verify_password."""
+    return await asyncio.get_running_loop().run_in_executor(
+        get_password_executor(),
+        verify_password,
+        plain_password,
+        hashed_password,
+    )
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session
 
@@ -24,7 +25,11 @@ async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_session),
 ) -> Token:
-    user = authenticate_user_password(form_data.username, form_data.password, db=db)
+    user = await authenticate_user_password(
+        form_data.username,
+        form_data.password,
+        db=db,
+    )
     access_token = create_tokens_from_user(response, user)
     return Token(access_token=access_token)
 
@@ -38,7 +43,7 @@ async def login_for_refresh_token(
     refresh_token = request.cookies.get(auth_settings.REFRESH_TOKEN_COOKIE_NAME)
     if refresh_token is None:
         raise CredentialsIncorrectError
-    user = authenticate_user_token(refresh_token, db=db)
+    user = await run_in_threadpool(authenticate_user_token, refresh_token, db=db)
     access_token = create_tokens_from_user(response, user)
     return Token(access_token=access_token)
 
@@ -0,0 +1,34 @@
+from uuid import UUID
+
+from fastapi import Depends
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.database import get_async_session
+from api.public.device.crud import create_devices_query
+from api.public.device.models import Device, DeviceRead
+from api.utils.exceptions import DeviceNotFoundError
+
+
+async def read_devices(
+    offset: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_async_session),
+    *,
+    cursor: str | None = None,
+) -> list[DeviceRead]:
+    """Get devices in the database, ordered by creation time.
+
+    See api.public.device.crud.read_devices.
+    """
+    devices = (await db.exec(create_devices_query(offset, limit, cursor=cursor))).all()
+    return [DeviceRead.model_validate(device) for device in devices]
+
+
+async def read_device(
+    device_id: UUID,
+    db: AsyncSession = Depends(get_async_session),
+) -> DeviceRead:
+    device = await db.get(Device, device_id)
+    if not device:
+        raise DeviceNotFoundError(device_id=device_id)
+    return DeviceRead.model_validate(device)
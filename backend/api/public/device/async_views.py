@@ -0,0 +1,36 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.database import get_async_session
+from api.public.device.async_crud import read_device, read_devices
+from api.public.device.crud import get_next_devices_cursor
+from api.public.device.models import DeviceRead
+from api.utils.pagination import CURSOR_QUERY, NEXT_CURSOR_HEADER
+
+# Shadows the reads of api.public.device.views, which document the same API
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("")
+async def get_devices_async(
+    response: Response,
+    offset: int = Query(default=0, deprecated=True),
+    limit: int = Query(default=100, lte=100),
+    cursor: str | None = CURSOR_QUERY,
+    db: AsyncSession = Depends(get_async_session),
+) -> list[DeviceRead]:
+    devices = await read_devices(offset=offset, limit=limit, db=db, cursor=cursor)
+    next_cursor = get_next_devices_cursor(devices, limit)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return devices
+
+
+@router.get("/{device_id}")
+async def get_device_async(
+    device_id: UUID,
+    db: AsyncSession = Depends(get_async_session),
+) -> DeviceRead:
+    return await read_device(device_id=device_id, db=db)
@@ -1,11 +1,21 @@
+from collections.abc import Sequence
+from datetime import datetime
 from uuid import UUID
 
 from fastapi import Depends
-from sqlmodel import Session, select
+from pydantic import TypeAdapter
+from sqlalchemy import literal, tuple_
+from sqlmodel import Session, col, select
+from sqlmodel.sql.expression import SelectOfScalar
 
 from api.database import get_session
 from api.public.device.models import Device, DeviceCreate, DeviceRead
 from api.utils.exceptions import DeviceNotFoundError
+from api.utils.pagination import decode_cursor, encode_cursor
+
+DEVICES_CURSOR: TypeAdapter[tuple[datetime, UUID]] = TypeAdapter(
+    tuple[datetime, UUID],
+)
 
 
 def create_device(
@@ -23,13 +33,73 @@ def read_devices(
     offset: int = 0,
     limit: int = 20,
     db: Session = Depends(get_session),
+    *,
+    cursor: str | None = None,
 ) -> list[DeviceRead]:
-    devices = db.exec(select(Device).offset(offset).limit(limit)).all()
+    """Get devices in the database, ordered by creation time.
+
+    Pages are fetched with cursor, as returned by get_next_devices_cursor, which
+    seeks directly to the page through an index. Offset still works, but scans
+    every skipped row.
+    """
+    devices = db.exec(create_devices_query(offset, limit, cursor=cursor)).all()
     return [DeviceRead.model_validate(device) for device in devices]
 
 
+def create_devices_query(
+    offset: int,
+    limit: int,
+    *,
+    cursor: str | None = None,
+) -> SelectOfScalar[Device]:
+    """Create a query for a page of devices, see read_devices."""
+    query = select(Device).order_by(
+        col(Device.creation_time),
+        col(Device.device_id),
+    )
+    if cursor is not None:
+        creation_time, device_id = decode_cursor(DEVICES_CURSOR, cursor)
+        query = query.where(
+            tuple_(col(Device.creation_time), col(Device.device_id))
+            > tuple_(literal(creation_time), literal(device_id)),
+        )
+    return query.offset(offset).limit(limit)
+
+
+def get_next_devices_cursor(devices: Sequence[DeviceRead], limit: int) -> str | None:
+    """Get the cursor for the page after devices, or None if it was the last page."""
+    if len(devices) < limit:
+        return None
+    return encode_cursor(
+        DEVICES_CURSOR,
+        (devices[-1].creation_time, devices[-1].device_id),
+    )
+
+
 def read_device(device_id: UUID, db: Session = Depends(get_session)) -> DeviceRead:
     device = db.get(Device, device_id)
     if not device:
         raise DeviceNotFoundError(device_id=device_id)
     return DeviceRead.model_validate(device)
+
+
+def assert_devices_exist(
+    device_ids: Sequence[UUID],
+    db: Session = Depends(get_session),
+) -> None:
+    """Check that all device IDs exist in the database.
+
+    The devices are locked against deletion until the transaction ends, so pulses
+    referencing them can be written without violating the foreign key.
+    Raises a DeviceNotFoundError for the first device that does not exist.
+    """
+    existing_devices = set(
+        db.exec(
+            select(Device.device_id)
+            .where(col(Device.device_id).in_(device_ids))
+            .with_for_update(key_share=True),
+        ).all(),
+    )
+    for device_id in device_ids:
+        if device_id not in existing_devices:
+            raise DeviceNotFoundError(device_id=device_id)
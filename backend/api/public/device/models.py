@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+from datetime import datetime  # noqa: TCH003
 from typing import Self
 from uuid import UUID, uuid4
 
 from pydantic import ConfigDict
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, Index, SQLModel
+
+from api.utils.helpers import get_now
 
 
 class DeviceBase(SQLModel):
@@ -25,8 +28,13 @@ class Device(DeviceBase, table=True):
     """
 
     __tablename__ = "devices"
+    # Devices are paginated in this order
+    __table_args__ = (
+        Index("ix_devices_creation_time_device_id", "creation_time", "device_id"),
+    )
 
     device_id: UUID = Field(default_factory=uuid4, primary_key=True)
+    creation_time: datetime = Field(default_factory=get_now)
 
 
 class DeviceCreate(DeviceBase):
@@ -54,3 +62,4 @@ class DeviceRead(DeviceBase):
     """
 
     device_id: UUID
+    creation_time: datetime
@@ -1,11 +1,21 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import Session
 
 from api.database import get_session
-from api.public.device.crud import create_device, read_device, read_devices
+from api.public.device.crud import (
+    create_device,
+    get_next_devices_cursor,
+    read_device,
+    read_devices,
+)
 from api.public.device.models import DeviceCreate, DeviceRead
+from api.utils.pagination import (
+    CURSOR_QUERY,
+    NEXT_CURSOR_HEADER,
+    NEXT_CURSOR_RESPONSE,
+)
 
 router = APIRouter()
 
@@ -18,13 +28,19 @@ def create_a_device(
     return create_device(device=device, db=db)
 
 
-@router.get("")
+@router.get("", responses=NEXT_CURSOR_RESPONSE)
 def get_devices(
-    offset: int = 0,
+    response: Response,
+    offset: int = Query(default=0, deprecated=True),
     limit: int = Query(default=100, lte=100),
+    cursor: str | None = CURSOR_QUERY,
     db: Session = Depends(get_session),
 ) -> list[DeviceRead]:
-    return read_devices(offset=offset, limit=limit, db=db)
+    devices = read_devices(offset=offset, limit=limit, db=db, cursor=cursor)
+    next_cursor = get_next_devices_cursor(devices, limit)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return devices
 
 
 @router.get("/{device_id}")
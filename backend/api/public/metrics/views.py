@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from api.utils.metrics import METRICS_CONTENT_TYPE, generate_metrics
+
+router = APIRouter()
+
+
+@router.get("")
+def metrics() -> Response:
+    """Get the request and database metrics of all workers, for Prometheus."""
+    return Response(generate_metrics(), media_type=METRICS_CONTENT_TYPE)
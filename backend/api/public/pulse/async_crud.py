@@ -0,0 +1,135 @@
+from collections.abc import AsyncIterator, Sequence
+from uuid import UUID
+
+from fastapi import Depends
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.config import get_settings
+from api.database import get_async_session, run_with_sync_session
+from api.public.pulse.crud import (
+    annotate_pulses,
+    create_pulses_query,
+    create_pulses_with_ids_query,
+)
+from api.public.pulse.helpers import assert_pulses_exist
+from api.public.pulse.models import AnnotatedPulseRead, Pulse, PulseRead
+from api.utils.exceptions import PulseNotFoundError
+
+
+async def read_pulses(  # noqa: PLR0913
+    offset: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_async_session),
+    *,
+    cursor: str | None = None,
+    explicit_delays: bool = True,
+    fields: Sequence[str] | None = None,
+) -> list[PulseRead]:
+    """Get pulses in the database, ordered by creation time.
+
+    See api.public.pulse.crud.read_pulses.
+    """
+    if fields is not None:
+        fields = ["pulse_id", "creation_time", *fields]
+    query = create_pulses_query(offset, limit, cursor=cursor, fields=fields)
+    pulses = (await db.exec(query)).all()
+    return [
+        PulseRead.from_pulse(pulse, explicit_delays=explicit_delays, fields=fields)
+        for pulse in pulses
+    ]
+
+
+async def read_pulses_with_ids(
+    ids: list[UUID],
+    db: AsyncSession = Depends(get_async_session),
+    *,
+    explicit_delays: bool = True,
+    fields: Sequence[str] | None = None,
+) -> list[AnnotatedPulseRead]:
+    """Get pulses with their attributes, in the order of ids.
+
+    See api.public.pulse.crud.read_pulses_with_ids.
+    """
+    if fields is not None:
+        fields = ["pulse_id", *fields]
+    query = create_pulses_with_ids_query(ids, fields)
+    await run_with_sync_session(
+        db,
+        lambda session: assert_pulses_exist(pulse_ids=ids, db=session),
+    )
+
+    pulses = (await db.exec(query)).all()
+    return await run_with_sync_session(
+        db,
+        lambda session: annotate_pulses(
+            pulses,
+            db=session,
+            explicit_delays=explicit_delays,
+            fields=fields,
+        ),
+    )
+
+
+async def stream_pulses_with_ids(
+    ids: list[UUID],
+    db: AsyncSession = Depends(get_async_session),
+    *,
+    explicit_delays: bool = True,
+    fields: Sequence[str] | None = None,
+) -> AsyncIterator[AnnotatedPulseRead]:
+    """Get pulses with their attributes, in the order of ids, as they are read.
+
+    See api.public.pulse.crud.stream_pulses_with_ids.
+    """
+    if fields is not None:
+        fields = ["pulse_id", *fields]
+    query = create_pulses_with_ids_query(ids, fields)
+    stream_db = AsyncSession(db.bind)
+    try:
+        await stream_db.connection(
+            execution_options={"isolation_level": "REPEATABLE READ"},
+        )
+        await run_with_sync_session(
+            stream_db,
+            lambda session: assert_pulses_exist(pulse_ids=ids, db=session),
+        )
+    except BaseException:
+        await stream_db.close()
+        raise
+
+    async def stream() -> AsyncIterator[AnnotatedPulseRead]:
+        async with stream_db:
+            result = await stream_db.stream_scalars(
+                query,
+                execution_options={"yield_per": get_settings().STREAM_READ_BATCH_SIZE},
+            )
+            async for pulses in result.partitions():
+
+                def annotate(
+                    session: Session,
+                    pulses: Sequence[Pulse] = pulses,
+                ) -> list[AnnotatedPulseRead]:
+                    return annotate_pulses(
+                        pulses,
+                        db=session,
+                        explicit_delays=explicit_delays,
+                        fields=fields,
+                    )
+
+                for pulse in await run_with_sync_session(stream_db, annotate):
+                    yield pulse
+
+    return stream()
+
+
+async def read_pulse(
+    pulse_id: UUID,
+    db: AsyncSession = Depends(get_async_session),
+    *,
+    explicit_delays: bool = True,
+) -> PulseRead:
+    pulse = await db.get(Pulse, pulse_id)
+    if not pulse:
+        raise PulseNotFoundError(pulse_id=pulse_id)
+    return PulseRead.from_pulse(pulse, explicit_delays=explicit_delays)
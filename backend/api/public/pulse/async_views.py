@@ -0,0 +1,111 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.database import get_async_session
+from api.public.pulse.async_crud import (
+    read_pulse,
+    read_pulses,
+    read_pulses_with_ids,
+    stream_pulses_with_ids,
+)
+from api.public.pulse.crud import get_next_pulses_cursor
+from api.public.pulse.helpers import (
+    PULSE_COLUMNAR_MEDIA_TYPE,
+    accepts_columnar,
+    encode_pulses_columnar,
+)
+from api.public.pulse.models import AnnotatedPulseRead, PulseRead
+from api.public.pulse.views import (
+    EXPLICIT_DELAYS_QUERY,
+    FIELDS_QUERY,
+    projected_response,
+)
+from api.utils.pagination import CURSOR_QUERY, NEXT_CURSOR_HEADER
+from api.utils.streaming import (
+    NDJSON_MEDIA_TYPE,
+    accepts_media_type,
+    stream_models_ndjson,
+)
+
+# Shadows the reads of api.public.pulse.views, which document the same API
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("", response_model=list[PulseRead])
+async def get_pulses_async(  # noqa: PLR0913
+    request: Request,
+    response: Response,
+    offset: int = Query(default=0, deprecated=True),
+    limit: int = Query(default=100, lte=100),
+    cursor: str | None = CURSOR_QUERY,
+    explicit_delays: bool = EXPLICIT_DELAYS_QUERY,  # noqa: FBT001
+    fields: list[str] | None = FIELDS_QUERY,
+    db: AsyncSession = Depends(get_async_session),
+) -> list[PulseRead] | Response:
+    columnar = accepts_columnar(request)
+    pulses = await read_pulses(
+        offset=offset,
+        limit=limit,
+        db=db,
+        cursor=cursor,
+        explicit_delays=explicit_delays,
+        fields=None if columnar else fields,
+    )
+    next_cursor = get_next_pulses_cursor(pulses, limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if columnar:
+        return Response(
+            content=encode_pulses_columnar(pulses),
+            media_type=PULSE_COLUMNAR_MEDIA_TYPE,
+            headers=headers,
+        )
+    if fields is not None:
+        return projected_response(pulses, headers)
+    response.headers.update(headers)
+    return pulses
+
+
+@router.post("/get", response_model=list[AnnotatedPulseRead])
+async def get_pulses_from_ids_async(
+    request: Request,
+    ids: list[UUID],
+    explicit_delays: bool = EXPLICIT_DELAYS_QUERY,  # noqa: FBT001
+    fields: list[str] | None = FIELDS_QUERY,
+    db: AsyncSession = Depends(get_async_session),
+) -> list[AnnotatedPulseRead] | Response:
+    if accepts_media_type(request, NDJSON_MEDIA_TYPE):
+        return stream_models_ndjson(
+            await stream_pulses_with_ids(
+                ids,
+                db=db,
+                explicit_delays=explicit_delays,
+                fields=fields,
+            ),
+            exclude_unset=fields is not None,
+        )
+    columnar = accepts_columnar(request)
+    pulses = await read_pulses_with_ids(
+        ids,
+        db=db,
+        explicit_delays=explicit_delays,
+        fields=None if columnar else fields,
+    )
+    if columnar:
+        return Response(
+            content=encode_pulses_columnar(pulses),
+            media_type=PULSE_COLUMNAR_MEDIA_TYPE,
+        )
+    if fields is not None:
+        return projected_response(pulses)
+    return pulses
+
+
+@router.get("/{pulse_id}")
+async def get_pulse_async(
+    pulse_id: UUID,
+    explicit_delays: bool = EXPLICIT_DELAYS_QUERY,  # noqa: FBT001
+    db: AsyncSession = Depends(get_async_session),
+) -> PulseRead:
+    return await read_pulse(pulse_id=pulse_id, db=db, explicit_delays=explicit_delays)
@@ -1,119 +1,445 @@
-from typing import TYPE_CHECKING
-from uuid import UUID
+from collections.abc import AsyncIterable, Iterator, Sequence
+from datetime import datetime
+from typing import Any, cast
+from uuid import UUID, uuid4
 
 from fastapi import Depends
-from psycopg2.errors import ForeignKeyViolation
-from sqlalchemy.exc import IntegrityError
-from sqlmodel import Session, col, select
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import literal, tuple_
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import QueryableAttribute, load_only
+from sqlalchemy.sql.base import ExecutableOption
+from sqlmodel import Session, col, func, select
+from sqlmodel.sql.expression import SelectOfScalar
 
+from api.config import get_settings
 from api.database import get_session
-from api.public.attrs.crud import add_attrs, read_pulse_attrs
+from api.public.attrs.crud import (
+    add_attrs,
+    copy_attrs,
+    read_pulse_attrs,
+    register_keys,
+)
+from api.public.attrs.models import PulseAttrs
+from api.public.device.crud import assert_devices_exist
 from api.public.pulse.helpers import assert_pulses_exist
 from api.public.pulse.models import (
     AnnotatedPulseRead,
     Pulse,
     PulseCreate,
     PulseRead,
-    TemporaryPulseIdTable,
+    PulseStreamResult,
 )
+from api.utils.copy import copy_rows
 from api.utils.exceptions import (
     AttrDataTypeExistsError,
     DeviceNotFoundError,
+    PulseColumnNonexistentError,
     PulseNotFoundError,
 )
-from api.utils.helpers import extract_device_id_from_pgerror
+from api.utils.helpers import (
+    get_model_columns_from_names,
+    iter_lines,
+    uuid_array,
+)
+from api.utils.pagination import decode_cursor, encode_cursor
+
+PULSES_CURSOR: TypeAdapter[tuple[datetime, UUID]] = TypeAdapter(tuple[datetime, UUID])
 
-if TYPE_CHECKING:
-    from api.public.attrs.models import PulseAttrs
+DELAYS_GRID_COLUMNS = ("delays_start", "delays_step", "delays_count")
+# Columns needed for the read model fields that are not columns themselves
+PULSE_FIELD_COLUMNS: dict[str, tuple[str, ...]] = {
+    "delays": ("delays", *DELAYS_GRID_COLUMNS),
+    "delays_grid": DELAYS_GRID_COLUMNS,
+    "pulse_attributes": (),
+}
+
+PULSE_COPY_COLUMNS = (
+    "pulse_id",
+    "delays",
+    "delays_start",
+    "delays_step",
+    "delays_count",
+    "signal",
+    "signal_error",
+    "integration_time_ms",
+    "creation_time",
+    "device_id",
+)
 
 
 def create_pulses(
     pulses: list[PulseCreate],
     db: Session = Depends(get_session),
 ) -> list[UUID]:
+    """Write pulses and their attributes in a single transaction.
+
+    Devices and attribute data types are checked before anything is written, so a
+    rejected upload leaves nothing to clean up.
+    """
+    try:
+        assert_devices_exist(
+            device_ids=list(dict.fromkeys(pulse.device_id for pulse in pulses)),
+            db=db,
+        )
+        # Large uploads skip the ORM entirely
+        if len(pulses) >= get_settings().BULK_INGEST_THRESHOLD:
+            ids = copy_pulses(pulses=pulses, db=db)
+        else:
+            ids = add_pulses(pulses=pulses, db=db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return ids
+
+
+def add_pulses(
+    pulses: list[PulseCreate],
+    db: Session = Depends(get_session),
+) -> list[UUID]:
+    """Stage pulses and their attributes in the session, without committing."""
     pulses_to_db: list[Pulse] = []
     pulses_attrs_to_db: list[PulseAttrs] = []
     for pulse in pulses:
         pulse_to_db, pulse_attrs_to_db = pulse.create_pulse()
         pulses_to_db.append(pulse_to_db)
         pulses_attrs_to_db.append(pulse_attrs_to_db)
+    register_keys(pulses_attrs=pulses_attrs_to_db, db=db)
 
     # We get the IDs here, because if we do it later,
     # SQLModel will verify the ID with a call to the database.
     ids = [pulse.pulse_id for pulse in pulses_to_db]
 
-    for pulse_to_db in pulses_to_db:
-        db.add(pulse_to_db)
-    try:
-        # SQLModel does a bulk insert here
-        db.commit()
-    except IntegrityError as e:
-        if isinstance(e.orig, ForeignKeyViolation):
-            if e.orig.pgerror is None:
-                raise
-            device_id = extract_device_id_from_pgerror(e.orig.pgerror)
-            raise DeviceNotFoundError(device_id=device_id) from e
+    # SQLModel does a bulk insert here. The models have no relationships, so the
+    # pulses and keys must be flushed before the attributes referencing them.
+    db.add_all(pulses_to_db)
+    db.flush()
+    add_attrs(pulses_attrs=pulses_attrs_to_db, db=db)
+    return ids
+
+
+def pulse_copy_row(pulse_id: UUID, pulse: PulseCreate) -> tuple[object, ...]:
+    """Get the values of PULSE_COPY_COLUMNS for a pulse."""
+    grid = pulse.detect_delays_grid()
+    return (
+        pulse_id,
+        None if grid else pulse.delays,
+        grid.start if grid else None,
+        grid.step if grid else None,
+        grid.count if grid else None,
+        pulse.signal,
+        pulse.signal_error,
+        pulse.integration_time_ms,
+        pulse.creation_time,
+        pulse.device_id,
+    )
 
-    try:
-        add_attrs(pulses_attrs=pulses_attrs_to_db, db=db)
-    except AttrDataTypeExistsError:
-        # If we failed to add all pulse attributes, reset the database
-        pulses_to_delete = db.exec(
-            select(Pulse).filter(col(Pulse.pulse_id).in_(ids)),
-        ).all()
-        for p in pulses_to_delete:
-            db.delete(p)
-        db.commit()
-        raise
 
+def copy_pulses(
+    pulses: list[PulseCreate],
+    db: Session = Depends(get_session),
+) -> list[UUID]:
+    """Write pulses and their attributes using PostgreSQL COPY.
+
+    Nothing is committed, so the caller controls the transaction.
+    """
+    ids = [uuid4() for _ in pulses]
+    pulses_attrs = [
+        PulseAttrs(pulse_id=pulse_id, pulse_attributes=pulse.pulse_attributes)
+        for pulse_id, pulse in zip(ids, pulses, strict=True)
+    ]
+    register_keys(pulses_attrs=pulses_attrs, db=db)
+
+    copy_rows(
+        db=db,
+        table=str(Pulse.__tablename__),
+        columns=PULSE_COPY_COLUMNS,
+        rows=(
+            pulse_copy_row(pulse_id, pulse)
+            for pulse_id, pulse in zip(ids, pulses, strict=True)
+        ),
+    )
+    copy_attrs(pulses_attrs=pulses_attrs, db=db)
     return ids
 
 
-def read_pulses(
+async def create_pulses_from_stream(
+    chunks: AsyncIterable[bytes],
+    db: Session = Depends(get_session),
+) -> PulseStreamResult:
+    """Validate and write newline-delimited JSON pulses in micro-batches.
+
+    Only a single batch of pulses is held in memory at a time, regardless of the
+    size of the upload. Invalid lines, and batches rejected by the database, are
+    reported per line instead of failing the whole upload. Each batch is written
+    in a transaction of its own, so pulse_ids lists exactly the pulses stored.
+    """
+    settings = get_settings()
+    result = PulseStreamResult()
+    batch: list[PulseCreate] = []
+    batch_lines: list[int] = []
+
+    async def flush() -> None:
+        try:
+            # Database writes are blocking, so keep them off the event loop
+            ids = await run_in_threadpool(create_pulses, pulses=batch, db=db)
+        except (AttrDataTypeExistsError, DeviceNotFoundError, SQLAlchemyError) as e:
+            # create_pulses rolled the batch back, so none of its pulses are stored
+            message = str(e.orig) if isinstance(e, DBAPIError) else str(e)
+            for line in batch_lines:
+                result.add_error(
+                    line=line,
+                    errors=[{"msg": message, "type": type(e).__name__}],
+                    max_errors=settings.STREAM_INGEST_MAX_ERRORS,
+                )
+        else:
+            result.pulse_ids.extend(ids)
+        batch.clear()
+        batch_lines.clear()
+
+    async for line_number, line in iter_lines(chunks):
+        try:
+            batch.append(PulseCreate.model_validate_json(line))
+        except ValidationError as e:
+            result.add_error(
+                line=line_number,
+                errors=[
+                    {"loc": error["loc"], "msg": error["msg"], "type": error["type"]}
+                    for error in e.errors()
+                ],
+                max_errors=settings.STREAM_INGEST_MAX_ERRORS,
+            )
+            continue
+        batch_lines.append(line_number)
+        if len(batch) >= settings.STREAM_INGEST_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+    return result
+
+
+def load_pulse_fields(
+    fields: Sequence[str],
+    read_model: type[PulseRead],
+) -> ExecutableOption:
+    """Get a loader option only loading the columns for some read model fields.
+
+    Other columns, such as the large arrays, are deferred and raise if accessed.
+    Raises a PulseColumnNonexistentError if a field is not in the read model.
+    """
+    for field in fields:
+        if field not in read_model.model_fields:
+            raise PulseColumnNonexistentError(
+                wanted=field,
+                columns=list(read_model.model_fields),
+            )
+    column_names = [
+        column
+        for field in fields
+        for column in PULSE_FIELD_COLUMNS.get(field, (field,))
+    ]
+    columns = get_model_columns_from_names(column_names, Pulse)
+    return load_only(
+        *cast("tuple[QueryableAttribute[Any], ...]", columns),
+        raiseload=True,
+    )
+
+
+def read_pulses(  # noqa: PLR0913
     offset: int = 0,
     limit: int = 20,
     db: Session = Depends(get_session),
+    *,
+    cursor: str | None = None,
+    explicit_delays: bool = True,
+    fields: Sequence[str] | None = None,
 ) -> list[PulseRead]:
-    """Get all pulses in the database."""
-    pulses = db.exec(select(Pulse).offset(offset).limit(limit)).all()
-    return [PulseRead.model_validate(pulse) for pulse in pulses]
+    """Get pulses in the database, ordered by creation time.
+
+    Pages are fetched with cursor, as returned by get_next_pulses_cursor, which
+    seeks directly to the page through an index. Offset still works, but scans
+    every skipped row.
+    If fields are given, only those are loaded and set on the returned pulses,
+    along with pulse_id and creation_time, which are needed for the next cursor.
+    """
+    if fields is not None:
+        fields = ["pulse_id", "creation_time", *fields]
+    query = create_pulses_query(offset, limit, cursor=cursor, fields=fields)
+    pulses = db.exec(query).all()
+    return [
+        PulseRead.from_pulse(pulse, explicit_delays=explicit_delays, fields=fields)
+        for pulse in pulses
+    ]
+
+
+def create_pulses_query(
+    offset: int,
+    limit: int,
+    *,
+    cursor: str | None = None,
+    fields: Sequence[str] | None = None,
+) -> SelectOfScalar[Pulse]:
+    """Create a query for a page of pulses, only loading fields if given."""
+    query = select(Pulse).order_by(col(Pulse.creation_time), col(Pulse.pulse_id))
+    if fields is not None:
+        query = query.options(load_pulse_fields(fields, PulseRead))
+    if cursor is not None:
+        creation_time, pulse_id = decode_cursor(PULSES_CURSOR, cursor)
+        query = query.where(
+            tuple_(col(Pulse.creation_time), col(Pulse.pulse_id))
+            > tuple_(literal(creation_time), literal(pulse_id)),
+        )
+    return query.offset(offset).limit(limit)
+
+
+def get_next_pulses_cursor(pulses: Sequence[PulseRead], limit: int) -> str | None:
+    """Get the cursor for the page after pulses, or None if it was the last page."""
+    if len(pulses) < limit:
+        return None
+    return encode_cursor(
+        PULSES_CURSOR,
+        (pulses[-1].creation_time, pulses[-1].pulse_id),
+    )
+
+
+def create_pulses_with_ids_query(
+    ids: list[UUID],
+    fields: Sequence[str] | None = None,
+) -> SelectOfScalar[Pulse]:
+    """Create a query for pulses in the order of ids, only loading fields if given."""
+    query = select(Pulse)
+    if fields is not None:
+        query = query.options(load_pulse_fields(fields, AnnotatedPulseRead))
+
+    # Join on the wanted IDs sent as a single array parameter.
+    # Unlike a shared table, concurrent requests cannot see each other's IDs.
+    wanted_ids = (
+        func.unnest(uuid_array(ids))
+        .table_valued("pulse_id", with_ordinality="ordinality")
+        .render_derived()
+    )
+    return query.join(
+        wanted_ids,
+        wanted_ids.c.pulse_id == col(Pulse.pulse_id),
+    ).order_by(wanted_ids.c.ordinality)
+
+
+def annotate_pulses(
+    pulses: Sequence[Pulse],
+    db: Session = Depends(get_session),
+    *,
+    explicit_delays: bool = True,
+    fields: Sequence[str] | None = None,
+) -> list[AnnotatedPulseRead]:
+    """Read pulses along with their attributes, unless fields leaves them out."""
+    if fields is not None and "pulse_attributes" not in fields:
+        return [
+            AnnotatedPulseRead.from_pulse(
+                pulse,
+                explicit_delays=explicit_delays,
+                fields=fields,
+            )
+            for pulse in pulses
+        ]
+
+    # Find all attributes for the pulses
+    pulse_attrs = read_pulse_attrs(
+        pulse_ids=[pulse.pulse_id for pulse in pulses],
+        db=db,
+        check_pulses_exist=False,
+    )
+
+    return [
+        AnnotatedPulseRead.new(
+            pulse=pulse,
+            attrs=pulse_attrs[pulse.pulse_id],
+            explicit_delays=explicit_delays,
+            fields=fields,
+        )
+        for pulse in pulses
+    ]
 
 
 def read_pulses_with_ids(
     ids: list[UUID],
     db: Session = Depends(get_session),
+    *,
+    explicit_delays: bool = True,
+    fields: Sequence[str] | None = None,
 ) -> list[AnnotatedPulseRead]:
+    """Get pulses with their attributes, in the order of ids.
+
+    If fields are given, only those are loaded and set on the returned pulses,
+    along with pulse_id.
+    """
+    if fields is not None:
+        fields = ["pulse_id", *fields]
+    query = create_pulses_with_ids_query(ids, fields)
+
     # Assert wanted pulses exist
     assert_pulses_exist(pulse_ids=ids, db=db)
 
-    # Save wanted ID's in a temporary table
-    db.bulk_save_objects([TemporaryPulseIdTable(pulse_id=idx) for idx in ids])
-    db.commit()
+    pulses = db.exec(query).all()
+    return annotate_pulses(
+        pulses,
+        db=db,
+        explicit_delays=explicit_delays,
+        fields=fields,
+    )
 
-    # Select all pulses whose ID is in the temporary table
-    pulses = db.exec(
-        select(Pulse).join(
-            TemporaryPulseIdTable,
-            col(TemporaryPulseIdTable.pulse_id) == col(Pulse.pulse_id),
-            isouter=False,
-        ),
-    ).all()
 
-    # Find all attributes for the selected pulses
-    pulse_attrs = read_pulse_attrs(pulse_ids=ids, db=db, check_pulses_exist=False)
+def stream_pulses_with_ids(
+    ids: list[UUID],
+    db: Session = Depends(get_session),
+    *,
+    explicit_delays: bool = True,
+    fields: Sequence[str] | None = None,
+) -> Iterator[AnnotatedPulseRead]:
+    """Get pulses with their attributes, in the order of ids, as they are read.
 
-    # Delete the entries from the temporary table again
-    # This raises a warning, but SQLModel's alternative solution does not work
-    db.query(TemporaryPulseIdTable).delete()
-    db.commit()
-    return [
-        AnnotatedPulseRead.new(pulse=pulse, attrs=pulse_attrs[pulse.pulse_id])
-        for pulse in pulses
-    ]
+    Like read_pulses_with_ids, but only a batch of pulses is held in memory at a
+    time. The pulses are read with a server-side cursor in a session of their own,
+    so the iterator can be consumed after db is closed, e.g. by a StreamingResponse.
+    That session checks that the pulses exist before returning, in the snapshot
+    they are then read in, so none can be deleted in between.
+    """
+    if fields is not None:
+        fields = ["pulse_id", *fields]
+    query = create_pulses_with_ids_query(ids, fields).execution_options(
+        yield_per=get_settings().STREAM_READ_BATCH_SIZE,
+    )
+    stream_db = Session(db.get_bind())
+    try:
+        stream_db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        assert_pulses_exist(pulse_ids=ids, db=stream_db)
+    except BaseException:
+        stream_db.close()
+        raise
+
+    def stream() -> Iterator[AnnotatedPulseRead]:
+        with stream_db:
+            for pulses in stream_db.exec(query).partitions():
+                yield from annotate_pulses(
+                    pulses,
+                    db=stream_db,
+                    explicit_delays=explicit_delays,
+                    fields=fields,
+                )
 
+    return stream()
 
-def read_pulse(pulse_id: UUID, db: Session = Depends(get_session)) -> PulseRead:
+
+def read_pulse(
+    pulse_id: UUID,
+    db: Session = Depends(get_session),
+    *,
+    explicit_delays: bool = True,
+) -> PulseRead:
     pulse = db.get(Pulse, pulse_id)
     if not pulse:
         raise PulseNotFoundError(pulse_id=pulse_id)
-    return PulseRead.model_validate(pulse)
+    return PulseRead.from_pulse(pulse, explicit_delays=explicit_delays)
@@ -1,12 +1,35 @@
-from collections.abc import Sequence
-from uuid import UUID
+from __future__ import annotations
 
-from fastapi import Depends
+import json
+import struct
+import sys
+from array import array
+from typing import TYPE_CHECKING, Any
+
+from fastapi import Depends, Request
 from sqlmodel import Session, col, select
 
 from api.database import get_session
-from api.public.pulse.models import Pulse
+from api.public.attrs.models import PulseAttrsFloatRead
+from api.public.pulse.models import AnnotatedPulseRead, Pulse, PulseRead
 from api.utils.exceptions import PulseNotFoundError
+from api.utils.streaming import accepts_media_type
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from uuid import UUID
+
+# Binary, columnar alternative to JSON for reading pulses. The layout is:
+#   8 bytes  magic, b"TSCOL1\0\0"
+#   8 bytes  little-endian uint64, length of the JSON header
+#   header   UTF-8 JSON describing columns, buffers and attribute side tables
+#   padding  zero bytes up to an 8-byte boundary
+#   buffers  packed little-endian float64 and int64 arrays
+# Buffer offsets in the header are relative to the start of the buffers, and every
+# buffer is 8-byte aligned, so e.g. numpy.frombuffer can read them without copying.
+PULSE_COLUMNAR_MEDIA_TYPE = "application/vnd.terastore.pulses.columnar"
+PULSE_COLUMNAR_MAGIC = b"TSCOL1\0\0"
+PULSE_ARRAY_COLUMNS = ("delays", "signal", "signal_error")
 
 
 def assert_pulses_exist(
@@ -26,3 +49,85 @@ def assert_pulses_exist(
                 pulse_id for pulse_id in pulse_ids if pulse_id not in existing_pulses
             ],
         )
+
+
+def accepts_columnar(request: Request) -> bool:
+    """Check whether the client asked for the binary columnar pulse format."""
+    return accepts_media_type(request, PULSE_COLUMNAR_MEDIA_TYPE)
+
+
+def _pack(values: array[Any]) -> bytes:
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_pulses_columnar(pulses: Sequence[PulseRead | AnnotatedPulseRead]) -> bytes:
+    """Encode pulses in the binary columnar format.
+
+    Each array column is stored as one concatenated float64 buffer, plus an int64
+    buffer of n_pulses + 1 offsets into it, so the values of pulse i are
+    values[offsets[i]:offsets[i + 1]]. A missing signal_error has zero length and
+    is marked in the signal_error_valid column. Likewise, delays given as a grid
+    have zero length, and the grid is given in the delays_grid column.
+    Attributes are returned as one side table per data type, where pulse_index
+    refers to the position of the pulse in the columns.
+    """
+    buffers: list[bytes] = []
+    buffers_meta: dict[str, dict[str, Any]] = {}
+    position = 0
+
+    def add_buffer(name: str, values: array[Any]) -> None:
+        nonlocal position
+        buffers.append(_pack(values))
+        buffers_meta[name] = {
+            "offset": position,
+            "length": len(values),
+            "dtype": "<f8" if values.typecode == "d" else "<i8",
+        }
+        position += len(buffers[-1])
+
+    for column in PULSE_ARRAY_COLUMNS:
+        values = array("d")
+        offsets = array("q", [0])
+        for pulse in pulses:
+            values.extend(getattr(pulse, column) or [])
+            offsets.append(len(values))
+        add_buffer(column, values)
+        add_buffer(f"{column}_offsets", offsets)
+
+    str_attrs: dict[str, list[Any]] = {"pulse_index": [], "key": [], "value": []}
+    float_attrs: dict[str, list[Any]] = {"pulse_index": [], "key": [], "value": []}
+    for pulse_index, pulse in enumerate(pulses):
+        if not isinstance(pulse, AnnotatedPulseRead):
+            continue
+        for attr in pulse.pulse_attributes:
+            table = float_attrs if isinstance(attr, PulseAttrsFloatRead) else str_attrs
+            table["pulse_index"].append(pulse_index)
+            table["key"].append(attr.key)
+            table["value"].append(attr.value)
+
+    header = json.dumps(
+        {
+            "n_pulses": len(pulses),
+            "columns": {
+                "pulse_id": [str(pulse.pulse_id) for pulse in pulses],
+                "device_id": [str(pulse.device_id) for pulse in pulses],
+                "integration_time_ms": [pulse.integration_time_ms for pulse in pulses],
+                "creation_time": [pulse.creation_time.isoformat() for pulse in pulses],
+                "signal_error_valid": [
+                    pulse.signal_error is not None for pulse in pulses
+                ],
+                "delays_grid": [
+                    pulse.delays_grid.model_dump() if pulse.delays_grid else None
+                    for pulse in pulses
+                ],
+            },
+            "buffers": buffers_meta,
+            "attributes": {"string": str_attrs, "float": float_attrs},
+        },
+    ).encode()
+    padding = b"\0" * (-(len(header) + 16) % 8)
+    return b"".join(
+        [PULSE_COLUMNAR_MAGIC, struct.pack("<Q", len(header)), header, padding],
+    ) + b"".join(buffers)
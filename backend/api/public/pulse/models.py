@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from datetime import datetime  # noqa: TCH003
-from typing import Any, Self, TypedDict
+from typing import TYPE_CHECKING, Any, Self, TypedDict, cast
 from uuid import UUID, uuid4
 
+from pydantic import BaseModel
 from sqlalchemy.dialects import postgresql
-from sqlmodel import Column, Field, Float, SQLModel
+from sqlmodel import Column, Field, Float, Index, SQLModel
 
+from api.config import get_settings
 from api.public.attrs.models import (
     AttrDict,
     PulseAttrs,
@@ -19,6 +21,19 @@ from api.utils.helpers import (
     generate_scaled_numbers,
     get_now,
 )
+from api.utils.sqltypes import PackedFloatArray
+from api.utils.types import PulseArrayStorage
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Sequence
+
+    from sqlalchemy.types import TypeEngine
+
+PULSE_ARRAY_TYPES: dict[PulseArrayStorage, TypeEngine[Sequence[float]]] = {
+    PulseArrayStorage.ARRAY: postgresql.ARRAY(Float),
+    PulseArrayStorage.PACKED: PackedFloatArray(),
+}
+PULSE_ARRAY_TYPE = PULSE_ARRAY_TYPES[get_settings().PULSE_ARRAY_STORAGE]
 
 
 class TPulseDict(TypedDict):
@@ -31,27 +46,68 @@ class TPulseDict(TypedDict):
     pulse_attributes: list[AttrDict]
 
 
+class DelaysGrid(BaseModel):
+    """Uniformly spaced delays, given by start + i * step for i in range(count)."""
+
+    start: float
+    step: float
+    count: int
+
+    @classmethod
+    def detect(
+        cls: type[DelaysGrid],
+        delays: Sequence[float],
+        tolerance: float,
+    ) -> DelaysGrid | None:
+        """Find the uniform grid matching delays, if there is one.
+
+        Every delay must be within tolerance times the step of its grid point.
+        """
+        count = len(delays)
+        if count < 2:  # noqa: PLR2004
+            return None
+        start = delays[0]
+        step = (delays[-1] - start) / (count - 1)
+        max_deviation = tolerance * abs(step)
+        # Written so that NaNs fail the check
+        if not all(
+            abs(delay - (start + i * step)) <= max_deviation
+            for i, delay in enumerate(delays)
+        ):
+            return None
+        return cls(start=start, step=step, count=count) if step else None
+
+    def expand(self: Self) -> list[float]:
+        return [self.start + i * self.step for i in range(self.count)]
+
+
 class PulseBase(SQLModel):
     """A Pulse is the data model representing a single pulse create by some Device.
 
     It is essentially a collection of delays and signal values, along with some
     metadata.
 
-    To work with arrays in Postgres, we need to use the postgresql.ARRAY type
-    from sqlalchemy.dialects. This is a custom type that is not supported by
-    the SQLModel library.
+    Arrays are stored either as the postgresql.ARRAY type from sqlalchemy.dialects,
+    or packed as bytes using PackedFloatArray, depending on PULSE_ARRAY_STORAGE.
+    Both are custom types that are not supported by the SQLModel library.
     See https://github.com/tiangolo/sqlmodel/issues/178.
 
+    Uniformly spaced delays are stored as a DelaysGrid instead, in which case
+    delays is None in the database.
+
     This class is the base class for all Pulse related models.
     This is mostly for FastAPI's sake.
     See: https://sqlmodel.tiangolo.com/tutorial/fastapi/multiple-models/
     """
 
-    delays: list[float] = Field(sa_column=Column(postgresql.ARRAY(Float)))
-    signal: list[float] = Field(sa_column=Column(postgresql.ARRAY(Float)))
+    delays: list[float] | None = Field(
+        default=None,
+        sa_column=Column(PULSE_ARRAY_TYPE),
+    )
+    signal: list[float] = Field(sa_column=Column(PULSE_ARRAY_TYPE))
     signal_error: list[float] | None = Field(
         default=None,
-        sa_column=Column(postgresql.ARRAY(Float)),
+        sa_column=Column(PULSE_ARRAY_TYPE),
     )
     integration_time_ms: int
     creation_time: datetime
@@ -65,15 +121,40 @@ class Pulse(PulseBase, table=True):
     """
 
     __tablename__ = "pulses"
+    # Pulses are paginated in this order
+    __table_args__ = (
+        Index("ix_pulses_creation_time_pulse_id", "creation_time", "pulse_id"),
+    )
 
     pulse_id: UUID = Field(default_factory=uuid4, primary_key=True)
+    delays_start: float | None = None
+    delays_step: float | None = None
+    delays_count: int | None = None
+
+    @property
+    def delays_grid(self: Self) -> DelaysGrid | None:
+        if (
+            self.delays_start is None
+            or self.delays_step is None
+            or self.delays_count is None
+        ):
+            return None
+        return DelaysGrid(
+            start=self.delays_start,
+            step=self.delays_step,
+            count=self.delays_count,
+        )
 
     @staticmethod
     def create(
         pulse: dict[str, Any],
+        delays_grid: DelaysGrid | None = None,
     ) -> Pulse:
         return Pulse(
-            delays=pulse["delays"],
+            delays=None if delays_grid else pulse["delays"],
+            delays_start=delays_grid.start if delays_grid else None,
+            delays_step=delays_grid.step if delays_grid else None,
+            delays_count=delays_grid.count if delays_grid else None,
             signal=pulse["signal"],
             signal_error=pulse["signal_error"],
             integration_time_ms=pulse["integration_time_ms"],
@@ -89,6 +170,7 @@ class PulseCreate(PulseBase):
     it is only here for FastAPI documentation purposes.
     """
 
+    delays: list[float]
     pulse_attributes: list[TPulseAttrsCreate]
 
     @classmethod
@@ -144,8 +226,14 @@ class PulseCreate(PulseBase):
             "pulse_attributes": pulse_attributes,
         }
 
+    def detect_delays_grid(self: Self) -> DelaysGrid | None:
+        return DelaysGrid.detect(self.delays, get_settings().DELAYS_GRID_TOLERANCE)
+
     def create_pulse(self: Self) -> tuple[Pulse, PulseAttrs]:
-        pulse = Pulse.create(self.model_dump(exclude={"pulse_attributes"}))
+        pulse = Pulse.create(
+            self.model_dump(exclude={"pulse_attributes"}),
+            delays_grid=self.detect_delays_grid(),
+        )
         pulse_attributes = PulseAttrs(
             pulse_id=pulse.pulse_id,
             pulse_attributes=self.pulse_attributes,
@@ -158,19 +246,65 @@ class PulseRead(PulseBase):
 
     This model is for FastAPI calls that return a Pulse
     from the db, as this requires the pulse_id.
+    Uniformly spaced delays are returned as delays_grid, unless they are expanded
+    with expand_delays.
     """
 
     pulse_id: UUID
+    delays_grid: DelaysGrid | None = None
+
+    @classmethod
+    def from_pulse(
+        cls: type[Self],
+        pulse: Pulse,
+        *,
+        explicit_delays: bool = True,
+        fields: Collection[str] | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Self:
+        """Create the read model of a pulse.
+
+        If fields are given, only those were loaded from the database. The read
+        model is then constructed without validation, with only those fields set,
+        so it should be serialized with exclude_unset. Delays are only expanded if
+        delays is among them, and delays_grid is kept if it is among them.
+        """
+        if fields is None:
+            pulse_read = cls(
+                **pulse.model_dump(),
+                delays_grid=pulse.delays_grid,
+                **kwargs,
+            )
+            if explicit_delays:
+                pulse_read.expand_delays()
+            return pulse_read
+
+        values = {
+            field: getattr(pulse, field)
+            for field in fields
+            if field in Pulse.model_fields
+        }
+        expand = explicit_delays and "delays" in fields
+        if "delays_grid" in fields or ("delays" in fields and not expand):
+            values["delays_grid"] = pulse.delays_grid
+        if expand and pulse.delays_grid is not None:
+            values["delays"] = pulse.delays_grid.expand()
+        # Typed as returning the class model_construct is called on
+        return cast("Self", cls.model_construct(**values, **kwargs))
+
+    def expand_delays(self: Self) -> None:
+        if self.delays_grid is not None:
+            self.delays = self.delays_grid.expand()
+            self.delays_grid = None
 
 
-class AnnotatedPulseRead(PulseBase):
+class AnnotatedPulseRead(PulseRead):
     """Model for reading a Pulse.
 
     This model is for FastAPI calls that return a Pulse
     from the db, as this requires the pulse_id.
     """
 
-    pulse_id: UUID
     pulse_attributes: list[TAttrReadDataType]
 
     @classmethod
@@ -178,19 +312,43 @@ class AnnotatedPulseRead(PulseBase):
         cls: type[AnnotatedPulseRead],
         pulse: Pulse,
         attrs: list[TAttrReadDataType],
+        *,
+        explicit_delays: bool = True,
+        fields: Collection[str] | None = None,
     ) -> AnnotatedPulseRead:
-        return cls(**pulse.model_dump(), pulse_attributes=attrs)
+        return cls.from_pulse(
+            pulse,
+            explicit_delays=explicit_delays,
+            fields=fields,
+            pulse_attributes=attrs,
+        )
 
 
-class TemporaryPulseIdTable(SQLModel, table=True):
-    """Temporary table for performing joins on pulse IDs.
+class PulseLineError(BaseModel):
+    """Errors for a single line of a streamed upload."""
 
-    Instead of using "SELECT .. WHERE id IN (...)"-style queries,
-    adding the ID's to a temporary table first can drastically improve performance.
+    line: int
+    errors: list[dict[str, Any]]
 
-    See this: https://stackoverflow.com/questions/5803472/sql-where-id-in-id1-id2-idn
-    """
 
-    __tablename__ = "temporary_pulse_id_table"
+class PulseStreamResult(BaseModel):
+    """Result of a streamed upload.
 
-    pulse_id: UUID = Field(default_factory=uuid4, primary_key=True)
+    Lines with errors are skipped, while all other pulses are written.
+    At most STREAM_INGEST_MAX_ERRORS line errors are reported, but error_count
+    counts all of them.
+    """
+
+    pulse_ids: list[UUID] = []
+    errors: list[PulseLineError] = []
+    error_count: int = 0
+
+    def add_error(
+        self: Self,
+        line: int,
+        errors: list[dict[str, Any]],
+        max_errors: int,
+    ) -> None:
+        self.error_count += 1
+        if len(self.errors) < max_errors:
+            self.errors.append(PulseLineError(line=line, errors=errors))
@@ -1,6 +1,10 @@
+from collections.abc import Sequence
+from typing import Any
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlmodel import Session
 
 from api.database import get_session
@@ -8,14 +12,74 @@ from api.public.attrs.crud import add_attr, read_pulse_attrs
 from api.public.attrs.models import PulseAttrsCreateBase, TAttrReadDataType
 from api.public.pulse.crud import (
     create_pulses,
+    create_pulses_from_stream,
+    get_next_pulses_cursor,
     read_pulse,
     read_pulses,
     read_pulses_with_ids,
+    stream_pulses_with_ids,
+)
+from api.public.pulse.helpers import (
+    PULSE_COLUMNAR_MEDIA_TYPE,
+    accepts_columnar,
+    encode_pulses_columnar,
+)
+from api.public.pulse.models import (
+    AnnotatedPulseRead,
+    PulseCreate,
+    PulseRead,
+    PulseStreamResult,
+)
+from api.utils.pagination import (
+    CURSOR_QUERY,
+    NEXT_CURSOR_HEADER,
+    NEXT_CURSOR_RESPONSE,
+)
+from api.utils.streaming import (
+    NDJSON_MEDIA_TYPE,
+    accepts_media_type,
+    stream_models_ndjson,
 )
-from api.public.pulse.models import AnnotatedPulseRead, PulseCreate, PulseRead
 
 router = APIRouter()
 
+EXPLICIT_DELAYS_QUERY = Query(
+    default=True,
+    description=(
+        "Return uniformly spaced delays as a full list. "
+        "Otherwise they are returned as delays_grid, with delays set to null."
+    ),
+)
+
+FIELDS_QUERY = Query(
+    default=None,
+    description=(
+        "Only load and return these fields of each pulse, and pulse_id. "
+        "Ignored for the columnar format, which always has all fields."
+    ),
+)
+
+COLUMNAR_RESPONSE: dict[int | str, dict[str, Any]] = {
+    200: {
+        "content": {PULSE_COLUMNAR_MEDIA_TYPE: {}},
+        "description": (
+            "Pulses as JSON, or in the binary columnar format if "
+            f"'{PULSE_COLUMNAR_MEDIA_TYPE}' is given in the Accept header."
+        ),
+    },
+}
+
+
+def projected_response(
+    pulses: Sequence[PulseRead],
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """Return pulses read with fields, bypassing validation of the missing fields."""
+    return JSONResponse(
+        content=jsonable_encoder(pulses, exclude_unset=True),
+        headers=headers,
+    )
+
 
 @router.post("/create")
 def add_pulses(
@@ -25,26 +89,116 @@ def add_pulses(
     return create_pulses(pulses=pulses, db=db)
 
 
-@router.get("")
-def get_pulses(
-    offset: int = 0,
+@router.post(
+    "/create/stream",
+    openapi_extra={
+        "requestBody": {
+            "description": "Newline-delimited JSON, one PulseCreate per line.",
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+        },
+    },
+)
+async def add_pulses_stream(
+    request: Request,
+    db: Session = Depends(get_session),
+) -> PulseStreamResult:
+    return await create_pulses_from_stream(chunks=request.stream(), db=db)
+
+
+@router.get(
+    "",
+    response_model=list[PulseRead],
+    responses={200: COLUMNAR_RESPONSE[200] | NEXT_CURSOR_RESPONSE[200]},
+)
+def get_pulses(  # noqa: PLR0913
+    request: Request,
+    response: Response,
+    offset: int = Query(default=0, deprecated=True),
     limit: int = Query(default=100, lte=100),
+    cursor: str | None = CURSOR_QUERY,
+    explicit_delays: bool = EXPLICIT_DELAYS_QUERY,  # noqa: FBT001
+    fields: list[str] | None = FIELDS_QUERY,
     db: Session = Depends(get_session),
-) -> list[PulseRead]:
-    return read_pulses(offset=offset, limit=limit, db=db)
+) -> list[PulseRead] | Response:
+    columnar = accepts_columnar(request)
+    pulses = read_pulses(
+        offset=offset,
+        limit=limit,
+        db=db,
+        cursor=cursor,
+        explicit_delays=explicit_delays,
+        fields=None if columnar else fields,
+    )
+    next_cursor = get_next_pulses_cursor(pulses, limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if columnar:
+        return Response(
+            content=encode_pulses_columnar(pulses),
+            media_type=PULSE_COLUMNAR_MEDIA_TYPE,
+            headers=headers,
+        )
+    if fields is not None:
+        return projected_response(pulses, headers)
+    response.headers.update(headers)
+    return pulses
 
 
-@router.post("/get")
+@router.post(
+    "/get",
+    response_model=list[AnnotatedPulseRead],
+    responses={
+        200: {
+            "content": {PULSE_COLUMNAR_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPE: {}},
+            "description": (
+                "Pulses as JSON, or in the binary columnar format if "
+                f"'{PULSE_COLUMNAR_MEDIA_TYPE}' is given in the Accept header. "
+                f"If '{NDJSON_MEDIA_TYPE}' is given, pulses are streamed as they "
+                "are read, one JSON object per line."
+            ),
+        },
+    },
+)
 def get_pulses_from_ids(
+    request: Request,
     ids: list[UUID],
+    explicit_delays: bool = EXPLICIT_DELAYS_QUERY,  # noqa: FBT001
+    fields: list[str] | None = FIELDS_QUERY,
     db: Session = Depends(get_session),
-) -> list[AnnotatedPulseRead]:
-    return read_pulses_with_ids(ids, db=db)
+) -> list[AnnotatedPulseRead] | Response:
+    if accepts_media_type(request, NDJSON_MEDIA_TYPE):
+        return stream_models_ndjson(
+            stream_pulses_with_ids(
+                ids,
+                db=db,
+                explicit_delays=explicit_delays,
+                fields=fields,
+            ),
+            exclude_unset=fields is not None,
+        )
+    columnar = accepts_columnar(request)
+    pulses = read_pulses_with_ids(
+        ids,
+        db=db,
+        explicit_delays=explicit_delays,
+        fields=None if columnar else fields,
+    )
+    if columnar:
+        return Response(
+            content=encode_pulses_columnar(pulses),
+            media_type=PULSE_COLUMNAR_MEDIA_TYPE,
+        )
+    if fields is not None:
+        return projected_response(pulses)
+    return pulses
 
 
 @router.get("/{pulse_id}")
-def get_pulse(pulse_id: UUID, db: Session = Depends(get_session)) -> PulseRead:
-    return read_pulse(pulse_id=pulse_id, db=db)
+def get_pulse(
+    pulse_id: UUID,
+    explicit_delays: bool = EXPLICIT_DELAYS_QUERY,  # noqa: FBT001
+    db: Session = Depends(get_session),
+) -> PulseRead:
+    return read_pulse(pulse_id=pulse_id, db=db, explicit_delays=explicit_delays)
 
 
 @router.put("/{pulse_id}/attrs")
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import io
+import struct
+from datetime import UTC, datetime, timedelta, timezone, tzinfo
+from functools import lru_cache, partial
+from itertools import chain, repeat
+from typing import TYPE_CHECKING, Any, Self, TypeAlias, cast
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.errors import NumericValueOutOfRange
+from sqlalchemy import (
+    ARRAY,
+    DateTime,
+    Float,
+    Integer,
+    LargeBinary,
+    String,
+    TypeDecorator,
+    Uuid,
+)
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+from sqlmodel.sql.sqltypes import GUID
+
+from api.utils.sqltypes import PackedFloatArray, pack_floats
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+    from uuid import UUID
+
+    from psycopg2.extensions import connection
+    from sqlalchemy import Column
+    from sqlalchemy.types import TypeEngine
+    from sqlmodel import Session
+
+TEncoder: TypeAlias = "Callable[[object], bytes]"
+
+# See https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+PG_NULL = struct.pack(">i", -1)
+PG_EPOCH = datetime(2000, 1, 1)  # noqa: DTZ001
+FLOAT8_OID = 701
+INT4_MIN = -(2**31)
+INT4_MAX = 2**31 - 1
+
+
+@lru_cache(maxsize=64)
+def _float8_elements_struct(length: int) -> struct.Struct:
+    # Every array element is prefixed with its byte length
+    return struct.Struct(">" + "id" * length)
+
+
+def encode_float8_array(values: Sequence[float]) -> bytes:
+    """Encode a one-dimensional float8[] in PostgreSQL's binary format.
+
+    Only float arrays are stored in the database, so this is the only array type
+    supported by binary COPY.
+    """
+    length = len(values)
+    header = struct.pack(">iiiii", 1, 0, FLOAT8_OID, length, 1)
+    elements = _float8_elements_struct(length).pack(
+        *chain.from_iterable(zip(repeat(8), values, strict=False)),
+    )
+    return header + elements
+
+
+def encode_timestamp(value: datetime, time_zone: tzinfo = UTC) -> bytes:
+    """Encode a timestamp without time zone as microseconds since 2000-01-01.
+
+    Aware datetimes are converted to time_zone, which must be the TimeZone of the
+    connection for them to be stored like PostgreSQL stores them for the ORM.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(time_zone).replace(tzinfo=None)
+    delta = value - PG_EPOCH
+    return struct.pack(
+        ">q",
+        (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds,
+    )
+
+
+def _encode_uuid(value: object) -> bytes:
+    return cast("UUID", value).bytes
+
+
+def _encode_float8_array(value: object) -> bytes:
+    return encode_float8_array(cast("Sequence[float]", value))
+
+
+def _encode_packed_floats(value: object) -> bytes:
+    return pack_floats(cast("Sequence[float]", value))
+
+
+def _encode_float8(value: object) -> bytes:
+    return struct.pack(">d", value)
+
+
+def _encode_int4(value: object) -> bytes:
+    if not INT4_MIN <= cast("int", value) <= INT4_MAX:
+        # What PostgreSQL raises when the ORM writes the value
+        error_str = "integer out of range"
+        raise NumericValueOutOfRange(error_str)
+    return struct.pack(">i", value)
+
+
+def _encode_timestamp(value: object, time_zone: tzinfo) -> bytes:
+    return encode_timestamp(cast("datetime", value), time_zone)
+
+
+def _encode_text(value: object) -> bytes:
+    return cast("str", value).encode()
+
+
+def _encode_bytea(value: object) -> bytes:
+    return bytes(cast("bytes", value))
+
+
+# Checked in order, so e.g. BigInteger must come before Integer
+BINARY_ENCODERS: tuple[tuple[type[TypeEngine[Any]], TEncoder], ...] = (
+    (GUID, _encode_uuid),
+    (PackedFloatArray, _encode_packed_floats),
+    (Uuid, _encode_uuid),
+    (ARRAY, _encode_float8_array),
+    (Float, _encode_float8),
+    (Integer, _encode_int4),
+    (String, _encode_text),
+    (LargeBinary, _encode_bytea),
+)
+
+
+def get_connection_time_zone(driver_connection: connection) -> tzinfo:
+    """Get the TimeZone PostgreSQL converts aware timestamps to on a connection."""
+    name = driver_connection.get_parameter_status("TimeZone") or "UTC"
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        # E.g. a POSIX time zone, approximated by its current offset
+        with driver_connection.cursor() as cursor:
+            cursor.execute("SELECT EXTRACT(TIMEZONE FROM now())::int")
+            row = cursor.fetchone()
+        return timezone(timedelta(seconds=row[0] if row else 0))
+
+
+def get_binary_encoder(column: Column[Any], time_zone: tzinfo = UTC) -> TEncoder:
+    """Find the binary COPY encoder for the PostgreSQL type of a table column.
+
+    Aware datetimes are converted to time_zone, see encode_timestamp.
+    """
+    column_type: TypeEngine[Any] = column.type
+    while True:
+        if isinstance(column_type, DateTime):
+            return partial(_encode_timestamp, time_zone=time_zone)
+        for sa_type, encoder in BINARY_ENCODERS:
+            if isinstance(column_type, sa_type):
+                return encoder
+        # E.g. SQLModel's AutoString is a decorated String
+        if not isinstance(column_type, TypeDecorator):
+            break
+        column_type = column_type.impl_instance
+    error_str = f"No binary COPY encoder for column {column.name} ({column_type})"
+    raise TypeError(error_str)
+
+
+class BinaryRowStream(io.RawIOBase):
+    """A file-like object producing a binary COPY payload lazily from rows.
+
+    Passing this to COPY ... FROM STDIN keeps memory bounded by the size of a single
+    row, instead of materializing the whole payload up front. psycopg2 reports
+    errors raised while reading as a cancelled COPY, so the error of a value that
+    cannot be encoded is kept in error, see copy_rows.
+    """
+
+    def __init__(
+        self: Self,
+        rows: Iterable[Sequence[object]],
+        encoders: Sequence[TEncoder],
+    ) -> None:
+        super().__init__()
+        self._rows: Iterator[Sequence[object]] = iter(rows)
+        self._encoders = encoders
+        self._field_count = struct.pack(">h", len(encoders))
+        self._buffer = bytearray(PGCOPY_HEADER)
+        self._exhausted = False
+        self.error: psycopg2.Error | None = None
+
+    def readable(self: Self) -> bool:
+        return True
+
+    def _encode_row(self: Self, row: Sequence[object]) -> None:
+        self._buffer += self._field_count
+        for encoder, value in zip(self._encoders, row, strict=True):
+            if value is None:
+                self._buffer += PG_NULL
+                continue
+            encoded = encoder(value)
+            self._buffer += struct.pack(">i", len(encoded))
+            self._buffer += encoded
+
+    def read(self: Self, size: int = -1) -> bytes:
+        while not self._exhausted and (size < 0 or len(self._buffer) < size):
+            row = next(self._rows, None)
+            if row is None:
+                self._buffer += PGCOPY_TRAILER
+                self._exhausted = True
+                break
+            try:
+                self._encode_row(row)
+            except psycopg2.Error as e:
+                self.error = e
+                raise
+            except struct.error as e:
+                self.error = psycopg2.DataError(str(e))
+                raise
+
+        if size < 0:
+            size = len(self._buffer)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
+
+
+def copy_rows(
+    db: Session,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[object]],
+) -> None:
+    """Write rows to a table with PostgreSQL's binary COPY ... FROM STDIN.
+
+    Values are encoded according to the column types of the SQLModel table, so
+    floats never pass through a text representation. The COPY runs on the
+    connection of the session's current transaction, so the rows are only visible
+    once the session commits, and are discarded on rollback. Errors are raised as
+    the SQLAlchemy exceptions the ORM would raise, e.g. DataError.
+    """
+    table_columns = SQLModel.metadata.tables[table].columns
+    statement = sql.SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary)")
+    driver_connection = cast(
+        "connection",
+        db.connection().connection.driver_connection,
+    )
+    time_zone = get_connection_time_zone(driver_connection)
+    encoders = [
+        get_binary_encoder(table_columns[column], time_zone) for column in columns
+    ]
+    query = statement.format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(", ").join(sql.Identifier(c) for c in columns),
+    )
+    stream = BinaryRowStream(rows, encoders)
+    with driver_connection.cursor() as cursor:
+        try:
+            # The stubs only allow text files, but binary COPY needs bytes
+            cursor.copy_expert(query, stream)  # type: ignore[arg-type]
+        except psycopg2.Error as e:
+            raise DBAPIError.instance(
+                query.as_string(driver_connection),
+                None,
+                stream.error if stream.error is not None else e,
+                psycopg2.Error,
+            ) from e
@@ -92,3 +92,13 @@ async def credentials_incorrect_exception_handler(
         content={"detail": str(exc)},
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def invalid_cursor_exception_handler(
+    _request: Request,
+    exc: Exception,
+) -> Response:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": str(exc)},
+    )
@@ -52,16 +52,19 @@ class AttrDataTypeExistsError(Exception):
 
 
 class AttrKeyDoesNotExistError(Exception):
-    """Exception raised when a key does not exist."""
+    """Exception raised when one or more keys do not exist."""
 
     def __init__(
         self: Self,
-        key: str,
+        key: str | list[str],
     ) -> None:
         self.key = key
-        super().__init__(
-            f"Key {key} does not exist.",
-        )
+        if isinstance(key, str) or len(key) == 1:
+            single_key = key if isinstance(key, str) else key[0]
+            message = f"Key {single_key} does not exist."
+        else:
+            message = f"Keys {', '.join(key)} do not exist."
+        super().__init__(message)
 
 
 class AttrDataTypeDoesNotExistError(Exception):
@@ -110,3 +113,16 @@ class CredentialsIncorrectError(Exception):
         super().__init__(
             "Could not validate credentials.",
         )
+
+
+class InvalidCursorError(Exception):
+    """Exception raised when a pagination cursor cannot be decoded."""
+
+    def __init__(
+        self: Self,
+        cursor: str,
+    ) -> None:
+        self.cursor = cursor
+        super().__init__(
+            f"Invalid cursor: {cursor}",
+        )
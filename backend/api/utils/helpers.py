@@ -1,9 +1,14 @@
 import secrets
+from collections.abc import AsyncIterable, AsyncIterator, Sequence
 from datetime import datetime
 from uuid import UUID
 from zoneinfo import ZoneInfo
 
 from pydantic import BaseModel
+from sqlalchemy import Uuid
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.elements import Cast
+from sqlmodel import cast
 
 from api.utils.exceptions import PulseColumnNonexistentError
 from api.utils.types import TPulseCols
@@ -46,14 +51,13 @@ def create_mock_pulse(
     }
 
 
-def extract_device_id_from_pgerror(pgerror: str) -> UUID:
-    """Find a device_id in a PostgreSQL error message."""
-    detail = pgerror.split("Key (device_id)=(")[1]
-    uuid = detail.split(")")[0]
-    if uuid:
-        return UUID(uuid)
-    error_str = "No device_id found in error message."
-    raise ValueError(error_str)
+def uuid_array(ids: Sequence[UUID]) -> Cast[Sequence[UUID]]:
+    """Bind a list of UUIDs as a single uuid[] parameter.
+
+    Unlike "WHERE id IN (...)", the statement stays the same size no matter how many
+    IDs are given. Use with unnest(...) for joins, or any_(...) for filters.
+    """
+    return cast(list(ids), postgresql.ARRAY(Uuid))
 
 
 def get_model_columns_from_names(
@@ -73,3 +77,25 @@ def get_model_columns_from_names(
             columns=list(model.model_json_schema()["properties"]),
         ) from e
     return fields
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[tuple[int, bytes]]:
+    """Split a stream of byte chunks into non-empty lines.
+
+    Yields the 1-indexed line number along with each line, and only ever holds a
+    single partial line in memory.
+    """
+    buffer = bytearray()
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, rest = buffer.split(b"\n")
+        buffer = bytearray(rest)
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, bytes(line)
+    if buffer.strip():
+        yield line_number + 1, bytes(buffer)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Self
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection, ExceptionContext
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Read by prometheus_client when it is imported, so it must be set before
+MULTIPROCESS_DIR_ENV_VAR = "PROMETHEUS_MULTIPROC_DIR"
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+# Label of requests that match no route, so unknown paths do not add series
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_LABELS = ["method", "route", "status"]
+REQUEST_DURATION = Histogram(
+    "terastore_http_request_duration_seconds",
+    "Time from receiving a request until its response is sent.",
+    REQUEST_LABELS,
+)
+RESPONSE_SIZE = Histogram(
+    "terastore_http_response_size_bytes",
+    "Size of response bodies.",
+    REQUEST_LABELS,
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+)
+REQUEST_QUERIES = Histogram(
+    "terastore_db_queries_per_request",
+    "Database queries run while serving a request.",
+    REQUEST_LABELS,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 1_000),
+)
+REQUEST_DB_DURATION = Histogram(
+    "terastore_db_duration_seconds_per_request",
+    "Time spent running database queries while serving a request.",
+    REQUEST_LABELS,
+)
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Queries are only counted while a request is served. The threadpool and the
+# greenlets of async sessions copy the context, so they update the same stats.
+_request_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "request_query_stats",
+    default=None,
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(connection: Connection, *_args: Any) -> None:  # noqa: ANN401
+    if _request_query_stats.get() is not None:
+        connection.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(connection: Connection, *_args: Any) -> None:  # noqa: ANN401
+    stats = _request_query_stats.get()
+    start_times = connection.info.get("query_start_times")
+    if stats is not None and start_times:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - start_times.pop()
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_query_timer(exception_context: ExceptionContext) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_times"):
+        connection.info["query_start_times"].pop()
+
+
+class MetricsMiddleware:
+    """Record the latency, response size and database use of every request.
+
+    Requests are labelled by the template of the route they match, as labelling
+    by path would create a series for every device and pulse.
+    """
+
+    def __init__(self: Self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self: Self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_and_measure(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = QueryStats()
+        token = _request_query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            duration = time.perf_counter() - start
+            _request_query_stats.reset(token)
+            # The router adds the matched route to the scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            labels = (scope["method"], route, str(status))
+            REQUEST_DURATION.labels(*labels).observe(duration)
+            RESPONSE_SIZE.labels(*labels).observe(size)
+            REQUEST_QUERIES.labels(*labels).observe(stats.queries)
+            REQUEST_DB_DURATION.labels(*labels).observe(stats.seconds)
+
+
+def prepare_multiprocess_dir(path: str) -> None:
+    """Create the directory workers share metrics through, removing stale ones."""
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    for metrics_file in directory.glob("*.db"):
+        metrics_file.unlink()
+
+
+def remove_worker_gauges() -> None:
+    """Stop summing the gauges of this worker, e.g. its pools, as it is exiting."""
+    if MULTIPROCESS_DIR_ENV_VAR in os.environ:
+        mark_process_dead(os.getpid())
+
+
+def generate_metrics() -> bytes:
+    """Export the metrics of all workers in the Prometheus text format."""
+    if MULTIPROCESS_DIR_ENV_VAR not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return generate_latest(registry)
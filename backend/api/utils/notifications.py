@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import logging
+import select
+import threading
+from collections import defaultdict
+from contextlib import closing, contextmanager
+from typing import TYPE_CHECKING, Self
+
+import psycopg2
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, func
+from sqlmodel import select as sql_select
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding the channels notified by the transaction
+PENDING_NOTIFICATIONS_INFO = "pending_notifications"
+# Seconds between checks for whether the listener should stop
+LISTENER_POLL_INTERVAL = 1.0
+# Seconds to wait before reconnecting after the listener lost its connection
+LISTENER_RECONNECT_DELAY = 5.0
+
+_callbacks: defaultdict[str, list[Callable[[], None]]] = defaultdict(list)
+
+
+def subscribe(channel: str, callback: Callable[[], None]) -> None:
+    """Call callback in every worker after a transaction notifying channel commits.
+
+    Callbacks run on the listener thread, or on the committing thread in the
+    worker that committed, so they must be thread-safe and quick.
+    """
+    _callbacks[channel].append(callback)
+
+
+def _run_callbacks(channel: str) -> None:
+    for callback in _callbacks[channel]:
+        callback()
+
+
+def notify(db: Session, channel: str) -> None:
+    """Notify all workers subscribed to channel once db commits.
+
+    PostgreSQL only delivers the notification once the transaction commits.
+    This worker runs its own callbacks on commit, as it may serve the next
+    request before its listener is notified.
+    """
+    db.exec(sql_select(func.pg_notify(channel, "")))
+    db.info.setdefault(PENDING_NOTIFICATIONS_INFO, set()).add(channel)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _notify_after_commit(session: OrmSession) -> None:
+    for channel in session.info.pop(PENDING_NOTIFICATIONS_INFO, ()):
+        _run_callbacks(channel)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_after_rollback(session: OrmSession) -> None:
+    session.info.pop(PENDING_NOTIFICATIONS_INFO, None)
+
+
+class NotificationListener(threading.Thread):
+    """Thread running the callbacks of channels notified by other workers.
+
+    It listens on its own connection, outside of the connection pool.
+    """
+
+    def __init__(self: Self, engine: Engine) -> None:
+        super().__init__(name="notification-listener", daemon=True)
+        self._dsn = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False,
+        )
+        self._stop_event = threading.Event()
+        self._reconnecting = False
+
+    def run(self: Self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+            except psycopg2.Error:
+                logger.exception("Notification listener lost its connection")
+                self._stop_event.wait(LISTENER_RECONNECT_DELAY)
+
+    def _listen(self: Self) -> None:
+        with closing(psycopg2.connect(self._dsn)) as connection:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                # Channels are module constants, so formatting them in is safe
+                for channel in list(_callbacks):
+                    cursor.execute(f"LISTEN {channel}")
+            # Notifications may have been missed while reconnecting
+            if self._reconnecting:
+                for channel in list(_callbacks):
+                    _run_callbacks(channel)
+            self._reconnecting = True
+
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select(
+                    [connection],
+                    [],
+                    [],
+                    LISTENER_POLL_INTERVAL,
+                )
+                if not readable:
+                    continue
+                connection.poll()
+                channels = {notify.channel for notify in connection.notifies}
+                connection.notifies.clear()
+                for channel in channels:
+                    _run_callbacks(channel)
+
+    def stop(self: Self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+@contextmanager
+def listen_for_notifications(engine: Engine) -> Iterator[None]:
+    """Run the callbacks of channels notified by other workers while in the context."""
+    listener = NotificationListener(engine)
+    listener.start()
+    try:
+        yield
+    finally:
+        listener.stop()
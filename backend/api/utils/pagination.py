@@ -0,0 +1,58 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, TypeVar
+
+from fastapi import Query
+from pydantic import TypeAdapter
+
+from api.utils.exceptions import InvalidCursorError
+
+T = TypeVar("T")
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+CURSOR_QUERY = Query(
+    default=None,
+    description=(
+        f"Return the page after the one that returned this {NEXT_CURSOR_HEADER}."
+    ),
+)
+
+NEXT_CURSOR_RESPONSE: dict[int | str, dict[str, Any]] = {
+    200: {
+        "headers": {
+            NEXT_CURSOR_HEADER: {
+                "description": "Cursor for the next page, unless this is the last.",
+                "schema": {"type": "string"},
+            },
+        },
+    },
+}
+
+TOTAL_COUNT_RESPONSE: dict[int | str, dict[str, Any]] = {
+    200: {
+        "headers": {
+            TOTAL_COUNT_HEADER: {
+                "description": "Total number of results, if requested with count.",
+                "schema": {"type": "integer"},
+            },
+        },
+    },
+}
+
+
+def encode_cursor(adapter: TypeAdapter[T], key: T) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    return urlsafe_b64encode(adapter.dump_json(key)).decode()
+
+
+def decode_cursor(adapter: TypeAdapter[T], cursor: str) -> T:
+    """Decode a cursor made by encode_cursor back into a sort key.
+
+    Raises an InvalidCursorError if the cursor was not made with the same adapter.
+    """
+    try:
+        return adapter.validate_json(urlsafe_b64decode(cursor))
+    # Covers both invalid base64 and pydantic's ValidationError
+    except ValueError as e:
+        raise InvalidCursorError(cursor=cursor) from e
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, Self
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Dialect, Engine
+    from sqlalchemy.pool import ConnectionPoolEntry, PoolProxiedConnection
+
+# Exported by /metrics with the request metrics, see api.utils.metrics. The state
+# of the pools is summed over the workers that are running.
+POOL_LABELS = ["engine"]
+POOL_SIZE = Gauge(
+    "terastore_db_pool_size",
+    "Connections the pools keep open.",
+    POOL_LABELS,
+    multiprocess_mode="livesum",
+)
+POOL_CHECKED_OUT = Gauge(
+    "terastore_db_pool_checked_out_connections",
+    "Connections in use.",
+    POOL_LABELS,
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "terastore_db_pool_overflow_connections",
+    "Connections open beyond the size of the pools.",
+    POOL_LABELS,
+    multiprocess_mode="livesum",
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "terastore_db_pool_checkout_wait_seconds",
+    "Time from requesting a connection until the pool hands one out.",
+    POOL_LABELS,
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "terastore_db_pool_checkout_timeouts",
+    "Requests for a connection that timed out waiting for the pool.",
+    POOL_LABELS,
+)
+POOL_CONNECT_DURATION = Histogram(
+    "terastore_db_pool_connect_seconds",
+    "Time to open a connection to the database.",
+    POOL_LABELS,
+)
+POOL_CONNECTION_EVENTS = Counter(
+    "terastore_db_pool_connection_events",
+    "Connections opened, closed and invalidated by the pools.",
+    [*POOL_LABELS, "event"],
+)
+
+_CONNECT_START_TIME = "connect_start_time"
+
+
+class PoolMetrics:
+    """Record the metrics of the connection pool of an engine.
+
+    Waits include opening a connection and pinging it when needed. The gauges are
+    updated whenever a connection is checked out or returned, and when the pool is
+    replaced, as workers cannot be asked for their state when /metrics is read.
+    """
+
+    def __init__(self: Self, name: str) -> None:
+        self._checkout_wait = POOL_CHECKOUT_WAIT.labels(name)
+        self._checkout_timeouts = POOL_CHECKOUT_TIMEOUTS.labels(name)
+        self._connect_duration = POOL_CONNECT_DURATION.labels(name)
+        self._opened = POOL_CONNECTION_EVENTS.labels(name, "opened")
+        self._closed = POOL_CONNECTION_EVENTS.labels(name, "closed")
+        self._invalidated = POOL_CONNECTION_EVENTS.labels(name, "invalidated")
+        self._size = POOL_SIZE.labels(name)
+        self._checked_out = POOL_CHECKED_OUT.labels(name)
+        self._overflow = POOL_OVERFLOW.labels(name)
+
+    def record_pool_state(self: Self, pool: Pool) -> None:
+        # Only queue pools report their state
+        if isinstance(pool, QueuePool):
+            self._size.set(pool.size())
+            self._checked_out.set(pool.checkedout())
+            self._overflow.set(max(0, pool.overflow()))
+
+    def record_checkout(self: Self, wait: float, *, timed_out: bool) -> None:
+        if timed_out:
+            self._checkout_timeouts.inc()
+        else:
+            self._checkout_wait.observe(wait)
+
+    def record_connect_start(
+        self: Self,
+        _dialect: Dialect,
+        connection_record: ConnectionPoolEntry,
+        *_args: Any,  # noqa: ANN401
+    ) -> None:
+        connection_record.info[_CONNECT_START_TIME] = time.perf_counter()
+
+    def record_connect(
+        self: Self,
+        _dbapi_connection: Any,  # noqa: ANN401
+        connection_record: ConnectionPoolEntry,
+    ) -> None:
+        start = connection_record.info.pop(_CONNECT_START_TIME, None)
+        if start is not None:
+            self._connect_duration.observe(time.perf_counter() - start)
+        self._opened.inc()
+
+    def record_close(self: Self, *_args: Any) -> None:  # noqa: ANN401
+        self._closed.inc()
+
+    def record_invalidate(self: Self, *_args: Any) -> None:  # noqa: ANN401
+        self._invalidated.inc()
+
+
+class _TimedCheckoutPool(QueuePool):
+    """Pool recording how long checkouts wait, which no pool event covers."""
+
+    metrics: PoolMetrics | None = None
+
+    def connect(self: Self) -> PoolProxiedConnection:
+        if self.metrics is None:
+            return super().connect()
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.metrics.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, timed_out=False)
+        self.metrics.record_pool_state(self)
+        return connection
+
+    def _do_return_conn(self: Self, record: ConnectionPoolEntry) -> None:
+        # The checkin event fires before the connection is back in the pool
+        super()._do_return_conn(record)
+        if self.metrics is not None:
+            self.metrics.record_pool_state(self)
+
+    def recreate(self: Self) -> QueuePool:
+        # Engine.dispose replaces the pool with a recreated one
+        pool = super().recreate()
+        if isinstance(pool, _TimedCheckoutPool) and self.metrics is not None:
+            pool.metrics = self.metrics
+            self.metrics.record_pool_state(pool)
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(name: str, engine: Engine) -> PoolMetrics:
+    """Record metrics of the pool of engine, labelled with name.
+
+    Wait times are only recorded by the instrumented pool classes. For an
+    AsyncEngine, pass its sync_engine.
+    """
+    metrics = PoolMetrics(name)
+    if isinstance(engine.pool, _TimedCheckoutPool):
+        engine.pool.metrics = metrics
+    # Listeners on the engine are kept when its pool is recreated
+    event.listen(engine, "do_connect", metrics.record_connect_start)
+    event.listen(engine, "connect", metrics.record_connect)
+    event.listen(engine, "close", metrics.record_close)
+    event.listen(engine, "invalidate", metrics.record_invalidate)
+    metrics.record_pool_state(engine.pool)
+    return metrics
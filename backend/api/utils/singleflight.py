@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Generic, Self, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self: Self) -> None:
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """Coalesce concurrent calls with the same key into a single call.
+
+    The first caller runs the function, and callers arriving while it runs wait
+    for and share its result, or its exception. Results must therefore not be
+    bound to the caller's session, and keys must include everything the result
+    depends on.
+    """
+
+    def __init__(self: Self) -> None:
+        self._calls: dict[Hashable, _Call[T]] = {}
+        self._lock = threading.Lock()
+
+    def do(self: Self, key: Hashable, function: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[return-value]
+
+        try:
+            call.result = function()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight(Generic[T]):
+    """Like SingleFlight, but for coroutines on a single event loop.
+
+    SingleFlight would block the event loop while waiting for the first caller.
+    """
+
+    def __init__(self: Self) -> None:
+        self._calls: dict[Hashable, asyncio.Future[T]] = {}
+
+    async def do(self: Self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is not None:
+            # A cancelled caller must not cancel the call shared with others
+            return await asyncio.shield(call)
+
+        call = self._calls[key] = asyncio.ensure_future(function())
+        call.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(call)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Self, cast
+
+from sqlalchemy import LargeBinary, TypeDecorator
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Dialect
+
+
+def pack_floats(values: Sequence[float]) -> bytes:
+    """Pack floats as little-endian float64 bytes."""
+    packed = array("d", values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_floats(buffer: bytes | memoryview) -> memoryview | array[float]:
+    """Read little-endian float64 bytes as a sequence of floats.
+
+    On little-endian hosts this is a zero-copy view of the buffer, which can also be
+    passed to e.g. numpy.frombuffer.
+    """
+    if sys.byteorder == "little":
+        return memoryview(buffer).cast("d")
+    unpacked = array("d", bytes(buffer))
+    unpacked.byteswap()
+    return unpacked
+
+
+class PackedFloatArray(TypeDecorator[Sequence[float]]):
+    """A list of floats stored as packed little-endian float64 bytes (bytea).
+
+    Compared to postgresql.ARRAY(Float), this avoids psycopg2 parsing the text of
+    every element. Results are still copied into lists of floats once, as the read
+    models and the columnar encoder take lists, see benchmarks/array_storage.py.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(
+        self: Self,
+        value: Sequence[float] | None,
+        dialect: Dialect,  # noqa: ARG002
+    ) -> bytes | None:
+        if value is None:
+            return None
+        return pack_floats(value)
+
+    def process_result_value(
+        self: Self,
+        value: bytes | None,
+        dialect: Dialect,  # noqa: ARG002
+    ) -> Sequence[float] | None:
+        if value is None:
+            return None
+        # Typeshed types memoryview.tolist() as list[int], regardless of format
+        return cast("list[float]", unpack_floats(value).tolist())
@@ -0,0 +1,74 @@
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Mapping
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+ROW_ADAPTER: TypeAdapter[tuple[Any, ...]] = TypeAdapter(tuple[Any, ...])
+
+
+def accepts_media_type(request: Request, media_type: str) -> bool:
+    """Check whether the client listed a media type in its Accept header."""
+    accepted = request.headers.get("accept", "").split(",")
+    return media_type in {e.split(";")[0].strip() for e in accepted}
+
+
+def _ndjson_lines(lines: Iterable[bytes]) -> Iterator[bytes]:
+    for line in lines:
+        yield line + b"\n"
+
+
+async def _async_ndjson_lines(lines: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    async for line in lines:
+        yield line + b"\n"
+
+
+def stream_models_ndjson(
+    models: Iterable[BaseModel] | AsyncIterable[BaseModel],
+    *,
+    exclude_unset: bool = False,
+    headers: Mapping[str, str] | None = None,
+) -> StreamingResponse:
+    """Stream models as newline-delimited JSON, one model per line.
+
+    Each model is serialized as it is produced, so neither the models nor the
+    response body are ever held in memory as a whole. Models produced by an async
+    iterable are streamed on the event loop, others in the threadpool.
+    """
+    content: Iterator[bytes] | AsyncIterator[bytes]
+    if isinstance(models, AsyncIterable):
+        content = _async_ndjson_lines(
+            model.model_dump_json(exclude_unset=exclude_unset).encode()
+            async for model in models
+        )
+    else:
+        content = _ndjson_lines(
+            model.model_dump_json(exclude_unset=exclude_unset).encode()
+            for model in models
+        )
+    return StreamingResponse(
+        content,
+        headers=headers,
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
+def stream_rows_ndjson(
+    rows: Iterable[tuple[Any, ...]] | AsyncIterable[tuple[Any, ...]],
+    *,
+    headers: Mapping[str, str] | None = None,
+) -> StreamingResponse:
+    """Stream rows as newline-delimited JSON arrays, one row per line."""
+    content: Iterator[bytes] | AsyncIterator[bytes]
+    if isinstance(rows, AsyncIterable):
+        content = _async_ndjson_lines(ROW_ADAPTER.dump_json(row) async for row in rows)
+    else:
+        content = _ndjson_lines(ROW_ADAPTER.dump_json(row) for row in rows)
+    return StreamingResponse(
+        content,
+        headers=headers,
+        media_type=NDJSON_MEDIA_TYPE,
+    )
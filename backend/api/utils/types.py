@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum, auto
-from typing import TypeVar
+from typing import TypeAlias, TypeVar
 from uuid import UUID
 
 
@@ -13,4 +13,19 @@ class Lifespan(Enum):
     INTEGRATION_TEST = auto()
 
 
+class PulseArrayStorage(str, Enum):
+    """Enum for how delays, signal and signal_error are stored in the database."""
+
+    ARRAY = "array"  # PostgreSQL float8[]
+    PACKED = "packed"  # Packed little-endian float64 bytes (bytea)
+
+
+class TotalCount(str, Enum):
+    """Enum for how the total number of results of a paginated query is counted."""
+
+    EXACT = "exact"
+    ESTIMATED = "estimated"  # From the query plan, much cheaper for large results
+
+
 TPulseCols = TypeVar("TPulseCols", UUID, datetime, int, float, str)
+TPulseColValue: TypeAlias = UUID | datetime | int | float | str
@@ -1,9 +1,13 @@
 import argparse
+import os
+import tempfile
 
 import uvicorn
 
 from api.config import get_settings
-from api.main import create_app
+from api.database import app_engine
+from api.main import create_app, prepare_database
+from api.utils.metrics import MULTIPROCESS_DIR_ENV_VAR, prepare_multiprocess_dir
 from api.utils.types import Lifespan
 
 parser = argparse.ArgumentParser(description="Start the FastAPI application.")
@@ -26,10 +30,28 @@ api = create_app(Lifespan[args.lifespan])
 
 if __name__ == "__main__":
     settings = get_settings()
+    workers = None
+    if Lifespan[args.lifespan] == Lifespan.PROD:
+        # Prepare the database once, instead of in every worker
+        prepare_database()
+        app_engine.dispose()
+        os.environ["DATABASE_PREPARED"] = "true"
+        # Send SIGHUP to restart the workers one at a time, e.g. after a deploy
+        workers = settings.WORKERS
+        if workers > 1:
+            # Workers write their metrics to files in this directory, which
+            # /metrics sums. Workers are spawned after it is set, so they use it.
+            metrics_dir = os.environ.setdefault(
+                MULTIPROCESS_DIR_ENV_VAR,
+                tempfile.mkdtemp(prefix="terastore-metrics-"),
+            )
+            prepare_multiprocess_dir(metrics_dir)
 
     uvicorn.run(
         "asgi:api",
         host="0.0.0.0",  # noqa: S104
         port=8000,
         reload=args.with_reload,
+        workers=workers,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_SECONDS,
     )
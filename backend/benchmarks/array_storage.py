@@ -0,0 +1,99 @@
+"""Compare the storage size and read latency of the pulse array storage formats.
+
+Pulses are ingested once, then the array columns are converted to each storage
+format in turn with convert_pulse_array_storage. The benchmark drops and recreates all
+tables, so only run it against a scratch database:
+
+    python -m benchmarks.array_storage --pulses 2000 --length 600
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+from uuid import UUID
+
+from sqlalchemy import Uuid, any_, column, table, text
+from sqlmodel import Session, select
+
+from api.database import app_engine, create_db_and_tables, drop_tables
+from api.migrations import PULSE_ARRAY_COLUMNS, convert_pulse_array_storage
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse.crud import create_pulses
+from api.public.pulse.models import PULSE_ARRAY_TYPES, Pulse, PulseCreate
+from api.utils.helpers import uuid_array
+from api.utils.types import PulseArrayStorage
+
+logger = logging.getLogger(__name__)
+
+
+def measure(
+    storage: PulseArrayStorage,
+    requests: list[list[UUID]],
+) -> tuple[int, list[float]]:
+    """Return the size of the pulses table and the latency of each read."""
+    convert_pulse_array_storage(app_engine, storage)
+    # The types of the models, so reads include decoding into lists of floats
+    sa_type = PULSE_ARRAY_TYPES[storage]
+    pulse_id = column("pulse_id", Uuid)
+    columns = [column(name, sa_type) for name in PULSE_ARRAY_COLUMNS]
+    with app_engine.connect() as connection:
+        # Rewrite the table, so the space of the replaced columns is reclaimed
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(
+            text("VACUUM FULL pulses"),
+        )
+        size = connection.execute(
+            text("SELECT pg_total_relation_size('pulses')"),
+        ).scalar_one()
+
+        latencies = []
+        for ids in requests:
+            start = time.perf_counter()
+            connection.execute(
+                select(pulse_id, *columns)
+                .select_from(table("pulses"))
+                .where(pulse_id == any_(uuid_array(ids))),
+            ).all()
+            latencies.append(time.perf_counter() - start)
+    return size, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pulses", type=int, default=2000)
+    parser.add_argument("--length", type=int, default=600)
+    parser.add_argument("--ids", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    drop_tables()
+    create_db_and_tables()
+    with Session(app_engine) as db:
+        device_id = create_device(DeviceCreate.create_mock("Benchmark"), db).device_id
+        create_pulses(
+            [
+                PulseCreate.create_mock_w_errs(device_id=device_id, length=args.length)
+                for _ in range(args.pulses)
+            ],
+            db=db,
+        )
+        all_ids = list(db.exec(select(Pulse.pulse_id)).all())
+
+    requests = [random.sample(all_ids, args.ids) for _ in range(args.requests)]
+    for storage in PulseArrayStorage:
+        size, latencies = measure(storage, requests)
+        logger.info(
+            "%-6s  %7.1f MiB  p50 %.1f ms  p99 %.1f ms",
+            storage.value,
+            size / 2**20,
+            statistics.median(latencies) * 1000,
+            sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000,
+        )
+    drop_tables()
+
+
+if __name__ == "__main__":
+    main()
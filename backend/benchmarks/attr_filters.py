@@ -0,0 +1,107 @@
+"""Compare the latency of intersecting attribute filters with the planned query.
+
+Every pulse has the same project, but its own angle, so a filter on both is only
+selective on the angle. The benchmark drops and recreates all tables, so only run
+it against a scratch database:
+
+    python -m benchmarks.attr_filters --pulses 200000
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+from collections.abc import Callable
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlmodel import Session, intersect
+
+from api.database import app_engine, create_db_and_tables, drop_tables
+from api.public.attrs.crud import create_filter_query, filter_on_key_value_pairs
+from api.public.attrs.models import (
+    PulseAttrsFloatCreate,
+    PulseAttrsFloatFilter,
+    PulseAttrsStrCreate,
+    PulseAttrsStrFilter,
+    TAttrFilterDataType,
+)
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse.crud import create_pulses
+from api.public.pulse.models import PulseCreate
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10_000
+
+
+def median_latency(run: Callable[[], object], repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def create_pulse(device_id: UUID) -> PulseCreate:
+    pulse = PulseCreate.create_mock(device_id=device_id, length=2)
+    pulse.pulse_attributes = [
+        PulseAttrsStrCreate.create_mock(key="project", value="terastore"),
+        PulseAttrsFloatCreate.create_mock(key="angle", value=random.uniform(0, 360)),  # noqa: S311
+    ]
+    return pulse
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pulses", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    drop_tables()
+    create_db_and_tables()
+    with Session(app_engine) as db:
+        device_id = create_device(DeviceCreate.create_mock("Benchmark"), db).device_id
+        for start in range(0, args.pulses, BATCH_SIZE):
+            create_pulses(
+                [
+                    create_pulse(device_id)
+                    for _ in range(min(BATCH_SIZE, args.pulses - start))
+                ],
+                db=db,
+            )
+        db.execute(text("ANALYZE"))
+
+        # The unselective filter comes first, as a client would likely send it
+        kv_pairs: list[TAttrFilterDataType] = [
+            PulseAttrsStrFilter(key="project", value="terastore"),
+            PulseAttrsFloatFilter(key="angle", min_value=10, max_value=10.5),
+        ]
+        data_types = {"project": "string", "angle": "float"}
+        intersected = intersect(
+            *(create_filter_query(kv, data_types[kv.key]) for kv in kv_pairs),
+        )
+
+        intersect_latency = median_latency(
+            lambda: db.execute(intersected).all(),
+            args.repeats,
+        )
+        planned_latency = median_latency(
+            lambda: filter_on_key_value_pairs(kv_pairs, ["pulse_id"], db),
+            args.repeats,
+        )
+        logger.info(
+            "pulses %8d  intersect %8.1f ms  planned %8.1f ms",
+            args.pulses,
+            intersect_latency * 1000,
+            planned_latency * 1000,
+        )
+    drop_tables()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare the ORM and COPY ingest paths of POST /pulses/create.
+
+The benchmark drops and recreates all tables, so only run it against a scratch
+database:
+
+    python -m benchmarks.ingest --pulses 5000 --attrs 4
+"""
+
+import argparse
+import logging
+import time
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+from sqlmodel import Session
+
+from api.config import get_settings
+from api.database import app_engine, create_db_and_tables, drop_tables
+from api.public.attrs.models import PulseAttrsFloatCreate, PulseAttrsStrCreate
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse.crud import create_pulses
+from api.public.pulse.models import PulseCreate
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def make_pulses(device_id: UUID, n_pulses: int, n_attrs: int) -> list[PulseCreate]:
+    pulses = [PulseCreate.create_mock(device_id=device_id) for _ in range(n_pulses)]
+    for i, pulse in enumerate(pulses):
+        pulse.pulse_attributes = [
+            PulseAttrsStrCreate(key=f"str_key_{j}", value=f"value_{i % 10}")
+            if j % 2 == 0
+            else PulseAttrsFloatCreate(key=f"float_key_{j}", value=float(i))
+            for j in range(n_attrs)
+        ]
+    return pulses
+
+
+def time_ingest(
+    pulses: list[PulseCreate],
+    threshold: int,
+    runs: int,
+) -> float:
+    """Return the best wall time of `runs` uploads with the given COPY threshold."""
+    settings = get_settings()
+    settings.BULK_INGEST_THRESHOLD = threshold
+    timings = []
+    for _ in range(runs):
+        with Session(app_engine) as db:
+            start = time.perf_counter()
+            create_pulses(pulses=pulses, db=db)
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pulses", type=int, default=5000)
+    parser.add_argument("--attrs", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    drop_tables()
+    create_db_and_tables()
+    with Session(app_engine) as db:
+        device_id = create_device(DeviceCreate.create_mock("Benchmark"), db).device_id
+    pulses = make_pulses(device_id, args.pulses, args.attrs)
+
+    paths: dict[str, Callable[[], float]] = {
+        "orm": lambda: time_ingest(pulses, args.pulses + 1, args.runs),
+        "copy": lambda: time_ingest(pulses, 1, args.runs),
+    }
+    results = {name: path() for name, path in paths.items()}
+    for name, seconds in results.items():
+        logger.info(
+            "%-5s %8.3f s  %10.0f pulses/s",
+            name,
+            seconds,
+            args.pulses / seconds,
+        )
+    logger.info("speedup: %.1fx", results["orm"] / results["copy"])
+    drop_tables()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Measure the latency of an unrelated endpoint during a storm of logins.
+
+The app runs in-process on a single event loop, like one worker. /health is
+requested at a steady rate, first alone and then while logins run concurrently.
+With --blocking, passwords are verified on the event loop, as they used to be.
+The benchmark drops and recreates all tables, so only run it against a scratch
+database:
+
+    python -m benchmarks.logins --logins 8
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+from sqlmodel import Session
+
+from api.database import app_engine, create_db_and_tables, drop_tables
+from api.main import create_app
+from api.public.auth import views
+from api.public.auth.crud import create_user, get_user
+from api.public.auth.helpers import verify_password
+from api.public.auth.models import User, UserCreate
+from api.utils.exceptions import EmailOrPasswordIncorrectError
+from api.utils.types import Lifespan
+
+logger = logging.getLogger(__name__)
+
+USER = UserCreate(email="benchmark@benchmark", password="benchmark")  # noqa: S106
+PROBE_INTERVAL = 0.01
+
+
+async def authenticate_on_event_loop(
+    username: str,
+    password: str,
+    db: Session,
+) -> User:
+    user = get_user(username, db=db)
+    if not verify_password(password, user.hashed_password):
+        raise EmailOrPasswordIncorrectError
+    return user
+
+
+async def probe_latencies(client: httpx.AsyncClient, duration: float) -> list[float]:
+    latencies = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+async def log_in_until(client: httpx.AsyncClient, stop: asyncio.Event) -> int:
+    logins = 0
+    while not stop.is_set():
+        response = await client.post(
+            "/auth/login",
+            data={"username": USER.email, "password": USER.password},
+        )
+        response.raise_for_status()
+        logins += 1
+    return logins
+
+
+def percentile(latencies: list[float], fraction: float) -> float:
+    return statistics.quantiles(latencies, n=100)[round(fraction * 100) - 1]
+
+
+async def run(logins: int, duration: float) -> None:
+    transport = httpx.ASGITransport(app=create_app(Lifespan.TEST))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for name, concurrent_logins in [("idle", 0), ("logins", logins)]:
+            stop = asyncio.Event()
+            login_tasks = [
+                asyncio.create_task(log_in_until(client, stop))
+                for _ in range(concurrent_logins)
+            ]
+            latencies = await probe_latencies(client, duration)
+            stop.set()
+            completed = sum(await asyncio.gather(*login_tasks))
+            logger.info(
+                "%-6s  health p50 %7.1f ms  p99 %7.1f ms  logins/s %6.1f",
+                name,
+                percentile(latencies, 0.5) * 1000,
+                percentile(latencies, 0.99) * 1000,
+                completed / duration,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--blocking", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.blocking:
+        views.authenticate_user_password = authenticate_on_event_loop  # type: ignore[attr-defined,assignment]
+
+    drop_tables()
+    create_db_and_tables()
+    with Session(app_engine) as db:
+        create_user(USER, db=db)
+    asyncio.run(run(args.logins, args.duration))
+    drop_tables()
+
+
+if __name__ == "__main__":
+    main()
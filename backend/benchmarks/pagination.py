@@ -0,0 +1,94 @@
+"""Compare the latency of offset and cursor pagination of pulses at several depths.
+
+The benchmark drops and recreates all tables, so only run it against a scratch
+database:
+
+    python -m benchmarks.pagination --pulses 200000 --limit 100
+"""
+
+import argparse
+import logging
+import statistics
+import time
+from collections.abc import Callable
+from functools import partial
+
+from sqlmodel import Session, col, select
+
+from api.database import app_engine, create_db_and_tables, drop_tables
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse.crud import (
+    PULSES_CURSOR,
+    copy_pulses,
+    read_pulses,
+)
+from api.public.pulse.models import Pulse, PulseCreate
+from api.utils.pagination import encode_cursor
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10_000
+
+
+def median_latency(read_page: Callable[[], object], repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        read_page()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pulses", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    drop_tables()
+    create_db_and_tables()
+    with Session(app_engine) as db:
+        device_id = create_device(DeviceCreate.create_mock("Benchmark"), db).device_id
+        for start in range(0, args.pulses, BATCH_SIZE):
+            copy_pulses(
+                [
+                    PulseCreate.create_mock(device_id=device_id, length=2)
+                    for _ in range(min(BATCH_SIZE, args.pulses - start))
+                ],
+                db=db,
+            )
+            db.commit()
+
+        depth = args.limit
+        while depth < args.pulses:
+            # The cursor a client would have after paging to this depth
+            last = db.exec(
+                select(Pulse.creation_time, Pulse.pulse_id)
+                .order_by(col(Pulse.creation_time), col(Pulse.pulse_id))
+                .offset(depth - 1)
+                .limit(1),
+            ).one()
+            cursor = encode_cursor(PULSES_CURSOR, (last[0], last[1]))
+            offset_latency = median_latency(
+                partial(read_pulses, offset=depth, limit=args.limit, db=db),
+                args.repeats,
+            )
+            cursor_latency = median_latency(
+                partial(read_pulses, limit=args.limit, db=db, cursor=cursor),
+                args.repeats,
+            )
+            logger.info(
+                "depth %8d  offset %7.1f ms  cursor %7.1f ms",
+                depth,
+                offset_latency * 1000,
+                cursor_latency * 1000,
+            )
+            depth *= 10
+    drop_tables()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure the latency of reading pulses by ID under concurrent load.
+
+The benchmark drops and recreates all tables, so only run it against a scratch
+database:
+
+    python -m benchmarks.read_ids --pulses 2000 --ids 200 --threads 8
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import UUID
+
+from sqlmodel import Session, select
+
+from api.database import app_engine, create_db_and_tables, drop_tables
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse.crud import create_pulses, read_pulses_with_ids
+from api.public.pulse.models import Pulse, PulseCreate
+
+logger = logging.getLogger(__name__)
+
+
+def read(ids: list[UUID]) -> tuple[float, bool]:
+    """Read the pulses, returning the latency and whether the result was correct."""
+    with Session(app_engine) as db:
+        start = time.perf_counter()
+        try:
+            pulses = read_pulses_with_ids(ids, db=db)
+        except Exception:  # noqa: BLE001
+            return time.perf_counter() - start, False
+        latency = time.perf_counter() - start
+    return latency, [pulse.pulse_id for pulse in pulses] == ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pulses", type=int, default=2000)
+    parser.add_argument("--ids", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    drop_tables()
+    create_db_and_tables()
+    with Session(app_engine) as db:
+        device_id = create_device(DeviceCreate.create_mock("Benchmark"), db).device_id
+        create_pulses(
+            [PulseCreate.create_mock(device_id=device_id) for _ in range(args.pulses)],
+            db=db,
+        )
+        all_ids = list(db.exec(select(Pulse.pulse_id)).all())
+
+    requests = [random.sample(all_ids, args.ids) for _ in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(read, requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    logger.info(
+        "p50 %.1f ms  p99 %.1f ms  %.0f requests/s  %d/%d correct",
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        len(results) / elapsed,
+        sum(correct for _, correct in results),
+        len(results),
+    )
+    drop_tables()
+
+
+if __name__ == "__main__":
+    main()
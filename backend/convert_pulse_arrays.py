@@ -0,0 +1,50 @@
+"""Convert the pulse arrays of the database to another storage format.
+
+The arrays are converted in batches, so this can run while the app is serving in
+the old format, and can be interrupted and run again. With --fill-only, the
+converted arrays are only written next to the old ones. Without it, they then
+replace the old ones, after which the app must be started with the new
+PULSE_ARRAY_STORAGE. For example:
+
+    python convert_pulse_arrays.py packed --fill-only  # while the app serves
+    python convert_pulse_arrays.py packed  # once the app is stopped
+"""
+
+import argparse
+import logging
+
+from api.database import app_engine
+from api.migrations import MIGRATION_BATCH_SIZE, convert_pulse_array_storage
+from api.utils.types import PulseArrayStorage
+
+parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+)
+parser.add_argument(
+    "storage",
+    choices=[storage.value for storage in PulseArrayStorage],
+    help="The storage format to convert the pulse arrays to.",
+)
+parser.add_argument(
+    "--fill-only",
+    action="store_true",
+    help="Only write the converted arrays, without replacing the old ones.",
+)
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=MIGRATION_BATCH_SIZE,
+    help="The number of pulses converted per transaction.",
+)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    convert_pulse_array_storage(
+        app_engine,
+        PulseArrayStorage(args.storage),
+        fill_only=args.fill_only,
+        batch_size=args.batch_size,
+    )
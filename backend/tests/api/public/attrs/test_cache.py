@@ -0,0 +1,65 @@
+from uuid import uuid4
+
+from api.public.attrs.cache import (
+    CachedFilterRead,
+    FilterResultCache,
+    estimate_result_size,
+    get_filter_cache,
+)
+from api.public.attrs.models import PulseAttrsStrFilter
+
+
+def make_cached_read(value: str) -> CachedFilterRead:
+    return CachedFilterRead(
+        [PulseAttrsStrFilter(key="project", value=value)],
+        ["pulse_id"],
+        limit=None,
+        cursor=None,
+        order_by=None,
+        descending=False,
+    )
+
+
+def test_filter_cache_evicts_least_recently_used() -> None:
+    result = ([(uuid4(),)], None)
+    size = estimate_result_size(result)
+    cache = FilterResultCache(max_size_bytes=2 * size)
+
+    cache.put("a", result, cache.generation)
+    cache.put("b", result, cache.generation)
+    cache.get("a")
+    cache.put("c", result, cache.generation)
+
+    assert cache.get("a") == result
+    assert cache.get("b") is None
+    assert cache.get("c") == result
+    assert cache.stats().evictions == 1
+    assert cache.stats().size_bytes == 2 * size
+
+
+def test_filter_cache_skips_results_read_before_a_write() -> None:
+    cache = FilterResultCache(max_size_bytes=1024 * 1024)
+    generation = cache.generation
+
+    cache.invalidate()
+    cache.put("a", ([], None), generation)
+
+    assert cache.get("a") is None
+    assert cache.stats().entries == 0
+
+
+def test_cached_filter_read_shares_results_until_a_write() -> None:
+    value = str(uuid4())
+    result = ([(uuid4(),)], None)
+    first = make_cached_read(value)
+    assert first.cached is None
+    first.store(result)
+
+    second = make_cached_read(value)
+    get_filter_cache().invalidate()
+    third = make_cached_read(value)
+
+    assert second.cached == result
+    assert second.flight_key == first.flight_key
+    assert third.cached is None
+    assert third.flight_key != first.flight_key
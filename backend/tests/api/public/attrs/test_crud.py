@@ -0,0 +1,198 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from uuid import UUID, uuid4
+
+from sqlalchemy import event
+from sqlmodel import Session, col, select
+
+from api.public.attrs.crud import (
+    filter_on_key_value_pairs,
+    read_pulse_attrs,
+    register_keys,
+)
+from api.public.attrs.models import (
+    PulseAttrs,
+    PulseAttrsFloatCreate,
+    PulseAttrsFloatFilter,
+    PulseAttrsFloatRead,
+    PulseAttrsStrCreate,
+    PulseAttrsStrFilter,
+    PulseAttrsStrRead,
+    PulseKeyRegistry,
+    TPulseAttrsCreate,
+)
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse.crud import create_pulses
+from api.public.pulse.models import PulseCreate
+from api.utils.exceptions import AttrDataTypeExistsError
+
+
+def create_skewed_pulses(db_session: Session) -> list[UUID]:
+    """Create pulses sharing a project, but each with its own angle."""
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    pulses = []
+    for angle in range(10):
+        pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+        pulse.pulse_attributes = [
+            PulseAttrsStrCreate.create_mock(key="project", value="terastore"),
+            PulseAttrsFloatCreate.create_mock(key="angle", value=float(angle)),
+        ]
+        pulses.append(pulse)
+    return create_pulses(pulses, db_session)
+
+
+def test_filter_on_skewed_keys(db_session: Session) -> None:
+    pulse_ids = create_skewed_pulses(db_session)
+
+    result, _ = filter_on_key_value_pairs(
+        [
+            PulseAttrsStrFilter(key="project", value="terastore"),
+            PulseAttrsFloatFilter(key="angle", min_value=2, max_value=3),
+        ],
+        ["pulse_id"],
+        db_session,
+    )
+
+    assert sorted(result) == sorted([(pulse_ids[2],), (pulse_ids[3],)])
+
+
+def test_filter_on_long_str_values(db_session: Session) -> None:
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    # Longer than btree index entries may be, and only differing in the end
+    notes = ["x" * 10_000 + "a", "x" * 10_000 + "b"]
+    pulses = []
+    for note in notes:
+        pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+        pulse.pulse_attributes = [
+            PulseAttrsStrCreate.create_mock(key="note", value=note),
+        ]
+        pulses.append(pulse)
+    pulse_ids = create_pulses(pulses, db_session)
+
+    result, _ = filter_on_key_value_pairs(
+        [PulseAttrsStrFilter(key="note", value=notes[1])],
+        ["pulse_id"],
+        db_session,
+    )
+
+    assert result == [(pulse_ids[1],)]
+
+
+def test_filter_matching_nothing_skips_query(db_session: Session) -> None:
+    create_skewed_pulses(db_session)
+    statements: list[str] = []
+
+    def record(*args: Any) -> None:  # noqa: ANN401
+        statements.append(args[2])
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result, _ = filter_on_key_value_pairs(
+            [
+                PulseAttrsStrFilter(key="project", value="terastore"),
+                PulseAttrsStrFilter(key="project", value="unknown"),
+            ],
+            ["pulse_id"],
+            db_session,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert result == []
+    # Only the selectivity estimates are queried, not the pulses
+    assert any("count(*)" in statement for statement in statements)
+    assert not any("driving" in statement for statement in statements)
+
+
+def test_read_pulse_attrs_in_one_query(db_session: Session) -> None:
+    pulse_ids = create_skewed_pulses(db_session)
+    device = create_device(DeviceCreate.create_mock("Glaze II"), db_session)
+    [bare_pulse_id] = create_pulses(
+        [PulseCreate.create_mock(device_id=device.device_id, length=2)],
+        db_session,
+    )
+    statements: list[str] = []
+
+    def record(*args: Any) -> None:  # noqa: ANN401
+        statements.append(args[2])
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        attrs = read_pulse_attrs(
+            [pulse_ids[1], bare_pulse_id, pulse_ids[2]],
+            db_session,
+            check_pulses_exist=False,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+    assert list(attrs) == [pulse_ids[1], bare_pulse_id, pulse_ids[2]]
+    assert attrs[bare_pulse_id] == []
+    for angle in (1, 2):
+        pulse_attrs = sorted(attrs[pulse_ids[angle]], key=lambda attr: attr.key)
+        assert pulse_attrs == [
+            PulseAttrsFloatRead(key="angle", value=float(angle)),
+            PulseAttrsStrRead(key="project", value="terastore"),
+        ]
+
+
+def register_key_concurrently(
+    db_session: Session,
+    attr: PulseAttrsStrCreate | PulseAttrsFloatCreate,
+) -> BaseException | None:
+    """Register the key of attr while another transaction registers it as a string.
+
+    Returns the error registering attr raised, if any.
+    """
+    # Commit the admin user of the fixture, so the other sessions see it
+    db_session.commit()
+    engine = db_session.get_bind()
+
+    def register(attr: TPulseAttrsCreate, db: Session) -> None:
+        register_keys([PulseAttrs(pulse_id=uuid4(), pulse_attributes=[attr])], db)
+        db.commit()
+
+    with (
+        Session(engine) as first,
+        Session(engine) as second,
+        ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        register_keys(
+            [
+                PulseAttrs(
+                    pulse_id=uuid4(),
+                    pulse_attributes=[PulseAttrsStrCreate.create_mock(key=attr.key)],
+                ),
+            ],
+            first,
+        )
+        # Blocks on the key inserted by the first transaction
+        registering = executor.submit(register, attr, second)
+        time.sleep(0.2)
+        assert not registering.done()
+        first.commit()
+        return registering.exception(timeout=5)
+
+
+def test_register_key_concurrently(db_session: Session) -> None:
+    attr = PulseAttrsStrCreate.create_mock(key="racing_key")
+
+    assert register_key_concurrently(db_session, attr) is None
+    assert db_session.exec(
+        select(PulseKeyRegistry.data_type).where(
+            col(PulseKeyRegistry.key) == "racing_key",
+        ),
+    ).all() == ["string"]
+
+
+def test_register_key_concurrently_with_other_data_type(db_session: Session) -> None:
+    attr = PulseAttrsFloatCreate.create_mock(key="racing_key")
+
+    error = register_key_concurrently(db_session, attr)
+
+    assert isinstance(error, AttrDataTypeExistsError)
@@ -0,0 +1,105 @@
+import threading
+from typing import Any
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.pool import QueuePool
+from sqlmodel import Session
+
+from api.database import app_engine
+from api.public.attrs.models import PulseAttrsStrCreate
+from api.public.attrs.registry import KEY_REGISTRY_CHANNEL, get_key_registry
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse.crud import create_pulses
+from api.public.pulse.models import PulseCreate
+from api.utils.notifications import listen_for_notifications
+
+
+def test_key_registry_cache_hit_skips_database(db_session: Session) -> None:
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+    pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock(value="a")]
+    create_pulses([pulse], db_session)
+    cache = get_key_registry()
+    engine = db_session.get_bind()
+    statements: list[str] = []
+
+    def record(*args: Any) -> None:  # noqa: ANN401
+        statements.append(args[2])
+
+    assert cache.get_data_types(["mock_string_key"], db_session) == {
+        "mock_string_key": "string",
+    }
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        data_types = cache.get_data_types(["mock_string_key"], db_session)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert data_types == {"mock_string_key": "string"}
+    assert statements == []
+
+
+def test_key_registry_caches_unknown_keys(db_session: Session) -> None:
+    cache = get_key_registry()
+    cache.invalidate()
+    engine = db_session.get_bind().engine
+    pool = engine.pool
+    assert isinstance(pool, QueuePool)
+    db_session.connection()
+    checked_out: list[int] = []
+
+    def record(*_args: Any) -> None:  # noqa: ANN401
+        checked_out.append(pool.checkedout())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for _ in range(3):
+            assert cache.get_data_types(["unknown_key"], db_session) == {}
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # Loaded once, on the connection of the session
+    assert checked_out == [1]
+
+
+def test_key_registry_reloads_after_keys_are_registered(
+    db_session: Session,
+) -> None:
+    cache = get_key_registry()
+    assert cache.get_data_types(["mock_string_key"], db_session) == {}
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+    pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock(value="a")]
+    create_pulses([pulse], db_session)
+
+    assert cache.get_data_types(["mock_string_key"], db_session) == {
+        "mock_string_key": "string",
+    }
+
+
+@pytest.mark.usefixtures("db_session")
+def test_key_registry_listener_invalidates_on_notify(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    cache = get_key_registry()
+    invalidated = threading.Event()
+    invalidate = cache.invalidate
+
+    def record_invalidate() -> None:
+        invalidate()
+        invalidated.set()
+
+    with listen_for_notifications(app_engine):
+        monkeypatch.setattr(cache, "invalidate", record_invalidate)
+        # Notify like another worker would, without this Session's commit hook.
+        # The listener may not be listening yet, so notify until it is invalidated.
+        with app_engine.connect() as connection:
+            for _ in range(50):
+                connection.execute(text(f"NOTIFY {KEY_REGISTRY_CHANNEL}"))
+                connection.commit()
+                if invalidated.wait(timeout=0.1):
+                    break
+
+        assert invalidated.is_set()
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, timedelta
 from uuid import UUID, uuid4
 
@@ -371,6 +372,29 @@ def test_filter_non_existent_key(client: TestClient, device_id: str) -> None:
     assert response_data["detail"] == "Key non-existent-key does not exist."
 
 
+def test_filter_non_existent_keys(client: TestClient, device_id: UUID) -> None:
+    pulse_payload = [PulseCreate.create_mock(device_id=device_id).as_dict()]
+    pulse_payload[0]["pulse_attributes"] = [
+        PulseAttrsStrCreate.create_mock(value="test").as_dict(),
+    ]
+    client.post("/pulses/create/", json=pulse_payload)
+    filtering_json = {
+        "kv_pairs": [
+            {"key": "non-existent-key", "value": "test"},
+            {"key": "mock_string_key", "value": "test"},
+            {"key": "other-non-existent-key", "min_value": 0, "max_value": 1},
+        ],
+        "columns": ["pulse_id"],
+    }
+
+    response = client.post("/attrs/filter/", json=filtering_json)
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == (
+        "Keys non-existent-key, other-non-existent-key do not exist."
+    )
+
+
 def test_filter_one_wrong(client: TestClient, device_id: UUID) -> None:
     pulse_payload = [PulseCreate.create_mock(device_id=device_id).as_dict()]
 
@@ -591,3 +615,225 @@ def test_filter_no_kv_multiple_columns(client: TestClient, device_id: UUID) -> N
     assert len(response_data) == 1
     assert response_data[0][0] == pulse_id
     assert response_data[0][1] == device_id
+
+
+def test_get_facets(client: TestClient, device_id: UUID) -> None:
+    pulse_payload = []
+    for angle, substrate in [(0.0, "a"), (5.0, "a"), (10.0, "b"), (20.0, "c")]:
+        pulse = PulseCreate.create_mock(device_id=device_id)
+        pulse.pulse_attributes = [
+            PulseAttrsFloatCreate.create_mock(key="angle", value=angle),
+            PulseAttrsStrCreate.create_mock(key="substrate", value=substrate),
+        ]
+        pulse_payload.append(pulse.as_dict())
+    client.post("/pulses/create/", json=pulse_payload)
+
+    filtering_json = {
+        "kv_pairs": [{"key": "angle", "min_value": 0.0, "max_value": 10.0}],
+    }
+    response = client.post("/attrs/facets/?bins=2", json=filtering_json)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "str_facets": [
+            {
+                "key": "substrate",
+                "counts": [{"value": "a", "count": 2}, {"value": "b", "count": 1}],
+            },
+        ],
+        "float_facets": [
+            {"key": "angle", "min_value": 0.0, "max_value": 10.0, "histogram": [1, 2]},
+        ],
+    }
+
+
+def test_get_facets_matching_nothing(client: TestClient, device_id: UUID) -> None:
+    pulse = PulseCreate.create_mock(device_id=device_id)
+    pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock()]
+    client.post("/pulses/create/", json=[pulse.as_dict()])
+
+    filtering_json = {
+        "kv_pairs": [{"key": "mock_string_key", "value": "unknown"}],
+    }
+    response = client.post("/attrs/facets/", json=filtering_json)
+
+    assert response.status_code == 200
+    assert response.json() == {"str_facets": [], "float_facets": []}
+
+
+def test_filter_with_pagination(client: TestClient, device_id: UUID) -> None:
+    pulse_payload = []
+    for integration_time_ms in [3, 1, 2, 5, 4]:
+        pulse = PulseCreate.create_mock(device_id=device_id)
+        pulse.integration_time_ms = integration_time_ms
+        pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock(value="a")]
+        pulse_payload.append(pulse.as_dict())
+    client.post("/pulses/create/", json=pulse_payload)
+    filtering_json = {
+        "kv_pairs": [{"key": "mock_string_key", "value": "a"}],
+        "columns": ["integration_time_ms"],
+    }
+
+    pages = []
+    params: dict[str, str | int] = {
+        "limit": 2,
+        "order_by": "integration_time_ms",
+        "descending": "true",
+        "count": "exact",
+    }
+    while True:
+        response = client.post("/attrs/filter/", json=filtering_json, params=params)
+        assert response.status_code == 200
+        assert response.headers["X-Total-Count"] == "5"
+        pages.append(response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert pages == [[[5], [4]], [[3], [2]], [[1]]]
+
+
+def test_filter_with_estimated_count(client: TestClient, device_id: UUID) -> None:
+    pulse = PulseCreate.create_mock(device_id=device_id)
+    pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock(value="it's a")]
+    client.post("/pulses/create/", json=[pulse.as_dict()])
+    filtering_json = {
+        "kv_pairs": [{"key": "mock_string_key", "value": "it's a"}],
+        "columns": ["pulse_id"],
+    }
+
+    response = client.post(
+        "/attrs/filter/",
+        json=filtering_json,
+        params={"count": "estimated"},
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert int(response.headers["X-Total-Count"]) >= 0
+
+
+def test_filter_with_invalid_order_by(client: TestClient) -> None:
+    filtering_json: dict[str, list[str]] = {"kv_pairs": [], "columns": ["pulse_id"]}
+
+    response = client.post(
+        "/attrs/filter/",
+        json=filtering_json,
+        params={"order_by": "signal"},
+    )
+
+    assert response.status_code == 404
+
+
+def test_filter_ndjson(client: TestClient, device_id: UUID) -> None:
+    pulse_payload = []
+    for integration_time_ms in [3, 1, 2]:
+        pulse = PulseCreate.create_mock(device_id=device_id)
+        pulse.integration_time_ms = integration_time_ms
+        pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock(value="a")]
+        pulse_payload.append(pulse.as_dict())
+    client.post("/pulses/create/", json=pulse_payload)
+    filtering_json = {
+        "kv_pairs": [{"key": "mock_string_key", "value": "a"}],
+        "columns": ["integration_time_ms", "device_id"],
+    }
+
+    response = client.post(
+        "/attrs/filter/",
+        json=filtering_json,
+        params={"order_by": "integration_time_ms", "count": "exact"},
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["X-Total-Count"] == "3"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        [1, str(device_id)],
+        [2, str(device_id)],
+        [3, str(device_id)],
+    ]
+
+
+def test_filter_cache_invalidated_by_writes(
+    client: TestClient, device_id: UUID
+) -> None:
+    pulse = PulseCreate.create_mock(device_id=device_id)
+    pulse.pulse_attributes = [
+        PulseAttrsStrCreate.create_mock(value="a"),
+        PulseAttrsFloatCreate.create_mock(value=1.0),
+    ]
+    client.post("/pulses/create/", json=[pulse.as_dict()])
+    kv_pairs = [
+        {"key": "mock_string_key", "value": "a"},
+        {"key": "mock_float_key", "min_value": 0.0, "max_value": 2.0},
+    ]
+    stats = client.get("/attrs/filter/cache").json()
+
+    first = client.post(
+        "/attrs/filter/",
+        json={"kv_pairs": kv_pairs, "columns": ["pulse_id"]},
+    )
+    # The same filter with its key-value pairs in another order is a hit
+    second = client.post(
+        "/attrs/filter/",
+        json={"kv_pairs": kv_pairs[::-1], "columns": ["pulse_id"]},
+    )
+    cached_stats = client.get("/attrs/filter/cache").json()
+    client.post("/pulses/create/", json=[pulse.as_dict()])
+    third = client.post(
+        "/attrs/filter/",
+        json={"kv_pairs": kv_pairs, "columns": ["pulse_id"]},
+    )
+    written_stats = client.get("/attrs/filter/cache").json()
+
+    assert len(first.json()) == 1
+    assert second.json() == first.json()
+    assert cached_stats["hits"] == stats["hits"] + 1
+    assert cached_stats["misses"] == stats["misses"] + 1
+    assert cached_stats["entries"] == 1
+    assert len(third.json()) == 2
+    assert written_stats["generation"] > cached_stats["generation"]
+    assert written_stats["misses"] == cached_stats["misses"] + 1
+
+
+def test_async_filter(async_client: TestClient, device_id: UUID) -> None:
+    pulse_payload = []
+    for integration_time_ms in [3, 1, 2]:
+        pulse = PulseCreate.create_mock(device_id=device_id)
+        pulse.integration_time_ms = integration_time_ms
+        pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock(value="a")]
+        pulse_payload.append(pulse.as_dict())
+    async_client.post("/pulses/create/", json=pulse_payload)
+    filtering_json = {
+        "kv_pairs": [{"key": "mock_string_key", "value": "a"}],
+        "columns": ["integration_time_ms"],
+    }
+    params = {"order_by": "integration_time_ms", "count": "exact"}
+
+    keys = async_client.get("/attrs/keys/").json()
+    values = async_client.get("/attrs/mock_string_key/values").json()
+    page = async_client.post(
+        "/attrs/filter/",
+        json=filtering_json,
+        params={**params, "limit": 2},
+    )
+    streamed = async_client.post(
+        "/attrs/filter/",
+        json=filtering_json,
+        params=params,
+        headers={"Accept": "application/x-ndjson"},
+    )
+    missing_key = async_client.get("/attrs/nonexistent/values")
+
+    assert keys == [{"name": "mock_string_key", "data_type": "string"}]
+    assert values == ["a"]
+    assert page.json() == [[1], [2]]
+    assert page.headers["X-Total-Count"] == "3"
+    assert "X-Next-Cursor" in page.headers
+    assert [json.loads(line) for line in streamed.text.splitlines()] == [
+        [1],
+        [2],
+        [3],
+    ]
+    assert missing_key.status_code == 404
@@ -0,0 +1,31 @@
+import asyncio
+
+from api.public.auth.helpers import get_password_hash, verify_password_async
+
+
+def test_verify_password_async_does_not_block_event_loop() -> None:
+    hashed_password = get_password_hash("admin")
+
+    async def verify_while_ticking() -> tuple[bool, bool, int]:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.create_task(tick())
+        correct, incorrect = await asyncio.gather(
+            verify_password_async("admin", hashed_password),
+            verify_password_async("wrong", hashed_password),
+        )
+        ticker.cancel()
+        return correct, incorrect, ticks
+
+    correct, incorrect, ticks = asyncio.run(verify_while_ticking())
+
+    assert correct
+    assert not incorrect
+    # The event loop kept running other tasks while the passwords were verified
+    assert ticks > 10
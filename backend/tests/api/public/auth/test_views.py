@@ -1,4 +1,12 @@
+from datetime import timedelta
+from typing import Any
+
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
+
+from api.public.auth.auth_handler import create_token
+from api.utils.helpers import get_now
 
 
 def test_create_already_existing_user(client: TestClient) -> None:
@@ -98,3 +106,50 @@ def test_logout(client: TestClient) -> None:
 
     assert response.status_code == 200
     assert data == "logged out"
+
+
+def test_protected_request_with_cached_user_skips_database(
+    client: TestClient,
+    db_session: Session,
+) -> None:
+    statements: list[str] = []
+
+    def record(*args: Any) -> None:  # noqa: ANN401
+        statements.append(args[2])
+
+    assert client.get("/devices/").status_code == 200
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/devices/")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert not [statement for statement in statements if "users" in statement]
+
+
+def test_deleted_user_is_not_cached(client: TestClient) -> None:
+    user_payload = {"email": "admin2@admin", "password": "admin"}
+    client.post("/auth/signup", json=user_payload)
+    login_payload = {"username": "admin2@admin", "password": "admin"}
+    token = client.post("/auth/login", data=login_payload).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    before_delete = client.get("/devices/", headers=headers)
+    client.post("/user/delete", json={"email": "admin2@admin"})
+    after_delete = client.get("/devices/", headers=headers)
+
+    assert before_delete.status_code == 200
+    assert after_delete.status_code == 401
+
+
+def test_expired_token(client: TestClient) -> None:
+    token = create_token(
+        data={"sub": "admin@admin", "auth_level": 3},
+        expires=get_now() - timedelta(minutes=1),
+    )
+
+    response = client.get("/devices/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 401
@@ -281,3 +281,44 @@ def test_get_all_devices_with_invalid_limit_and_offset(client: TestClient) -> No
         == "Input should be a valid integer, unable to parse string as an integer"
     )
     assert data["detail"][1]["type"] == "int_parsing"
+
+
+def test_get_devices_with_cursor(client: TestClient) -> None:
+    device_ids = [
+        client.post("/devices/", json={"friendly_name": f"Glaze {i}"}).json()[
+            "device_id"
+        ]
+        for i in range(5)
+    ]
+
+    paged_ids = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = client.get("/devices/", params=params)
+        assert response.status_code == 200
+        paged_ids += [device["device_id"] for device in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert paged_ids == device_ids
+
+
+def test_get_devices_with_invalid_cursor(client: TestClient) -> None:
+    response = client.get("/devices/", params={"cursor": "not a cursor"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor: not a cursor"
+
+
+def test_get_devices_async(async_client: TestClient) -> None:
+    device = async_client.post("/devices/", json={"friendly_name": "Glaze I"}).json()
+
+    devices_response = async_client.get("/devices/")
+    device_response = async_client.get(f"/devices/{device['device_id']}")
+    missing_response = async_client.get(f"/devices/{uuid4()}")
+
+    assert devices_response.status_code == 200
+    assert devices_response.json() == [device]
+    assert device_response.json() == device
+    assert missing_response.status_code == 404
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import struct
+import sys
+from array import array
+from typing import Any
+
+from api.public.pulse.helpers import PULSE_ARRAY_COLUMNS, PULSE_COLUMNAR_MAGIC
+
+
+def decode_pulses_columnar(content: bytes) -> list[dict[str, Any]]:
+    """Decode the binary columnar format into one dict per pulse.
+
+    A reference decoder for comparing with the JSON format. Clients would
+    normally read the buffers directly into arrays.
+    """
+    if content[:8] != PULSE_COLUMNAR_MAGIC:
+        error_str = "Content is not in the columnar pulse format."
+        raise ValueError(error_str)
+    (header_length,) = struct.unpack("<Q", content[8:16])
+    header = json.loads(content[16 : 16 + header_length])
+    data_start = 16 + header_length + (-(header_length + 16) % 8)
+
+    def read_buffer(name: str) -> array[Any]:
+        meta = header["buffers"][name]
+        values = array("d" if meta["dtype"] == "<f8" else "q")
+        start = data_start + meta["offset"]
+        values.frombytes(content[start : start + meta["length"] * values.itemsize])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    columns = header["columns"]
+    pulses: list[dict[str, Any]] = [
+        {
+            "pulse_id": columns["pulse_id"][i],
+            "device_id": columns["device_id"][i],
+            "integration_time_ms": columns["integration_time_ms"][i],
+            "creation_time": columns["creation_time"][i],
+            "delays_grid": columns["delays_grid"][i],
+            "pulse_attributes": [],
+        }
+        for i in range(header["n_pulses"])
+    ]
+    for column in PULSE_ARRAY_COLUMNS:
+        values = read_buffer(column)
+        offsets = read_buffer(f"{column}_offsets")
+        for i, pulse in enumerate(pulses):
+            pulse[column] = values[offsets[i] : offsets[i + 1]].tolist()
+    for i, pulse in enumerate(pulses):
+        if not columns["signal_error_valid"][i]:
+            pulse["signal_error"] = None
+        if pulse["delays_grid"] is not None:
+            pulse["delays"] = None
+    _decode_attributes(header["attributes"], pulses)
+    return pulses
+
+
+def _decode_attributes(
+    attributes: dict[str, dict[str, list[Any]]],
+    pulses: list[dict[str, Any]],
+) -> None:
+    for table in attributes.values():
+        for pulse_index, key, value in zip(
+            table["pulse_index"],
+            table["key"],
+            table["value"],
+            strict=True,
+        ):
+            pulses[pulse_index]["pulse_attributes"].append({"key": key, "value": value})
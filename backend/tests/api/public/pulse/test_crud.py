@@ -0,0 +1,200 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DataError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.config import get_settings
+from api.database import app_engine
+from api.public.attrs.models import PulseAttrsFloatCreate, PulseAttrsStrCreate
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse import async_crud
+from api.public.pulse.crud import (
+    create_pulses,
+    read_pulses,
+    read_pulses_with_ids,
+    stream_pulses_with_ids,
+)
+from api.public.pulse.models import Pulse, PulseCreate
+from api.utils.exceptions import AttrDataTypeExistsError
+
+
+def test_read_pulses_with_ids_concurrently(db_session: Session) -> None:
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    create_pulses(
+        [PulseCreate.create_mock(device_id=device.device_id, length=2)] * 20,
+        db_session,
+    )
+    all_ids = list(db_session.exec(select(Pulse.pulse_id)).all())
+
+    # Overlapping ID sets in different orders, so requests would collide if they
+    # shared state.
+    requests = [all_ids[i:] + all_ids[:i] for i in range(len(all_ids))] * 5
+
+    def read(ids: list[UUID]) -> list[UUID]:
+        with Session(app_engine) as db:
+            return [pulse.pulse_id for pulse in read_pulses_with_ids(ids, db=db)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(read, requests))
+
+    assert results == requests
+
+
+def create_pulses_to_stream(db_session: Session) -> list[UUID]:
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    pulses = []
+    for _ in range(3):
+        pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+        pulse.pulse_attributes = [PulseAttrsStrCreate(key="project", value="a")]
+        pulses.append(pulse)
+    return create_pulses(pulses, db_session)
+
+
+def delete_pulses() -> None:
+    with app_engine.begin() as connection:
+        connection.execute(text("DELETE FROM pulse_str_attrs"))
+        connection.execute(text("DELETE FROM pulses"))
+
+
+def test_stream_pulses_with_ids_reads_checked_snapshot(db_session: Session) -> None:
+    pulse_ids = create_pulses_to_stream(db_session)
+
+    stream = stream_pulses_with_ids(pulse_ids, db=db_session)
+    # Deleted after checking that the pulses exist, but before streaming them
+    delete_pulses()
+    pulses = list(stream)
+
+    assert [pulse.pulse_id for pulse in pulses] == pulse_ids
+    assert all(len(pulse.pulse_attributes) == 1 for pulse in pulses)
+
+
+def test_async_stream_pulses_with_ids_reads_checked_snapshot(
+    db_session: Session,
+) -> None:
+    pulse_ids = create_pulses_to_stream(db_session)
+    async_engine = create_async_engine(
+        make_url(get_settings().DATABASE_URL).set(drivername="postgresql+asyncpg"),
+        poolclass=NullPool,
+    )
+
+    async def stream_pulse_ids() -> list[UUID]:
+        async with AsyncSession(async_engine) as db:
+            stream = await async_crud.stream_pulses_with_ids(pulse_ids, db=db)
+        await asyncio.to_thread(delete_pulses)
+        return [pulse.pulse_id async for pulse in stream]
+
+    assert asyncio.run(stream_pulse_ids()) == pulse_ids
+
+
+def test_read_pulses_with_fields_skips_arrays(db_session: Session) -> None:
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    create_pulses([PulseCreate.create_mock(device_id=device.device_id)], db_session)
+    statements: list[str] = []
+
+    def record(*args: Any) -> None:  # noqa: ANN401
+        statements.append(args[2])
+
+    event.listen(app_engine, "before_cursor_execute", record)
+    try:
+        with Session(app_engine) as db:
+            pulses = read_pulses(db=db, fields=["device_id"])
+    finally:
+        event.remove(app_engine, "before_cursor_execute", record)
+
+    assert pulses[0].device_id == device.device_id
+    assert pulses[0].model_fields_set == {"pulse_id", "creation_time", "device_id"}
+    assert not any("signal" in statement for statement in statements)
+
+
+def test_create_pulses_commits_once(db_session: Session) -> None:
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+    pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock(value="a")]
+    commits: list[Session] = []
+
+    def record(session: Session) -> None:
+        commits.append(session)
+
+    event.listen(db_session, "after_commit", record)
+    try:
+        create_pulses([pulse] * 3, db_session)
+    finally:
+        event.remove(db_session, "after_commit", record)
+
+    assert len(commits) == 1
+
+
+def test_create_pulses_with_conflicting_attrs_writes_nothing(
+    db_session: Session,
+) -> None:
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    str_pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+    str_pulse.pulse_attributes = [PulseAttrsStrCreate.create_mock(key="key")]
+    float_pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+    float_pulse.pulse_attributes = [PulseAttrsFloatCreate.create_mock(key="key")]
+
+    with pytest.raises(AttrDataTypeExistsError):
+        create_pulses([str_pulse, float_pulse], db_session)
+
+    assert db_session.exec(select(Pulse.pulse_id)).all() == []
+
+
+# Batches of 3 pulses are written with the ORM, or with COPY at a threshold of 3
+@pytest.mark.parametrize("bulk_ingest_threshold", [100, 3])
+def test_create_pulses_with_integer_out_of_range(
+    db_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+    bulk_ingest_threshold: int,
+) -> None:
+    monkeypatch.setattr(get_settings(), "BULK_INGEST_THRESHOLD", bulk_ingest_threshold)
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    pulses = [PulseCreate.create_mock(device_id=device.device_id, length=2)] * 3
+    pulses[1] = pulses[1].model_copy(update={"integration_time_ms": 2**40})
+
+    with pytest.raises(DataError, match="integer out of range"):
+        create_pulses(pulses, db_session)
+
+    assert db_session.exec(select(Pulse.pulse_id)).all() == []
+
+
+# Batches of 3 pulses are written with the ORM, or with COPY at a threshold of 3
+@pytest.mark.parametrize("bulk_ingest_threshold", [100, 3])
+def test_create_pulses_stores_aware_times_in_connection_time_zone(
+    db_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+    bulk_ingest_threshold: int,
+) -> None:
+    monkeypatch.setattr(get_settings(), "BULK_INGEST_THRESHOLD", bulk_ingest_threshold)
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    creation_time = datetime(2024, 6, 1, 12, tzinfo=timezone(timedelta(hours=2)))
+    pulse = PulseCreate.create_mock(device_id=device.device_id, length=2)
+    pulses = [pulse.model_copy(update={"creation_time": creation_time})] * 3
+
+    with app_engine.connect() as connection:
+        connection.execute(text("SET TIME ZONE 'Europe/Copenhagen'"))
+        connection.commit()
+        try:
+            with Session(connection) as db:
+                pulse_ids = create_pulses(pulses, db)
+                stored = db.exec(
+                    select(Pulse.creation_time).where(
+                        col(Pulse.pulse_id).in_(pulse_ids)
+                    ),
+                ).all()
+        finally:
+            connection.execute(text("RESET TIME ZONE"))
+            connection.commit()
+
+    # Converted to Copenhagen time, not UTC, like PostgreSQL does for the ORM
+    assert stored == [datetime(2024, 6, 1, 12)] * 3  # noqa: DTZ001
@@ -1,13 +1,18 @@
+import json
 from datetime import datetime
 from typing import Any
 from uuid import UUID, uuid4
 from zoneinfo import ZoneInfo
 
+import pytest
 from fastapi.testclient import TestClient
 
+from api.config import get_settings
 from api.public.attrs.models import PulseAttrsFloatCreate, PulseAttrsStrCreate
+from api.public.pulse.helpers import PULSE_COLUMNAR_MEDIA_TYPE
 from api.public.pulse.models import PulseCreate, TPulseDict
 from api.utils.mock_data_generator import create_devices_and_pulses
+from tests.api.public.pulse.columnar import decode_pulses_columnar
 
 
 def test_create_pulse(client: TestClient, device_id: UUID) -> None:
@@ -354,6 +359,229 @@ def test_add_pulses_saves_new_keys(
     assert len(new_keys) == 1
 
 
+@pytest.fixture()
+def _bulk_ingest(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Use the COPY ingest path for all uploads."""
+    monkeypatch.setattr(get_settings(), "BULK_INGEST_THRESHOLD", 1)
+
+
+@pytest.mark.usefixtures("_bulk_ingest")
+def test_create_pulses_bulk(
+    client: TestClient,
+    device_id: UUID,
+) -> None:
+    pulses_payload = [
+        PulseCreate.create_mock_w_errs(device_id=device_id).as_dict(),
+        PulseCreate.create_mock(device_id=device_id).as_dict(),
+    ]
+    pulses_payload[0]["pulse_attributes"] = [
+        PulseAttrsStrCreate.create_mock(value='quoted "value", with comma').as_dict(),
+        PulseAttrsFloatCreate.create_mock(value=42).as_dict(),
+    ]
+
+    pulse_ids = client.post("/pulses/create/", json=pulses_payload).json()
+    selected_pulses = client.post("/pulses/get", json=pulse_ids).json()
+
+    assert [pulse["pulse_id"] for pulse in selected_pulses] == pulse_ids
+    _assert_equal_pulses(selected_pulses[0], pulses_payload[0])
+    _assert_equal_pulses(selected_pulses[1], pulses_payload[1])
+    assert selected_pulses[0]["signal_error"] == pulses_payload[0]["signal_error"]
+    assert selected_pulses[1]["signal_error"] is None
+    assert {
+        "key": "mock_string_key",
+        "value": 'quoted "value", with comma',
+    } in selected_pulses[0]["pulse_attributes"]
+    assert {"key": "mock_float_key", "value": 42.0} in selected_pulses[0][
+        "pulse_attributes"
+    ]
+    assert selected_pulses[1]["pulse_attributes"] == []
+
+
+@pytest.mark.usefixtures("_bulk_ingest")
+def test_create_pulses_bulk_with_nonexistent_device_id(
+    client: TestClient,
+    device_id: UUID,
+) -> None:
+    nonexistent_device_id = uuid4()
+    pulses_payload = [
+        PulseCreate.create_mock(device_id=device_id).as_dict(),
+        PulseCreate.create_mock(device_id=nonexistent_device_id).as_dict(),
+    ]
+
+    pulse_response = client.post("/pulses/create/", json=pulses_payload)
+
+    assert pulse_response.status_code == 404
+    assert (
+        pulse_response.json()["detail"]
+        == f"Device not found with id: {nonexistent_device_id}"
+    )
+    assert client.get("/pulses").json() == []
+
+
+@pytest.mark.usefixtures("_bulk_ingest")
+def test_create_pulses_bulk_rolls_back_on_wrong_datatype(
+    client: TestClient,
+    device_id: UUID,
+) -> None:
+    pulse_payload = [PulseCreate.create_mock(device_id=device_id).as_dict()]
+    pulse_payload[0]["pulse_attributes"] = [
+        PulseAttrsFloatCreate.create_mock().as_dict(),
+    ]
+    client.post("/pulses/create/", json=pulse_payload)
+
+    new_pulse_payload = [PulseCreate.create_mock(device_id=device_id).as_dict()]
+    new_pulse_payload[0]["pulse_attributes"] = [
+        PulseAttrsStrCreate.create_mock(key="mock_float_key").as_dict(),
+    ]
+    wrong_pulse_response = client.post("/pulses/create/", json=new_pulse_payload)
+
+    assert wrong_pulse_response.status_code == 400
+    assert len(client.get("/pulses").json()) == 1
+
+
+def test_create_pulses_stream(
+    client: TestClient,
+    device_id: UUID,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(get_settings(), "STREAM_INGEST_BATCH_SIZE", 2)
+    pulses_payload = [
+        PulseCreate.create_mock(device_id=device_id).as_dict() for _ in range(3)
+    ]
+    pulses_payload[2]["pulse_attributes"] = [
+        PulseAttrsStrCreate.create_mock().as_dict(),
+    ]
+    body = "\n\n".join(json.dumps(pulse) for pulse in pulses_payload) + "\n"
+
+    response = client.post(
+        "/pulses/create/stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    response_data = response.json()
+    selected_pulses = client.post("/pulses/get", json=response_data["pulse_ids"])
+
+    assert response.status_code == 200
+    assert response_data["errors"] == []
+    assert len(response_data["pulse_ids"]) == 3
+    for selected_pulse, pulse_payload in zip(
+        selected_pulses.json(),
+        pulses_payload,
+        strict=True,
+    ):
+        _assert_equal_pulses(selected_pulse, pulse_payload)
+    assert selected_pulses.json()[2]["pulse_attributes"] == [
+        {"key": "mock_string_key", "value": "mock_string_value"},
+    ]
+
+
+def test_create_pulses_stream_reports_line_errors(
+    client: TestClient,
+    device_id: UUID,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(get_settings(), "STREAM_INGEST_BATCH_SIZE", 1)
+    valid_pulse = PulseCreate.create_mock(device_id=device_id).as_dict()
+    invalid_pulse = PulseCreate.create_mock(device_id=device_id).as_dict()
+    invalid_pulse["signal"] = [1, "a", 3]  # type: ignore[list-item]
+    unknown_device_pulse = PulseCreate.create_mock(device_id=uuid4()).as_dict()
+    lines = [
+        json.dumps(valid_pulse),
+        "not json",
+        json.dumps(invalid_pulse),
+        json.dumps(unknown_device_pulse),
+    ]
+
+    response = client.post("/pulses/create/stream", content="\n".join(lines))
+    response_data = response.json()
+
+    assert response.status_code == 200
+    assert len(response_data["pulse_ids"]) == 1
+    assert response_data["error_count"] == 3
+    assert [error["line"] for error in response_data["errors"]] == [2, 3, 4]
+    assert response_data["errors"][0]["errors"][0]["type"] == "json_invalid"
+    assert response_data["errors"][1]["errors"][0]["type"] == "float_parsing"
+    assert response_data["errors"][2]["errors"][0]["type"] == "DeviceNotFoundError"
+    assert len(client.get("/pulses").json()) == 1
+
+
+# Batches of 2 pulses are written with the ORM, or with COPY at a threshold of 2
+@pytest.mark.parametrize("bulk_ingest_threshold", [100, 2])
+def test_create_pulses_stream_reports_database_errors(
+    client: TestClient,
+    device_id: UUID,
+    monkeypatch: pytest.MonkeyPatch,
+    bulk_ingest_threshold: int,
+) -> None:
+    monkeypatch.setattr(get_settings(), "STREAM_INGEST_BATCH_SIZE", 2)
+    monkeypatch.setattr(get_settings(), "BULK_INGEST_THRESHOLD", bulk_ingest_threshold)
+    pulses_payload = [
+        PulseCreate.create_mock(device_id=device_id).as_dict() for _ in range(5)
+    ]
+    # Passes validation, but does not fit the integer column
+    pulses_payload[3]["integration_time_ms"] = 2**40
+    body = "\n".join(json.dumps(pulse) for pulse in pulses_payload)
+
+    response = client.post("/pulses/create/stream", content=body)
+    response_data = response.json()
+
+    assert response.status_code == 200
+    assert len(response_data["pulse_ids"]) == 3
+    assert [error["line"] for error in response_data["errors"]] == [3, 4]
+    error = response_data["errors"][0]["errors"][0]
+    assert error["type"] == "DataError"
+    assert error["msg"].strip() == "integer out of range"
+    stored_ids = {pulse["pulse_id"] for pulse in client.get("/pulses").json()}
+    assert stored_ids == set(response_data["pulse_ids"])
+
+
+def test_read_pulses_with_ids_columnar(client: TestClient) -> None:
+    create_devices_and_pulses()
+    pulse_ids = [pulse["pulse_id"] for pulse in client.get("/pulses/").json()]
+
+    json_pulses = client.post("/pulses/get", json=pulse_ids).json()
+    response = client.post(
+        "/pulses/get",
+        json=pulse_ids,
+        headers={"Accept": PULSE_COLUMNAR_MEDIA_TYPE},
+    )
+    columnar_pulses = decode_pulses_columnar(response.content)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == PULSE_COLUMNAR_MEDIA_TYPE
+    assert len(columnar_pulses) == len(json_pulses)
+    for columnar_pulse, json_pulse in zip(columnar_pulses, json_pulses, strict=True):
+        assert columnar_pulse["pulse_id"] == json_pulse["pulse_id"]
+        assert columnar_pulse["device_id"] == json_pulse["device_id"]
+        assert columnar_pulse["delays"] == json_pulse["delays"]
+        assert columnar_pulse["signal"] == json_pulse["signal"]
+        assert columnar_pulse["signal_error"] == json_pulse["signal_error"]
+        assert sorted(
+            columnar_pulse["pulse_attributes"],
+            key=lambda attr: (attr["key"], str(attr["value"])),
+        ) == sorted(
+            json_pulse["pulse_attributes"],
+            key=lambda attr: (attr["key"], str(attr["value"])),
+        )
+
+
+def test_get_all_pulses_columnar(client: TestClient, device_id: UUID) -> None:
+    pulses_payload = [
+        PulseCreate.create_mock(device_id=device_id, length=3).as_dict()
+        for _ in range(2)
+    ]
+    client.post("/pulses/create/", json=pulses_payload)
+
+    response = client.get("/pulses/", headers={"Accept": PULSE_COLUMNAR_MEDIA_TYPE})
+    columnar_pulses = decode_pulses_columnar(response.content)
+
+    assert response.status_code == 200
+    assert [pulse["signal"] for pulse in columnar_pulses] == [
+        pulse["signal"] for pulse in pulses_payload
+    ]
+    assert [pulse["signal_error"] for pulse in columnar_pulses] == [None, None]
+
+
 def _assert_equal_pulses(
     received_pulse: dict[str, Any],
     created_pulse: TPulseDict,
@@ -374,3 +602,245 @@ def _assert_equal_pulses(
     assert received_pulse["signal"] == created_pulse["signal"]
     assert received_pulse["integration_time_ms"] == created_pulse["integration_time_ms"]
     assert received_pulse["creation_time"] == creation_time
+
+
+def _create_uniform_and_irregular_pulses(
+    client: TestClient,
+    device_id: UUID,
+) -> tuple[list[str], list[TPulseDict]]:
+    pulses_payload = [
+        PulseCreate.create_mock(device_id=device_id, length=4).as_dict()
+        for _ in range(2)
+    ]
+    pulses_payload[1]["delays"] = [0.0, 1e-10, 3e-10, 7e-10]
+    pulse_ids = client.post("/pulses/create/", json=pulses_payload).json()
+    return pulse_ids, pulses_payload
+
+
+def test_read_pulses_with_delays_grid(client: TestClient, device_id: UUID) -> None:
+    pulse_ids, pulses_payload = _create_uniform_and_irregular_pulses(
+        client,
+        device_id,
+    )
+
+    explicit_pulses = client.post("/pulses/get", json=pulse_ids).json()
+    grid_pulses = client.post(
+        "/pulses/get",
+        json=pulse_ids,
+        params={"explicit_delays": False},
+    ).json()
+    grid_pulse = client.get(
+        f"/pulses/{pulse_ids[0]}",
+        params={"explicit_delays": False},
+    ).json()
+
+    assert [pulse["delays"] for pulse in explicit_pulses] == [
+        pulse["delays"] for pulse in pulses_payload
+    ]
+    assert [pulse["delays_grid"] for pulse in explicit_pulses] == [None, None]
+    assert grid_pulses[0]["delays"] is None
+    assert grid_pulses[0]["delays_grid"] == {"start": 0.0, "step": 1e-10, "count": 4}
+    assert grid_pulses[1]["delays"] == pulses_payload[1]["delays"]
+    assert grid_pulses[1]["delays_grid"] is None
+    assert grid_pulse["delays_grid"] == grid_pulses[0]["delays_grid"]
+
+
+def test_read_pulses_with_delays_fields(client: TestClient, device_id: UUID) -> None:
+    pulse_ids, pulses_payload = _create_uniform_and_irregular_pulses(
+        client,
+        device_id,
+    )
+
+    grid_pulses = client.post(
+        "/pulses/get",
+        json=pulse_ids,
+        params={"fields": ["delays_grid"]},
+    ).json()
+    delays_pulses = client.post(
+        "/pulses/get",
+        json=pulse_ids,
+        params={"fields": ["delays"]},
+    ).json()
+
+    assert grid_pulses == [
+        {
+            "pulse_id": pulse_ids[0],
+            "delays_grid": {"start": 0.0, "step": 1e-10, "count": 4},
+        },
+        {"pulse_id": pulse_ids[1], "delays_grid": None},
+    ]
+    assert delays_pulses == [
+        {"pulse_id": pulse_id, "delays": pulse["delays"]}
+        for pulse_id, pulse in zip(pulse_ids, pulses_payload, strict=True)
+    ]
+
+
+@pytest.mark.usefixtures("_bulk_ingest")
+def test_read_pulses_with_delays_grid_columnar(
+    client: TestClient,
+    device_id: UUID,
+) -> None:
+    pulse_ids, pulses_payload = _create_uniform_and_irregular_pulses(
+        client,
+        device_id,
+    )
+
+    response = client.post(
+        "/pulses/get",
+        json=pulse_ids,
+        params={"explicit_delays": False},
+        headers={"Accept": PULSE_COLUMNAR_MEDIA_TYPE},
+    )
+    columnar_pulses = decode_pulses_columnar(response.content)
+
+    assert columnar_pulses[0]["delays"] is None
+    assert columnar_pulses[0]["delays_grid"] == {
+        "start": 0.0,
+        "step": 1e-10,
+        "count": 4,
+    }
+    assert columnar_pulses[1]["delays"] == pulses_payload[1]["delays"]
+    assert columnar_pulses[1]["delays_grid"] is None
+
+
+def test_get_pulses_with_cursor(client: TestClient, device_id: UUID) -> None:
+    pulses_payload = [
+        PulseCreate.create_mock(device_id=device_id, length=2).as_dict()
+        for _ in range(5)
+    ]
+    # Pulses with the same creation time are ordered by ID
+    pulses_payload[3]["creation_time"] = pulses_payload[2]["creation_time"]
+    pulse_ids = client.post("/pulses/create/", json=pulses_payload).json()
+    expected_ids = pulse_ids[:2] + sorted(pulse_ids[2:4]) + pulse_ids[4:]
+
+    paged_ids = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = client.get("/pulses/", params=params)
+        assert response.status_code == 200
+        paged_ids += [pulse["pulse_id"] for pulse in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert paged_ids == expected_ids
+
+
+def test_get_pulses_with_invalid_cursor(client: TestClient) -> None:
+    response = client.get("/pulses/", params={"cursor": "bm90IGEgY3Vyc29y"})
+
+    assert response.status_code == 400
+
+
+def test_get_pulses_with_fields(client: TestClient, device_id: UUID) -> None:
+    pulses_payload = [
+        PulseCreate.create_mock(device_id=device_id, length=2).as_dict()
+        for _ in range(2)
+    ]
+    pulse_ids = client.post("/pulses/create/", json=pulses_payload).json()
+
+    response = client.get(
+        "/pulses/",
+        params={"fields": ["integration_time_ms", "signal"], "limit": 1},
+    )
+    selected_pulses = client.post(
+        "/pulses/get",
+        json=pulse_ids,
+        params={"fields": ["device_id", "pulse_attributes"]},
+    ).json()
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "pulse_id": pulse_ids[0],
+            "creation_time": response.json()[0]["creation_time"],
+            "integration_time_ms": pulses_payload[0]["integration_time_ms"],
+            "signal": pulses_payload[0]["signal"],
+        },
+    ]
+    assert "X-Next-Cursor" in response.headers
+    assert selected_pulses == [
+        {"pulse_id": pulse_id, "device_id": str(device_id), "pulse_attributes": []}
+        for pulse_id in pulse_ids
+    ]
+
+
+def test_get_pulses_with_nonexistent_field(client: TestClient) -> None:
+    response = client.get("/pulses/", params={"fields": ["nonexistent"]})
+
+    assert response.status_code == 404
+    assert response.json()["detail"].startswith(
+        "Pulse column not found: nonexistent.",
+    )
+
+
+def test_get_pulses_from_ids_ndjson(
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    create_devices_and_pulses()
+    all_pulses = client.get("/pulses/").json()
+    wanted_pulse_ids = [pulse["pulse_id"] for pulse in all_pulses]
+    # Read in several batches
+    monkeypatch.setattr(get_settings(), "STREAM_READ_BATCH_SIZE", 2)
+
+    response = client.post(
+        "/pulses/get",
+        json=wanted_pulse_ids,
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert streamed == client.post("/pulses/get", json=wanted_pulse_ids).json()
+
+
+def test_get_pulses_from_nonexisting_ids_ndjson(client: TestClient) -> None:
+    response = client.post(
+        "/pulses/get",
+        json=[str(uuid4())],
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 404
+
+
+def test_async_reads_match_sync_reads(
+    client: TestClient,
+    async_client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    create_devices_and_pulses()
+    pulse_ids = [pulse["pulse_id"] for pulse in client.get("/pulses/").json()]
+    monkeypatch.setattr(get_settings(), "STREAM_READ_BATCH_SIZE", 2)
+
+    all_params: list[dict[str, int | list[str]]] = [
+        {"limit": 2},
+        {"fields": ["signal"]},
+    ]
+    for params in all_params:
+        response = async_client.get("/pulses/", params=params)
+        expected = client.get("/pulses/", params=params)
+        assert response.json() == expected.json()
+        assert response.headers.get("X-Next-Cursor") == expected.headers.get(
+            "X-Next-Cursor",
+        )
+    assert (
+        async_client.post("/pulses/get", json=pulse_ids).json()
+        == client.post("/pulses/get", json=pulse_ids).json()
+    )
+    streamed = async_client.post(
+        "/pulses/get",
+        json=pulse_ids,
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert [json.loads(line) for line in streamed.text.splitlines()] == (
+        client.post("/pulses/get", json=pulse_ids).json()
+    )
+    assert (
+        async_client.get(f"/pulses/{pulse_ids[0]}").json()
+        == client.get(f"/pulses/{pulse_ids[0]}").json()
+    )
+    assert async_client.get(f"/pulses/{uuid4()}").status_code == 404
+    assert async_client.post("/pulses/get", json=[str(uuid4())]).status_code == 404
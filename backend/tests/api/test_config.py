@@ -1,6 +1,9 @@
+from typing import Any
+
 import pytest
+from pydantic import ValidationError
 
-from api.config import get_env_var
+from api.config import Settings, get_env_var
 
 
 def test_missing_env_var(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -8,3 +11,16 @@ def test_missing_env_var(monkeypatch: pytest.MonkeyPatch) -> None:
 
     with pytest.raises(ValueError, match="Environment variable SOME_VAR is not set"):
         get_env_var("SOME_VAR")
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"WORKERS": 40},
+        {"WORKERS": 15, "ASYNC_DATABASE": True},
+        {"DATABASE_POOL_SIZE": 40},
+    ],
+)
+def test_settings_reject_exceeding_max_connections(settings: dict[str, Any]) -> None:
+    with pytest.raises(ValidationError, match="more than DATABASE_MAX_CONNECTIONS"):
+        Settings.model_validate({"DATABASE_MAX_CONNECTIONS": 40, **settings})
@@ -0,0 +1,33 @@
+import pytest
+
+from api.config import get_pool_limits, get_settings
+
+
+@pytest.mark.parametrize(
+    ("workers", "async_database", "expected"),
+    [(1, False, (19, 20)), (4, False, (4, 5)), (4, True, (2, 2)), (20, False, (1, 0))],
+)
+def test_get_pool_limits(
+    workers: int,
+    async_database: bool,
+    expected: tuple[int, int],
+) -> None:
+    settings = get_settings().model_copy(
+        update={
+            "WORKERS": workers,
+            "ASYNC_DATABASE": async_database,
+            "DATABASE_MAX_CONNECTIONS": 40,
+        },
+    )
+
+    pool_size, max_overflow = get_pool_limits(settings)
+
+    assert (pool_size, max_overflow) == expected
+
+
+def test_get_pool_limits_overrides() -> None:
+    settings = get_settings().model_copy(
+        update={"DATABASE_POOL_SIZE": 3, "DATABASE_MAX_OVERFLOW": 0},
+    )
+
+    assert get_pool_limits(settings) == (3, 0)
@@ -0,0 +1,162 @@
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session
+
+from api.database import app_engine
+from api.migrations import (
+    PULSES_TABLE,
+    check_pulse_array_storage,
+    convert_pulse_array_storage,
+    get_column_types,
+    run_migrations,
+)
+from api.public.device.crud import create_device
+from api.public.device.models import DeviceCreate
+from api.public.pulse.crud import create_pulses, read_pulse
+from api.public.pulse.models import PulseCreate
+from api.utils.types import PulseArrayStorage
+
+
+def test_convert_pulse_array_storage(db_session: Session) -> None:
+    device = create_device(DeviceCreate.create_mock("Glaze I"), db_session)
+    pulses = [
+        PulseCreate.create_mock_w_errs(device_id=device.device_id, length=4)
+        for _ in range(3)
+    ]
+    for pulse in pulses:
+        # Irregular, so the delays are stored as an array
+        pulse.delays = [0.0, 1e-10, 3e-10, 7e-10]
+    pulse_ids = create_pulses(pulses, db_session)
+    # Release the session's locks, the conversion alters the table
+    db_session.commit()
+
+    convert_pulse_array_storage(
+        app_engine,
+        PulseArrayStorage.PACKED,
+        fill_only=True,
+        batch_size=2,
+    )
+    with app_engine.connect() as connection:
+        column_types = get_column_types(connection, PULSES_TABLE)
+        packed = connection.execute(
+            text("SELECT signal_packed FROM pulses ORDER BY pulse_id"),
+        ).scalars()
+        assert column_types["signal"] == "ARRAY"
+        assert None not in list(packed)
+    with pytest.raises(RuntimeError, match="convert_pulse_arrays.py packed"):
+        check_pulse_array_storage(app_engine, PulseArrayStorage.PACKED)
+
+    convert_pulse_array_storage(app_engine, PulseArrayStorage.PACKED, batch_size=2)
+    check_pulse_array_storage(app_engine, PulseArrayStorage.PACKED)
+    with app_engine.connect() as connection:
+        column_types = get_column_types(connection, PULSES_TABLE)
+        row = connection.execute(
+            text("SELECT delays, signal, signal_error FROM pulses LIMIT 1"),
+        ).one()
+        versions = connection.execute(
+            text("SELECT version FROM schema_migrations"),
+        ).scalars()
+        assert column_types["signal"] == "bytea"
+        assert "signal_packed" not in column_types
+        assert len(row.signal) == 4 * 8
+        assert "pulse_array_storage_packed" in list(versions)
+
+    convert_pulse_array_storage(app_engine, PulseArrayStorage.ARRAY)
+    check_pulse_array_storage(app_engine, PulseArrayStorage.ARRAY)
+    for pulse_id, pulse in zip(pulse_ids, pulses, strict=True):
+        read = read_pulse(pulse_id, db_session)
+        assert read.delays == pulse.delays
+        assert read.signal == pulse.signal
+        assert read.signal_error == pulse.signal_error
+
+
+def test_run_migrations(db_session: Session) -> None:
+    # Roll the database back to before the migrations, with a duplicated key
+    db_session.commit()
+    with app_engine.begin() as connection:
+        connection.execute(text("DELETE FROM schema_migrations"))
+        connection.execute(text("DROP INDEX ix_pulse_key_registry_key"))
+        connection.execute(text("DROP INDEX ix_pulse_float_attrs_key_value_pulse_id"))
+        # The index on whole string values that used to be built
+        connection.execute(
+            text("DROP INDEX ix_pulse_str_attrs_key_value_prefix_pulse_id"),
+        )
+        connection.execute(
+            text(
+                "CREATE INDEX ix_pulse_str_attrs_key_value_pulse_id "
+                "ON pulse_str_attrs (key, value, pulse_id)",
+            ),
+        )
+        connection.execute(text("DROP INDEX ix_pulses_creation_time_pulse_id"))
+        # Also drops the index on it
+        connection.execute(text("ALTER TABLE devices DROP COLUMN creation_time"))
+        connection.execute(text("ALTER TABLE pulses DROP COLUMN delays_count"))
+        connection.execute(
+            text(
+                "INSERT INTO pulse_key_registry (index, key, data_type) VALUES "
+                "(gen_random_uuid(), 'key', 'string'), "
+                "(gen_random_uuid(), 'key', 'string')",
+            ),
+        )
+
+    run_migrations(app_engine)
+    # Applied migrations are skipped
+    run_migrations(app_engine)
+
+    with app_engine.connect() as connection:
+        indexes = set(
+            connection.execute(
+                text("SELECT indexname FROM pg_indexes WHERE indexname LIKE 'ix_%'"),
+            ).scalars(),
+        )
+        keys = connection.execute(
+            text("SELECT key FROM pulse_key_registry"),
+        ).scalars()
+        versions = connection.execute(
+            text("SELECT version FROM schema_migrations"),
+        ).scalars()
+        assert {
+            "ix_pulse_key_registry_key",
+            "ix_pulse_float_attrs_key_value_pulse_id",
+            "ix_pulse_str_attrs_key_value_prefix_pulse_id",
+            "ix_pulses_creation_time_pulse_id",
+            "ix_devices_creation_time_device_id",
+        } <= indexes
+        assert "ix_pulse_str_attrs_key_value_pulse_id" not in indexes
+        assert list(keys) == ["key"]
+        assert "delays_count" in get_column_types(connection, PULSES_TABLE)
+        assert sorted(versions) == [
+            "0001_attrs_key_value_indexes",
+            "0002_unique_key_registry",
+            "0003_device_creation_time",
+            "0004_pagination_indexes",
+            "0005_delays_grid_columns",
+            "0006_str_attrs_value_prefix_index",
+        ]
+
+
+def test_run_migrations_fails_on_conflicting_keys(db_session: Session) -> None:
+    db_session.commit()
+    with app_engine.begin() as connection:
+        connection.execute(text("DELETE FROM schema_migrations"))
+        connection.execute(text("DROP INDEX ix_pulse_key_registry_key"))
+        connection.execute(
+            text(
+                "INSERT INTO pulse_key_registry (index, key, data_type) VALUES "
+                "(gen_random_uuid(), 'key', 'string'), "
+                "(gen_random_uuid(), 'key', 'float')",
+            ),
+        )
+
+    with pytest.raises(RuntimeError, match="several data types.*: key"):
+        run_migrations(app_engine)
+
+    with app_engine.connect() as connection:
+        data_types = connection.execute(
+            text("SELECT data_type FROM pulse_key_registry WHERE key = 'key'"),
+        ).scalars()
+        versions = connection.execute(
+            text("SELECT version FROM schema_migrations"),
+        ).scalars()
+        assert sorted(data_types) == ["float", "string"]
+        assert list(versions) == ["0001_attrs_key_value_indexes"]
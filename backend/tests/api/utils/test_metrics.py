@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.config import get_auth_settings
+from api.utils.metrics import MULTIPROCESS_DIR_ENV_VAR, generate_metrics
+
+
+def get_sample(metrics: str, name: str, labels: str) -> float:
+    prefix = f"{name}{{{labels}}} "
+    samples = [line for line in metrics.splitlines() if line.startswith(prefix)]
+    return float(samples[0].removeprefix(prefix)) if samples else 0.0
+
+
+def test_metrics(client: TestClient, metrics_headers: dict[str, str]) -> None:
+    labels = 'method="GET",route="/devices/{device_id}",status="200"'
+    before = client.get("/metrics", headers=metrics_headers).text
+    device = client.post("/devices/", json={"friendly_name": "Glaze I"}).json()
+    device_id = device["device_id"]
+
+    client.get(f"/devices/{device_id}")
+    client.get("/does-not-exist")
+    response = client.get("/metrics", headers=metrics_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    after = response.text
+    for name in [
+        "terastore_http_request_duration_seconds_count",
+        "terastore_http_response_size_bytes_count",
+        "terastore_db_queries_per_request_count",
+    ]:
+        assert get_sample(after, name, labels) == get_sample(before, name, labels) + 1
+    for name in [
+        "terastore_http_response_size_bytes_sum",
+        "terastore_db_queries_per_request_sum",
+        "terastore_db_duration_seconds_per_request_sum",
+    ]:
+        assert get_sample(after, name, labels) > get_sample(before, name, labels)
+    assert f'route="{device_id}"' not in after
+    unmatched = 'method="GET",route="unmatched",status="404"'
+    assert get_sample(after, "terastore_http_request_duration_seconds_count", unmatched)
+
+
+def test_metrics_require_metrics_token(
+    client: TestClient,
+    metrics_headers: dict[str, str],
+) -> None:
+    # The access token of a user is not accepted
+    assert client.get("/metrics").status_code == 401
+    wrong_headers = {"Authorization": "Bearer wrong"}
+    assert client.get("/metrics", headers=wrong_headers).status_code == 401
+    assert client.get("/metrics", headers=metrics_headers).status_code == 200
+
+
+def test_metrics_disabled_without_metrics_token(
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(get_auth_settings(), "TERASTORE_METRICS_TOKEN", "")
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer "})
+
+    assert response.status_code == 401
+
+
+def test_generate_metrics_multiprocess(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv(MULTIPROCESS_DIR_ENV_VAR, str(tmp_path))
+
+    # No worker has written metrics to the directory yet
+    assert generate_metrics() == b""
@@ -0,0 +1,74 @@
+from collections.abc import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlmodel import create_engine
+
+from api.config import get_settings
+from api.utils.pool_metrics import InstrumentedQueuePool, instrument_engine
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Iterator[Engine]:
+    engine = create_engine(
+        get_settings().DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+def get_pool_metric(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, {"engine": "test", **labels}) or 0.0
+
+
+def test_pool_metrics(engine: Engine) -> None:
+    instrument_engine("test", engine)
+    events = "terastore_db_pool_connection_events_total"
+    opened = get_pool_metric(events, event="opened")
+    closed = get_pool_metric(events, event="closed")
+    invalidated = get_pool_metric(events, event="invalidated")
+    checkouts = get_pool_metric("terastore_db_pool_checkout_wait_seconds_count")
+    timeouts = get_pool_metric("terastore_db_pool_checkout_timeouts_total")
+    connects = get_pool_metric("terastore_db_pool_connect_seconds_count")
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        assert get_pool_metric("terastore_db_pool_checked_out_connections") == 1
+        assert get_pool_metric("terastore_db_pool_size") == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        connection.invalidate()
+
+    with engine.connect():
+        pass
+    engine.dispose()
+
+    assert get_pool_metric("terastore_db_pool_checked_out_connections") == 0
+    assert get_pool_metric("terastore_db_pool_overflow_connections") == 0
+    assert get_pool_metric("terastore_db_pool_checkout_wait_seconds_count") == (
+        checkouts + 2
+    )
+    assert get_pool_metric("terastore_db_pool_checkout_timeouts_total") == timeouts + 1
+    assert get_pool_metric("terastore_db_pool_connect_seconds_count") == connects + 2
+    assert get_pool_metric(events, event="opened") == opened + 2
+    assert get_pool_metric(events, event="closed") == closed + 2
+    assert get_pool_metric(events, event="invalidated") == invalidated + 1
+
+
+def test_pool_metrics_exported(
+    setup_client: TestClient,
+    metrics_headers: dict[str, str],
+) -> None:
+    response = setup_client.get("/metrics", headers=metrics_headers)
+
+    assert response.status_code == 200
+    assert 'terastore_db_pool_size{engine="sync"}' in response.text
+    assert 'terastore_db_pool_size{engine="async"}' in response.text
@@ -0,0 +1,63 @@
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.utils.singleflight import SingleFlight
+
+CALLERS = 8
+
+
+def run_concurrently(
+    flight: SingleFlight[int],
+    function: Callable[[], int],
+) -> list[int | ValueError]:
+    """Call flight.do from several threads while the first call is blocked."""
+    release = threading.Event()
+    calls: list[int] = []
+
+    def blocked() -> int:
+        calls.append(1)
+        release.wait(timeout=5)
+        return function()
+
+    def call() -> int | ValueError:
+        try:
+            return flight.do("key", blocked)
+        except ValueError as error:
+            return error
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        futures = [executor.submit(call) for _ in range(CALLERS)]
+        # Give every caller time to join the call in flight
+        threading.Event().wait(0.2)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    return results
+
+
+def test_single_flight_shares_result() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+
+    results = run_concurrently(flight, lambda: 42)
+
+    assert results == [42] * CALLERS
+    # Calls after the one in flight finished run again
+    assert flight.do("key", lambda: 43) == 43
+
+
+def test_single_flight_shares_exception() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    error = ValueError("no")
+
+    def fail() -> int:
+        raise error
+
+    results = run_concurrently(flight, fail)
+
+    assert results == [error] * CALLERS
+    with pytest.raises(ValueError, match="no"):
+        flight.do("key", fail)
@@ -1,12 +1,21 @@
-from collections.abc import Generator
+from collections.abc import AsyncIterator, Generator
 from uuid import UUID
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, create_engine
-
-from api.config import get_settings
-from api.database import create_db_and_tables, drop_tables, get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.config import get_auth_settings, get_settings
+from api.database import (
+    create_db_and_tables,
+    drop_tables,
+    get_async_session,
+    get_session,
+)
 from api.main import create_app
 from api.public.auth.crud import create_user
 from api.public.auth.models import AuthLevel, UserCreate
@@ -58,8 +67,49 @@ def client_fixture_with_access_token(
     setup_client: TestClient,
 ) -> TestClient:
     """Create a TestClient with an access token for testing purposes."""
+    return log_in(setup_client)
+
+
+@pytest.fixture(name="async_client")
+def async_client_fixture(
+    db_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[TestClient, None, None]:
+    """Create a TestClient serving reads from the async views."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ASYNC_DATABASE", True)
+    app = create_app(Lifespan.TEST)
+    # Pooled asyncpg connections cannot be shared between the event loops of requests
+    async_engine = create_async_engine(
+        make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg"),
+        poolclass=NullPool,
+    )
+
+    def get_session_override() -> Session:
+        return db_session
+
+    async def get_async_session_override() -> AsyncIterator[AsyncSession]:
+        async with AsyncSession(async_engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+
+    yield log_in(TestClient(app))
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="metrics_headers")
+def metrics_headers_fixture(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    """Configure a metrics token, and get the headers of requests sending it."""
+    monkeypatch.setattr(get_auth_settings(), "TERASTORE_METRICS_TOKEN", "scraper")
+    return {"Authorization": "Bearer scraper"}
+
+
+def log_in(client: TestClient) -> TestClient:
+    """Add an access token for the admin user to the client's headers."""
     login_payload = {"username": "admin@admin", "password": "admin"}
-    response = setup_client.post(
+    response = client.post(
         "/auth/login",
         data=login_payload,
     )
@@ -67,8 +117,8 @@ def client_fixture_with_access_token(
     data = response.json()
     access_token = data["access_token"]
 
-    setup_client.headers.update({"Authorization": f"Bearer {access_token}"})
-    return setup_client
+    client.headers.update({"Authorization": f"Bearer {access_token}"})
+    return client
 
 
 @pytest.fixture()